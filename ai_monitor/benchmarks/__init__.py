@@ -0,0 +1,14 @@
+"""
+Web 监控界面性能测试
+==================
+
+- synthetic_db：生成 10k / 1M / 10M 行规模的合成 chat_monitor.db
+- runner：启动 web_interface 并并发压测各接口，输出 JSON 报告
+- http_client：压测使用的极简 HTTP/1.1 客户端
+
+使用方法（在 ai_monitor 目录下运行）：
+    python -m benchmarks generate --size 1m --out bench_data/1m.db
+    python -m benchmarks run --db bench_data/1m.db --clients 50 --duration 10 --out result.json
+
+作者：AI助手
+"""
@@ -0,0 +1,77 @@
+"""
+性能测试命令行入口
+================
+
+python -m benchmarks generate  生成合成数据库
+python -m benchmarks run       压测 Web 监控界面
+
+作者：AI助手
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# 让 benchmarks 可以导入 ai_monitor 目录下的模块（rollup 等）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.runner import BenchmarkConfig, run
+from benchmarks.synthetic_db import generate_database, parse_size
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Web 监控界面性能测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    gen = subparsers.add_parser('generate', help='生成合成数据库')
+    gen.add_argument('--size', default='10k', help='消息行数: 10k / 1m / 10m 或具体数字 (默认: 10k)')
+    gen.add_argument('--out', default=None, help='输出路径 (默认: bench_data/<size>.db)')
+    gen.add_argument('--users', type=int, default=500, help='用户数 (默认: 500)')
+    gen.add_argument('--days', type=int, default=90, help='覆盖天数 (默认: 90)')
+    gen.add_argument('--seed', type=int, default=42, help='随机种子 (默认: 42)')
+
+    bench = subparsers.add_parser('run', help='压测 Web 监控界面')
+    bench.add_argument('--db', default=None, help='数据库路径；指定后自动启动服务，否则压测已运行的服务')
+    bench.add_argument('--host', default='127.0.0.1', help='服务地址 (默认: 127.0.0.1)')
+    bench.add_argument('--port', type=int, default=8011, help='服务端口 (默认: 8011)')
+    bench.add_argument('--workers', type=int, default=1, help='自动启动服务时的工作进程数 (默认: 1)')
+    bench.add_argument('--clients', type=int, default=20, help='并发客户端数 (默认: 20)')
+    bench.add_argument('--duration', type=float, default=10.0, help='每个接口的压测秒数 (默认: 10)')
+    bench.add_argument(
+        '--endpoints',
+        default='stats,stats_uncached,messages,messages_uncached,search,ws',
+        help='要压测的接口，逗号分隔；*_uncached 绕过响应缓存 '
+             '(默认: stats,stats_uncached,messages,messages_uncached,search,ws)'
+    )
+    bench.add_argument('--out', default=None, help='JSON 报告输出路径 (默认: 打印到标准输出)')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        out = args.out or os.path.join('bench_data', f"{args.size.lower()}.db")
+        info = generate_database(out, parse_size(args.size), args.users, args.days, args.seed)
+        print(json.dumps(info, ensure_ascii=False, indent=2))
+        return
+
+    config = BenchmarkConfig(
+        host=args.host,
+        port=args.port,
+        clients=args.clients,
+        duration=args.duration,
+        endpoints=[name.strip() for name in args.endpoints.split(',') if name.strip()]
+    )
+    report = run(config, db_path=args.db, workers=args.workers)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"报告已保存: {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+极简异步 HTTP/1.1 客户端
+======================
+
+只支持 GET 和 keep-alive，够压测使用，避免引入额外的第三方依赖。
+每个 HttpConnection 对应一个 TCP 连接，同一时间只能有一个请求在进行。
+
+作者：AI助手
+"""
+
+import asyncio
+from typing import Dict, Optional, Tuple
+
+
+class HttpConnection:
+    """一条保持连接的 HTTP/1.1 连接"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _ensure_connected(self):
+        if self._writer is None or self._writer.is_closing():
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def get(self, path: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        发送 GET 请求
+
+        Returns:
+            Tuple[int, Dict[str, str], bytes]: (状态码, 响应头（小写键）, 响应体)
+        """
+        await self._ensure_connected()
+
+        lines = [f"GET {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("utf-8"))
+
+        try:
+            await self._writer.drain()
+            return await self._read_response()
+        except Exception:
+            await self.close()
+            raise
+
+    async def _read_response(self) -> Tuple[int, Dict[str, str], bytes]:
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("服务器关闭了连接")
+        status = int(status_line.split()[1])
+
+        response_headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        elif "content-length" in response_headers:
+            body = await self._reader.readexactly(int(response_headers["content-length"]))
+        elif status in (204, 304):
+            body = b""
+        else:
+            body = await self._reader.read()
+
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+
+        return status, response_headers, body
+
+    async def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size = int((await self._reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # 跳过结尾的 trailer
+                while (await self._reader.readline()) not in (b"\r\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readline()
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+            self._writer = None
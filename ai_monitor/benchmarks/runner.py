@@ -0,0 +1,273 @@
+"""
+Web 监控界面压测
+==============
+
+在本机启动（或连接已运行的）web_interface 服务，用指定数量的并发客户端
+压测 /api/stats、/api/messages、/api/search 和 /ws，输出吞吐量与
+p50/p95/p99 延迟。结果为 JSON，便于在不同提交之间对比。
+
+/api/stats 和 /api/messages 有 2 秒的响应缓存，同一个地址的请求绝大多数是缓存命中，
+测的是缓存的速度；stats_uncached / messages_uncached 在每个请求的查询参数里加一个不重复的
+_nocache 值，每次都绕过缓存查询数据库。每项结果的 response_cache 字段注明属于哪一种。
+
+作者：AI助手
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+import websockets
+
+from benchmarks.http_client import HttpConnection
+
+# ai_monitor 目录（web_interface 需要在该目录下启动以找到 static/templates）
+MONITOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 请求失败（例如服务拒绝连接）后等待的秒数，避免空转占满 CPU
+ERROR_BACKOFF_SECONDS = 0.05
+
+
+@dataclass
+class BenchmarkConfig:
+    """压测配置"""
+    host: str = "127.0.0.1"
+    port: int = 8011
+    clients: int = 20  # 并发客户端数
+    duration: float = 10.0  # 每个接口压测时长（秒）
+    messages_limit: int = 50  # /api/messages 的 limit 参数
+    search_keywords: List[str] = field(default_factory=lambda: ["紧急", "FastAPI", "用户_1", "修复", "吃饭"])
+    endpoints: List[str] = field(default_factory=lambda: [
+        "stats", "stats_uncached", "messages", "messages_uncached", "search", "ws"
+    ])
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法计算百分位（输入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    """汇总一组延迟（秒）为报告数据（毫秒）"""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if count else 0.0,
+        }
+    }
+
+
+async def run_http_endpoint(config: BenchmarkConfig, paths: List[str], cache_bust: bool = False) -> Dict:
+    """
+    用 config.clients 个并发连接持续请求 paths（轮流），持续 config.duration 秒
+
+    cache_bust 为 True 时每个请求带一个不重复的 _nocache 参数，绕过服务端的响应缓存
+    """
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + config.duration
+    sequence = itertools.count()
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        conn = HttpConnection(config.host, config.port)
+        i = worker_id
+        try:
+            while time.perf_counter() < deadline:
+                path = paths[i % len(paths)]
+                i += 1
+                if cache_bust:
+                    path += f"{'&' if '?' in path else '?'}_nocache={next(sequence)}"
+                start = time.perf_counter()
+                try:
+                    status, _, _ = await conn.get(path, {"Accept-Encoding": "gzip"})
+                except Exception:
+                    errors += 1
+                    await asyncio.sleep(ERROR_BACKOFF_SECONDS)
+                    continue
+                if status >= 400:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - start)
+        finally:
+            await conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(config.clients)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_websocket(config: BenchmarkConfig) -> Dict:
+    """
+    同时打开 config.clients 个 /ws 连接
+
+    延迟为从发起连接到收到第一条 stats_update 的时间；
+    随后保持连接 config.duration 秒，统计收到的推送数量。
+    """
+    latencies: List[float] = []
+    errors = 0
+    pushes = 0
+    url = f"ws://{config.host}:{config.port}/ws"
+
+    async def client():
+        nonlocal errors, pushes
+        start = time.perf_counter()
+        try:
+            async with websockets.connect(url, max_size=None) as ws:
+                await ws.recv()
+                latencies.append(time.perf_counter() - start)
+
+                deadline = time.perf_counter() + config.duration
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        await asyncio.wait_for(ws.recv(), remaining)
+                        pushes += 1
+                    except asyncio.TimeoutError:
+                        break
+        except Exception:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(config.clients)))
+    result = summarize(latencies, errors, time.perf_counter() - start)
+    result["connections"] = result.pop("requests")
+    result["pushes_received"] = pushes
+    return result
+
+
+async def fetch_json(config: BenchmarkConfig, path: str) -> Optional[Dict]:
+    """请求一个 JSON 接口，失败时返回 None"""
+    conn = HttpConnection(config.host, config.port)
+    try:
+        status, _, body = await conn.get(path)
+        return json.loads(body) if status == 200 else None
+    except Exception:
+        return None
+    finally:
+        await conn.close()
+
+
+async def run_benchmarks(config: BenchmarkConfig) -> Dict:
+    """按配置依次压测各接口"""
+    stats = ["/api/stats"]
+    messages = [f"/api/messages?limit={config.messages_limit}"]
+    # 名称 -> (结果名, 请求地址, 是否绕过缓存, response_cache 标注)
+    http_endpoints = {
+        "stats": ("/api/stats", stats, False, "hit"),
+        "stats_uncached": ("/api/stats?_nocache", stats, True, "bypassed"),
+        "messages": ("/api/messages", messages, False, "hit"),
+        "messages_uncached": ("/api/messages?_nocache", messages, True, "bypassed"),
+        "search": ("/api/search", [f"/api/search?q={quote(keyword)}" for keyword in config.search_keywords],
+                   False, "none"),
+    }
+
+    results = {}
+    for name in config.endpoints:
+        if name == "ws":
+            results["/ws"] = await run_websocket(config)
+        else:
+            label, paths, cache_bust, cache = http_endpoints[name]
+            results[label] = {"response_cache": cache, **await run_http_endpoint(config, paths, cache_bust)}
+
+    return {
+        "results": results,
+        "cache": await fetch_json(config, "/api/cache/stats"),
+    }
+
+
+def git_commit() -> Optional[str]:
+    """当前代码的 git 提交号，便于对比不同版本的结果"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=MONITOR_DIR,
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def start_server(db_path: str, port: int, workers: int = 1) -> subprocess.Popen:
+    """以子进程方式启动 web_interface，使用指定的数据库"""
+    env = dict(os.environ, MONITOR_DB_PATH=os.path.abspath(db_path))
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "web_interface:app",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+            "--no-access-log",
+        ],
+        cwd=MONITOR_DIR,
+        env=env
+    )
+
+
+def wait_for_server(host: str, port: int, timeout: float = 30.0):
+    """等待服务端口可连接"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"服务未在 {timeout} 秒内启动: {host}:{port}")
+
+
+def run(config: BenchmarkConfig, db_path: Optional[str] = None, workers: int = 1) -> Dict:
+    """
+    运行完整压测并返回报告
+
+    Args:
+        config: 压测配置
+        db_path: 数据库路径；提供时自动启动服务，否则压测 config.host:config.port 上已运行的服务
+        workers: 自动启动服务时的工作进程数
+    """
+    server = None
+    if db_path:
+        server = start_server(db_path, config.port, workers)
+    try:
+        wait_for_server(config.host, config.port)
+        report = asyncio.run(run_benchmarks(config))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report["meta"] = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "db_path": db_path,
+        "db_size_bytes": os.path.getsize(db_path) if db_path else None,
+        "workers": workers if db_path else None,
+        "config": asdict(config),
+    }
+    return report
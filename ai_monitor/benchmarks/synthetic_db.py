@@ -0,0 +1,192 @@
+"""
+合成监控数据库
+============
+
+生成与 monitor_client 相同结构的 chat_monitor.db，用于在生产规模的数据量下
+测试 Web 监控界面的性能。
+
+数据分布尽量接近真实聊天室：
+- 用户活跃度服从幂律分布（少数用户贡献大部分消息）
+- 消息按天分布，近期消息更多（逐步增长）
+- 一天内按小时有明显的作息规律（晚间高峰、凌晨低谷）
+- 约 5% 为加入/离开聊天室的系统消息
+
+作者：AI助手
+"""
+
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+import rollup
+
+# 预设数据规模
+SIZE_PRESETS = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+# 一天24小时的相对活跃度（0点 ~ 23点）
+HOURLY_WEIGHTS = [
+    3, 2, 1, 1, 1, 1, 2, 4, 6, 8, 9, 9,
+    10, 9, 8, 8, 9, 10, 12, 14, 15, 14, 10, 6,
+]
+
+# 消息内容素材
+MESSAGE_SAMPLES = [
+    "大家好", "今天天气不错", "有人在吗？", "哈哈哈", "收到", "好的，没问题",
+    "这个问题怎么解决？", "我刚刚提交了代码", "晚上一起吃饭吗", "重要通知：明天开会",
+    "紧急！服务器报警了", "admin 请看一下", "谢谢大家", "我先下线了", "+1",
+    "有没有人用过 FastAPI？", "WebSocket 连接断开了", "已经修复", "稍等一下", "明白",
+]
+
+BATCH_SIZE = 50_000
+
+
+def parse_size(size: str) -> int:
+    """解析数据规模，支持预设名称（10k/1m/10m）或直接写行数"""
+    size = size.strip().lower()
+    if size in SIZE_PRESETS:
+        return SIZE_PRESETS[size]
+    return int(size.replace('_', ''))
+
+
+def _generate_rows(
+    rows: int,
+    users: int,
+    days: int,
+    end_time: datetime,
+    rng: random.Random
+) -> Iterator[Tuple[str, str, str, str, str]]:
+    """按时间顺序生成消息行 (timestamp, message_type, username, message, received_at)"""
+    usernames = [f"用户_{i + 1}" for i in range(users)]
+    # 幂律分布的用户权重，并预先计算累计权重以加速抽样
+    cum_user_weights = []
+    total = 0.0
+    for rank in range(1, users + 1):
+        total += 1.0 / rank ** 1.1
+        cum_user_weights.append(total)
+
+    # 每天的消息量：越接近现在越多
+    day_weights = [1.0 + 2.0 * d / max(days - 1, 1) for d in range(days)]
+    day_total = sum(day_weights)
+    day_counts = [int(rows * w / day_total) for w in day_weights]
+    day_counts[-1] += rows - sum(day_counts)
+
+    start_day = (end_time - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    hours = list(range(24))
+
+    for day_index, count in enumerate(day_counts):
+        day_start = start_day + timedelta(days=day_index)
+        sampled_hours = rng.choices(hours, weights=HOURLY_WEIGHTS, k=count)
+        offsets = sorted(h * 3600 + rng.random() * 3600 for h in sampled_hours)
+        sampled_users = rng.choices(usernames, cum_weights=cum_user_weights, k=count)
+
+        for offset, username in zip(offsets, sampled_users):
+            received = day_start + timedelta(seconds=offset)
+            # 消息发出时间略早于接收时间
+            sent = received - timedelta(milliseconds=rng.randint(1, 200))
+
+            if rng.random() < 0.05:
+                action = "加入了聊天室" if rng.random() < 0.5 else "离开了聊天室"
+                yield (sent.isoformat(), 'system', '系统', f"{username} {action}", received.isoformat())
+            else:
+                yield (sent.isoformat(), 'chat', username, rng.choice(MESSAGE_SAMPLES), received.isoformat())
+
+
+def generate_database(
+    path: str,
+    rows: int,
+    users: int = 500,
+    days: int = 90,
+    seed: int = 42,
+    end_time: Optional[datetime] = None
+) -> dict:
+    """
+    生成合成数据库
+
+    Args:
+        path: 数据库文件路径（已存在时会被覆盖）
+        rows: 消息行数
+        users: 用户数
+        days: 数据覆盖的天数（截止到 end_time）
+        seed: 随机种子，保证多次运行生成相同数据
+        end_time: 最后一条消息的时间（默认当前时间）
+
+    Returns:
+        dict: 生成结果信息
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    rng = random.Random(seed)
+    end_time = end_time or datetime.now()
+    start = time.time()
+
+    conn = sqlite3.connect(path)
+    try:
+        # 生成阶段不需要崩溃保护，关闭日志和同步以加快写入
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+
+        # 与 monitor_client.DatabaseManager 的表结构保持一致
+        conn.execute('''
+            CREATE TABLE chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                message_type TEXT NOT NULL,
+                username TEXT NOT NULL,
+                message TEXT NOT NULL,
+                received_at TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE monitor_stats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                total_messages INTEGER DEFAULT 0,
+                unique_users INTEGER DEFAULT 0,
+                connection_events INTEGER DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        batch = []
+        for row in _generate_rows(rows, users, days, end_time, rng):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                conn.executemany('''
+                    INSERT INTO chat_messages
+                    (timestamp, message_type, username, message, received_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', batch)
+                batch.clear()
+        if batch:
+            conn.executemany('''
+                INSERT INTO chat_messages
+                (timestamp, message_type, username, message, received_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', batch)
+
+        rollup_rows = rollup.rebuild_rollups(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {
+        'path': path,
+        'rows': rows,
+        'users': users,
+        'days': days,
+        'seed': seed,
+        'rollup_rows': rollup_rows,
+        'size_bytes': os.path.getsize(path),
+        'elapsed_seconds': round(time.time() - start, 2),
+    }
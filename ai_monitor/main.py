@@ -6,8 +6,13 @@ WebSocket 监控系统 - 主启动文件
 
 使用方法：
 1. 监控模式：python main.py monitor
-2. Web界面模式：python main.py web  
+2. Web界面模式：python main.py web  （多进程：python main.py web --workers 4）
 3. 同时启动：python main.py all
+4. 重建汇总表：python main.py rebuild-rollups
+5. 分析启动耗时：python main.py monitor --profile-startup
+
+各模式只在需要时才导入对应模块（例如 monitor 模式不会导入 FastAPI / uvicorn），
+以减少冷启动和子进程启动的开销。
 
 作者：AI助手
 """
@@ -23,9 +28,7 @@ import time
 # 添加当前目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from monitor_client import WebSocketMonitor, MonitorConfig
-from web_interface import app
-import uvicorn
+# 注意：monitor_client / web_interface / uvicorn 等较重的模块在各模式的启动函数中按需导入
 
 # 配置日志
 logging.basicConfig(
@@ -39,11 +42,14 @@ DEFAULT_CONFIG = {
     'websocket_url': 'ws://localhost:8000/ws/chat',
     'web_port': 8001,
     'reconnect_interval': 5,
-    'max_reconnect_attempts': 10
+    'max_reconnect_attempts': 10,
+    'web_workers': 1
 }
 
 def start_monitor(config: dict):
     """启动监控客户端"""
+    from monitor_client import WebSocketMonitor, MonitorConfig
+    
     async def run_monitor():
         monitor_config = MonitorConfig(
             server_url=config['websocket_url'],
@@ -63,10 +69,18 @@ def start_monitor(config: dict):
 
 def start_web_interface(config: dict):
     """启动Web界面"""
+    import uvicorn
+    
+    workers = config.get('web_workers', 1)
     try:
-        logger.info(f"启动Web界面，端口: {config['web_port']}")
+        logger.info(f"启动Web界面，端口: {config['web_port']}，工作进程数: {workers}")
+        if workers > 1:
+            start_web_workers(config, workers)
+            return
+        
         uvicorn.run(
-            app,
+            "web_interface:create_app",
+            factory=True,
             host="127.0.0.1",
             port=config['web_port'],
             log_level="info"
@@ -76,6 +90,33 @@ def start_web_interface(config: dict):
     except Exception as e:
         logger.error(f"Web界面运行错误: {e}")
 
+def start_web_workers(config: dict, workers: int):
+    """
+    以多工作进程模式启动Web界面
+    
+    父进程托管发布/订阅通道并运行唯一的统计数据生产者，
+    每个 uvicorn 工作进程连接该通道，把统计推送和新消息广播转发给自己的客户端。
+    """
+    import uvicorn
+    from pubsub import PUBSUB_ENV_VAR, PubSubBroker
+    from web_interface import produce_stats
+    
+    broker = PubSubBroker()
+    broker.run_in_thread(produce_stats)
+    
+    # 工作进程通过环境变量获取通道地址
+    os.environ[PUBSUB_ENV_VAR] = broker.address
+    
+    # 多进程模式下 uvicorn 需要以 "模块:对象" 的形式指定应用，每个工作进程各自调用工厂函数
+    uvicorn.run(
+        "web_interface:create_app",
+        factory=True,
+        host="127.0.0.1",
+        port=config['web_port'],
+        workers=workers,
+        log_level="info"
+    )
+
 def start_all(config: dict):
     """同时启动监控客户端和Web界面"""
     logger.info("启动完整监控系统...")
@@ -130,6 +171,20 @@ def start_all(config: dict):
                 process.terminate()
                 process.join()
 
+def rebuild_rollups(config: dict):
+    """从历史消息重建分钟/小时/天汇总表"""
+    from monitor_client import DatabaseManager
+    
+    db_path = config.get('database_path', 'data/chat_monitor.db')
+    logger.info(f"正在重建汇总表: {db_path}")
+    
+    start = time.time()
+    result = DatabaseManager(db_path).rebuild_rollups()
+    
+    for table, rows in result.items():
+        logger.info(f"{table}: {rows} 行")
+    logger.info(f"汇总表重建完成，耗时 {time.time() - start:.2f} 秒")
+
 def load_config_from_file(config_file: str) -> dict:
     """从配置文件加载配置"""
     config = DEFAULT_CONFIG.copy()
@@ -167,8 +222,8 @@ def main():
     parser = argparse.ArgumentParser(description='WebSocket 监控系统')
     parser.add_argument(
         'mode', 
-        choices=['monitor', 'web', 'all'], 
-        help='运行模式: monitor(仅监控) / web(仅Web界面) / all(全部)'
+        choices=['monitor', 'web', 'all', 'rebuild-rollups'], 
+        help='运行模式: monitor(仅监控) / web(仅Web界面) / all(全部) / rebuild-rollups(重建汇总表)'
     )
     parser.add_argument(
         '--url', 
@@ -181,6 +236,17 @@ def main():
         default=None,
         help=f'Web界面端口 (默认: {DEFAULT_CONFIG["web_port"]})'
     )
+    parser.add_argument(
+        '--workers', 
+        type=int, 
+        default=None,
+        help=f'Web界面工作进程数 (默认: {DEFAULT_CONFIG["web_workers"]})'
+    )
+    parser.add_argument(
+        '--profile-startup', 
+        action='store_true',
+        help='在新进程中分析该模式的模块导入耗时并输出报告（不启动服务）'
+    )
     parser.add_argument(
         '--config', 
         default='config.json',
@@ -189,6 +255,12 @@ def main():
     
     args = parser.parse_args()
     
+    if args.profile_startup:
+        from startup_profile import MODE_MODULES, format_report, profile_imports
+        
+        print(format_report(args.mode, profile_imports(MODE_MODULES[args.mode])))
+        return
+    
     # 创建必要的目录
     os.makedirs('logs', exist_ok=True)
     os.makedirs('data', exist_ok=True)
@@ -206,6 +278,8 @@ def main():
         config['websocket_url'] = args.url
     if args.port:
         config['web_port'] = args.port
+    if args.workers:
+        config['web_workers'] = args.workers
     
     # 显示配置信息
     logger.info("=" * 60)
@@ -214,6 +288,7 @@ def main():
     logger.info(f"运行模式: {args.mode}")
     logger.info(f"监控目标: {config['websocket_url']}")
     logger.info(f"Web端口: {config['web_port']}")
+    logger.info(f"Web工作进程: {config['web_workers']}")
     logger.info(f"重连间隔: {config['reconnect_interval']}秒")
     logger.info(f"最大重连: {config['max_reconnect_attempts']}次")
     logger.info("=" * 60)
@@ -226,6 +301,8 @@ def main():
             start_web_interface(config)
         elif args.mode == 'all':
             start_all(config)
+        elif args.mode == 'rebuild-rollups':
+            rebuild_rollups(config)
             
     except Exception as e:
         logger.error(f"启动失败: {e}")
@@ -29,6 +29,8 @@ import signal
 import sys
 import os
 
+import rollup
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -104,6 +106,9 @@ class DatabaseManager:
                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+
+            # 分钟/小时/天汇总表，首次创建时回填历史消息
+            rollup.ensure_rollups(conn)
             
     def save_message(self, message: ChatMessage):
         """保存消息到数据库"""
@@ -120,6 +125,14 @@ class DatabaseManager:
                     message.message,
                     message.received_at
                 ))
+
+                # 同一事务内增量更新汇总表
+                rollup.record_message(
+                    conn,
+                    message.message_type,
+                    message.username,
+                    message.received_at
+                )
                 
         except Exception as e:
             logger.error(f"保存消息到数据库失败: {e}")
@@ -197,6 +210,11 @@ class DatabaseManager:
             logger.error(f"获取最近消息失败: {e}")
             return []
 
+    def rebuild_rollups(self) -> Dict[str, int]:
+        """从原始消息重建所有汇总表"""
+        with sqlite3.connect(self.db_path) as conn:
+            return rollup.rebuild_rollups(conn)
+
 class WebSocketMonitor:
     """WebSocket监控器主类"""
     
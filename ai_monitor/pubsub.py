@@ -0,0 +1,223 @@
+"""
+本地发布/订阅通道
+================
+
+用于多进程（uvicorn --workers N）部署时，在各个 Web 工作进程之间共享
+统计推送和新消息广播。
+
+- PubSubBroker：由父进程托管，监听 Unix socket（不支持时退化为本机 TCP），
+  把收到的每条消息转发给所有已连接的订阅者
+- PubSubClient：工作进程使用的客户端，可以发布消息，也可以持续接收消息，
+  断线后自动重连
+
+通信协议为按行分隔的 JSON：{"channel": "...", "data": ...}
+
+作者：AI助手
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+from typing import Any, Awaitable, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 工作进程通过该环境变量获取通道地址
+PUBSUB_ENV_VAR = "MONITOR_PUBSUB_ADDRESS"
+
+
+def default_address() -> str:
+    """生成当前进程专用的通道地址"""
+    if hasattr(socket, "AF_UNIX"):
+        return "unix:" + os.path.join(tempfile.gettempdir(), f"ai_monitor_{os.getpid()}.sock")
+    # Windows 等不支持 Unix socket 的平台使用本机 TCP 端口
+    return "tcp:127.0.0.1:0"
+
+
+def encode_message(channel: str, data: Any) -> bytes:
+    """编码一条通道消息"""
+    return json.dumps({"channel": channel, "data": data}, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+async def open_connection(address: str):
+    """根据地址连接到通道"""
+    kind, _, target = address.partition(":")
+    if kind == "unix":
+        return await asyncio.open_unix_connection(target)
+    host, _, port = target.rpartition(":")
+    return await asyncio.open_connection(host, int(port))
+
+
+class PubSubBroker:
+    """发布/订阅通道服务端（由父进程托管）"""
+
+    def __init__(self, address: Optional[str] = None):
+        self.address = address or default_address()
+        self._subscribers: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.published = 0
+
+    async def start(self):
+        """开始监听"""
+        kind, _, target = self.address.partition(":")
+        if kind == "unix":
+            if os.path.exists(target):
+                os.remove(target)
+            self._server = await asyncio.start_unix_server(self._handle_client, path=target)
+        else:
+            host, _, port = target.rpartition(":")
+            self._server = await asyncio.start_server(self._handle_client, host, int(port))
+            # 端口为0时由系统分配，更新为实际地址供工作进程使用
+            bound_port = self._server.sockets[0].getsockname()[1]
+            self.address = f"tcp:{host}:{bound_port}"
+
+        logger.info(f"发布/订阅通道已启动: {self.address}")
+
+    async def stop(self):
+        """停止监听并断开所有订阅者"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in list(self._subscribers):
+            writer.close()
+        self._subscribers.clear()
+
+        kind, _, target = self.address.partition(":")
+        if kind == "unix" and os.path.exists(target):
+            os.remove(target)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个工作进程连接：转发它发布的每一行"""
+        self._subscribers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await self._fan_out(line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._subscribers.discard(writer)
+            writer.close()
+
+    async def _fan_out(self, line: bytes):
+        """把一行消息发送给所有订阅者"""
+        self.published += 1
+        subscribers = list(self._subscribers)
+        for writer in subscribers:
+            writer.write(line)
+
+        results = await asyncio.gather(
+            *(writer.drain() for writer in subscribers),
+            return_exceptions=True
+        )
+        for writer, result in zip(subscribers, results):
+            if isinstance(result, Exception):
+                self._subscribers.discard(writer)
+                writer.close()
+
+    async def publish(self, channel: str, data: Any):
+        """在父进程内直接发布消息"""
+        await self._fan_out(encode_message(channel, data))
+
+    def run_in_thread(self, *tasks: Callable[["PubSubBroker"], Awaitable[None]]) -> threading.Thread:
+        """
+        在后台线程中运行通道（父进程的主线程留给 uvicorn）
+
+        Args:
+            tasks: 额外在通道事件循环中运行的协程函数，例如统计数据生产者
+
+        Returns:
+            threading.Thread: 后台线程（通道启动完成后才返回）
+        """
+        started = threading.Event()
+
+        async def serve():
+            await self.start()
+            started.set()
+            await asyncio.gather(*(task(self) for task in tasks))
+            await asyncio.Event().wait()
+
+        def run():
+            try:
+                asyncio.run(serve())
+            except Exception as e:
+                logger.error(f"发布/订阅通道运行错误: {e}")
+                started.set()
+
+        thread = threading.Thread(target=run, name="pubsub-broker", daemon=True)
+        thread.start()
+        started.wait()
+        return thread
+
+
+class PubSubClient:
+    """发布/订阅通道客户端（工作进程使用）"""
+
+    def __init__(self, address: str, reconnect_interval: float = 1.0):
+        self.address = address
+        self.reconnect_interval = reconnect_interval
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self.is_running = False
+
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def publish(self, channel: str, data: Any) -> bool:
+        """发布一条消息，未连接时丢弃并返回 False"""
+        if not self.is_connected:
+            logger.warning(f"发布/订阅通道未连接，丢弃消息: {channel}")
+            return False
+
+        try:
+            self._writer.write(encode_message(channel, data))
+            await self._writer.drain()
+            return True
+        except ConnectionError as e:
+            logger.warning(f"发布消息失败: {e}")
+            return False
+
+    async def run(self, handler: Callable[[str, Any], Awaitable[None]]):
+        """
+        持续接收消息并交给 handler 处理，断线后自动重连
+
+        Args:
+            handler: 接收 (channel, data) 的协程函数
+        """
+        self.is_running = True
+        while self.is_running:
+            try:
+                reader, self._writer = await open_connection(self.address)
+                logger.info(f"已连接到发布/订阅通道: {self.address}")
+
+                while self.is_running:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    try:
+                        message = json.loads(line)
+                        await handler(message.get("channel", ""), message.get("data"))
+                    except Exception as e:
+                        logger.error(f"处理通道消息失败: {e}")
+
+            except (ConnectionError, FileNotFoundError, OSError) as e:
+                logger.warning(f"发布/订阅通道连接失败: {e}")
+
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+            if self.is_running:
+                await asyncio.sleep(self.reconnect_interval)
+
+    def stop(self):
+        """停止接收"""
+        self.is_running = False
+        if self._writer is not None:
+            self._writer.close()
@@ -0,0 +1,235 @@
+"""
+消息汇总（Rollup）表
+==================
+
+在 chat_messages 原始表之外维护按 分钟 / 小时 / 天 预聚合的计数表，
+每行记录某个时间桶内某个用户某种消息类型的消息数量。
+
+- 写入路径：监控客户端每保存一条消息，同一事务内对三张汇总表各做一次 +1
+- 重建：rebuild_rollups() 从原始消息表重新计算全部历史数据
+- 查询：query_timeseries() 根据请求的时间粒度选择最粗的可用汇总表
+
+时间桶直接取 received_at（ISO 格式）的前缀，例如：
+    分钟 -> 2025-09-13T16:50
+    小时 -> 2025-09-13T16
+    天   -> 2025-09-13
+
+作者：AI助手
+"""
+
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# 汇总级别：(名称, 表名, 时间桶前缀长度, 桶宽度秒数)，按粒度从粗到细排列
+ROLLUP_LEVELS: List[Tuple[str, str, int, int]] = [
+    ('day', 'rollup_day', 10, 86400),
+    ('hour', 'rollup_hour', 13, 3600),
+    ('minute', 'rollup_minute', 16, 60),
+]
+
+# 各级别时间桶字符串的解析格式
+BUCKET_FORMATS = {
+    'day': '%Y-%m-%d',
+    'hour': '%Y-%m-%dT%H',
+    'minute': '%Y-%m-%dT%H:%M',
+}
+
+# bucket 参数的单位换算
+BUCKET_UNITS = {
+    's': 1,
+    'm': 60,
+    'h': 3600,
+    'd': 86400,
+    'w': 7 * 86400,
+}
+
+
+def rollup_tables_exist(conn: sqlite3.Connection) -> bool:
+    """检查汇总表是否已经创建"""
+    row = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (?, ?, ?)",
+        tuple(level[1] for level in ROLLUP_LEVELS)
+    ).fetchone()
+    return row[0] == len(ROLLUP_LEVELS)
+
+
+def create_rollup_tables(conn: sqlite3.Connection) -> bool:
+    """
+    创建汇总表（如不存在）
+
+    Returns:
+        bool: 本次调用是否新建了汇总表（新建时调用方应重建历史数据）
+    """
+    if rollup_tables_exist(conn):
+        return False
+
+    for _, table, _, _ in ROLLUP_LEVELS:
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket TEXT NOT NULL,
+                message_type TEXT NOT NULL,
+                username TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, message_type, username)
+            ) WITHOUT ROWID
+        ''')
+    return True
+
+
+def ensure_rollups(conn: sqlite3.Connection):
+    """确保汇总表存在；首次创建时从原始消息表回填历史数据"""
+    if create_rollup_tables(conn):
+        rebuild_rollups(conn)
+
+
+def record_message(conn: sqlite3.Connection, message_type: str, username: str, received_at: str):
+    """
+    增量更新汇总表（在保存消息的同一事务内调用）
+
+    Args:
+        conn: 数据库连接
+        message_type: 消息类型
+        username: 用户名
+        received_at: 接收时间（ISO 格式字符串）
+    """
+    for _, table, prefix_len, _ in ROLLUP_LEVELS:
+        conn.execute(f'''
+            INSERT INTO {table} (bucket, message_type, username, count)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT (bucket, message_type, username)
+            DO UPDATE SET count = count + 1
+        ''', (received_at[:prefix_len], message_type, username))
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    从 chat_messages 重新计算所有汇总表
+
+    Returns:
+        Dict[str, int]: 每张汇总表重建后的行数
+    """
+    create_rollup_tables(conn)
+
+    result = {}
+    for _, table, prefix_len, _ in ROLLUP_LEVELS:
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f'''
+            INSERT INTO {table} (bucket, message_type, username, count)
+            SELECT substr(received_at, 1, {prefix_len}), message_type, username, COUNT(*)
+            FROM chat_messages
+            GROUP BY 1, 2, 3
+        ''')
+        result[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return result
+
+
+def parse_bucket(bucket: str) -> int:
+    """
+    解析时间粒度参数，返回秒数
+
+    支持纯数字（秒）或 数字+单位，例如 "90"、"5m"、"1h"、"1d"、"1w"，
+    也支持 "minute" / "hour" / "day" 这样的级别名称。
+    """
+    bucket = bucket.strip().lower()
+    for name, _, _, seconds in ROLLUP_LEVELS:
+        if bucket == name:
+            return seconds
+
+    match = re.fullmatch(r'(\d+)\s*([smhdw]?)', bucket)
+    if not match:
+        raise ValueError(f"无效的时间粒度: {bucket}")
+
+    seconds = int(match.group(1)) * BUCKET_UNITS[match.group(2) or 's']
+    if seconds <= 0:
+        raise ValueError(f"时间粒度必须大于0: {bucket}")
+    return seconds
+
+
+def choose_level(bucket_seconds: int) -> Tuple[str, str, int, int]:
+    """选择能整除请求粒度的最粗汇总级别"""
+    for level in ROLLUP_LEVELS:
+        if bucket_seconds % level[3] == 0:
+            return level
+    raise ValueError("时间粒度必须是60秒的整数倍")
+
+
+def to_local_naive(dt: datetime) -> datetime:
+    """
+    把带时区的时间（例如 2025-09-01T00:00:00Z）换算成本地时间并去掉时区
+
+    数据库中的 received_at 都是不带时区的本地时间，查询参数要先换算成同样的形式才能比较
+    """
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def _floor_time(dt: datetime, bucket_seconds: int) -> datetime:
+    """把时间向下对齐到 bucket_seconds 的整数倍"""
+    epoch = datetime(1970, 1, 1)
+    offset = int((dt - epoch).total_seconds())
+    return epoch + timedelta(seconds=offset - offset % bucket_seconds)
+
+
+def query_timeseries(
+    conn: sqlite3.Connection,
+    start: datetime,
+    end: datetime,
+    bucket_seconds: int,
+    message_type: Optional[str] = None,
+    username: Optional[str] = None
+) -> Dict:
+    """
+    按请求粒度查询时间序列
+
+    Args:
+        conn: 数据库连接
+        start: 开始时间（包含），带时区时换算成本地时间
+        end: 结束时间（不包含），带时区时换算成本地时间
+        bucket_seconds: 请求的时间粒度（秒）
+        message_type: 只统计指定类型的消息（可选）
+        username: 只统计指定用户的消息（可选）
+
+    Returns:
+        Dict: 包含所用汇总表和每个时间桶计数的结果
+    """
+    name, table, prefix_len, level_seconds = choose_level(bucket_seconds)
+    bucket_format = BUCKET_FORMATS[name]
+    start, end = to_local_naive(start), to_local_naive(end)
+
+    # 汇总表的桶字符串与时间顺序一致，可以直接做范围比较；
+    # end 不在桶边界上时，需要包含 end 所在的那个桶
+    end_op = '<' if _floor_time(end, level_seconds) == end else '<='
+    sql = f'''
+        SELECT bucket, message_type, SUM(count)
+        FROM {table}
+        WHERE bucket >= ? AND bucket {end_op} ?
+    '''
+    params = [start.isoformat()[:prefix_len], end.isoformat()[:prefix_len]]
+    if message_type:
+        sql += " AND message_type = ?"
+        params.append(message_type)
+    if username:
+        sql += " AND username = ?"
+        params.append(username)
+    sql += " GROUP BY bucket, message_type ORDER BY bucket"
+
+    series: Dict[datetime, Dict] = {}
+    for bucket, msg_type, count in conn.execute(sql, params):
+        point_time = _floor_time(datetime.strptime(bucket, bucket_format), bucket_seconds)
+        point = series.setdefault(point_time, {'total': 0, 'by_type': {}})
+        point['total'] += count
+        point['by_type'][msg_type] = point['by_type'].get(msg_type, 0) + count
+
+    return {
+        'source': table,
+        'bucket_seconds': bucket_seconds,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'series': [
+            {'time': point_time.isoformat(), **point}
+            for point_time, point in sorted(series.items())
+        ]
+    }
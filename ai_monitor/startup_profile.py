@@ -0,0 +1,98 @@
+"""
+启动耗时分析
+==========
+
+在全新的子进程中用 `python -X importtime` 导入指定模块，解析每个模块的
+自身耗时和累计耗时，用于对比各运行模式的冷启动开销。
+
+作者：AI助手
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# 各运行模式在启动时需要导入的模块
+MODE_MODULES = {
+    'monitor': ['monitor_client'],
+    'web': ['web_interface', 'uvicorn'],
+    'all': ['monitor_client', 'web_interface', 'uvicorn'],
+    'rebuild-rollups': ['monitor_client'],
+}
+
+
+def profile_imports(modules: List[str], cwd: str = None) -> Dict:
+    """
+    在新进程中导入模块并收集 importtime 数据
+
+    Args:
+        modules: 要导入的模块名列表
+        cwd: 子进程的工作目录（默认本文件所在目录）
+
+    Returns:
+        Dict: 包含每个模块耗时（微秒）和整体耗时的结果
+    """
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    code = "; ".join(f"import {module}" for module in modules) or "pass"
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace"
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+        })
+
+    return {
+        'modules': modules,
+        'entries': entries,
+        'total_import_us': sum(e['cumulative_us'] for e in entries if e['depth'] == 0),
+        'modules_import_us': sum(
+            e['cumulative_us'] for e in entries if e['depth'] == 0 and e['module'] in modules
+        ),
+        'process_wall_ms': round(wall_ms, 1),
+        'returncode': result.returncode,
+    }
+
+
+def format_report(mode: str, profile: Dict, top: int = 20) -> str:
+    """把耗时分析结果格式化为文本报告"""
+    lines = [
+        "=" * 60,
+        f"启动耗时分析 - 模式: {mode}",
+        f"导入模块: {', '.join(profile['modules'])}",
+        f"目标模块导入耗时: {profile['modules_import_us'] / 1000:.1f} ms",
+        f"导入总耗时（含 site 等解释器自身模块）: {profile['total_import_us'] / 1000:.1f} ms",
+        f"子进程总耗时（含解释器启动）: {profile['process_wall_ms']:.1f} ms",
+        "-" * 60,
+        f"{'累计(ms)':>10} {'自身(ms)':>10}  模块",
+    ]
+
+    slowest = sorted(profile['entries'], key=lambda e: e['cumulative_us'], reverse=True)[:top]
+    for entry in slowest:
+        lines.append(
+            f"{entry['cumulative_us'] / 1000:>10.1f} {entry['self_us'] / 1000:>10.1f}  "
+            f"{'  ' * entry['depth']}{entry['module']}"
+        )
+
+    if profile['returncode'] != 0:
+        lines.append("⚠️  导入过程中出现错误，结果可能不完整")
+    lines.append("=" * 60)
+    return "\n".join(lines)
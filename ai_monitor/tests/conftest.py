@@ -0,0 +1,6 @@
+"""ai_monitor 的模块按平铺方式导入（和 main.py 启动时一样），测试前把 ai_monitor 目录加入 sys.path"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
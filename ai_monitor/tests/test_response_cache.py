@@ -0,0 +1,58 @@
+"""
+监控面板响应缓存的 ETag 测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_monitor/tests
+"""
+
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+import web_interface
+from benchmarks.synthetic_db import generate_database
+from web_interface import ResponseCache
+
+
+def make_db(path: str) -> str:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_etag_identifies_content_across_caches(tmp_path):
+    # 两个缓存相当于重启前后或两个工作进程：各自连接的 data_version 相同，内容不同时 ETag 必须不同
+    db_path = make_db(str(tmp_path / "a.db"))
+    first = ResponseCache(db_path).get("/api/stats", lambda: b'{"total": 1}')
+    second = ResponseCache(db_path).get("/api/stats", lambda: b'{"total": 2}')
+    again = ResponseCache(db_path).get("/api/stats", lambda: b'{"total": 1}')
+    assert first.data_version == second.data_version
+    assert first.etag != second.etag
+    assert first.etag == again.etag
+
+
+def test_etag_can_ignore_volatile_fields(tmp_path):
+    db_path = make_db(str(tmp_path / "a.db"))
+    cache = ResponseCache(db_path, ttl=0)
+    first = cache.get("/api/stats", lambda: (b'{"total": 1, "last_updated": "a"}', b'{"total": 1}'))
+    second = cache.get("/api/stats", lambda: (b'{"total": 1, "last_updated": "b"}', b'{"total": 1}'))
+    assert first is not second
+    assert first.etag == second.etag
+    assert second.body == b'{"total": 1, "last_updated": "b"}'
+
+
+def test_stats_not_modified_after_ttl_rebuild(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "chat_monitor.db")
+    generate_database(db_path, rows=200, users=5, days=1)
+    monkeypatch.setattr(web_interface.monitor_interface, "db_path", db_path)
+    # TTL 为 0：每次请求都重新生成，last_updated 每次都不同
+    monkeypatch.setattr(web_interface, "response_cache", ResponseCache(db_path, ttl=0))
+    client = TestClient(web_interface.create_app())
+
+    response = client.get("/api/stats")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    again = client.get("/api/stats", headers={"If-None-Match": etag})
+    assert again.status_code == 304
@@ -0,0 +1,54 @@
+"""
+/api/timeseries 的时间参数测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_monitor/tests
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import web_interface
+from benchmarks.synthetic_db import generate_database
+
+END_TIME = datetime(2025, 9, 2, 12, 0, 0)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "chat_monitor.db")
+    generate_database(db_path, rows=2000, users=20, days=3, end_time=END_TIME)
+    monkeypatch.setattr(web_interface.monitor_interface, "db_path", db_path)
+    return TestClient(web_interface.create_app())
+
+
+def local(value: str) -> str:
+    """带时区的 ISO 时间换算成不带时区的本地时间"""
+    return datetime.fromisoformat(value).astimezone().replace(tzinfo=None).isoformat()
+
+
+@pytest.mark.parametrize("start, end", [
+    ("2025-09-01T00:00:00Z", "2025-09-02T00:00:00Z"),
+    ("2025-09-01T08:00:00+08:00", "2025-09-02T08:00:00+08:00"),
+])
+def test_aware_range_matches_local_range(client, start, end):
+    response = client.get("/api/timeseries", params={"from": start, "to": end, "bucket": "1h"})
+    assert response.status_code == 200
+    expected = client.get("/api/timeseries", params={"from": local(start), "to": local(end), "bucket": "1h"})
+    assert response.json()["series"] == expected.json()["series"]
+    assert sum(point["total"] for point in response.json()["series"]) > 0
+
+
+def test_aware_from_with_default_to(client):
+    start = (datetime.now(timezone.utc) - timedelta(hours=6)).isoformat().replace("+00:00", "Z")
+    response = client.get("/api/timeseries", params={"from": start, "bucket": "1h"})
+    assert response.status_code == 200
+
+
+def test_aware_from_after_to_is_rejected(client):
+    response = client.get("/api/timeseries", params={
+        "from": "2025-09-02T00:00:00Z", "to": "2025-09-01T00:00:00Z", "bucket": "1h",
+    })
+    assert response.status_code == 400
@@ -8,35 +8,49 @@ WebSocket 监控 Web 界面
 作者：AI助手
 """
 
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import uvicorn
 import asyncio
 import json
 import sqlite3
 import os
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Tuple, Union
 import logging
 
+import rollup
+from pubsub import PUBSUB_ENV_VAR, PubSubBroker, PubSubClient
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(
-    title="WebSocket 监控面板",
-    description="实时监控 WebSocket 聊天数据"
-)
+# 静态文件和模板目录（按本文件位置解析，不依赖启动时的工作目录）
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# 设置静态文件和模板
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# 路由统一注册在 router 上，由 create_app() 组装成应用
+router = APIRouter()
 
 # WebSocket连接管理
 connected_clients: List[WebSocket] = []
 
+# 响应缓存配置
+CACHE_MAX_ENTRIES = 256  # 最多缓存的响应数
+CACHE_TTL_SECONDS = 2.0  # 缓存有效期（秒）
+GZIP_MIN_SIZE = 1024  # 超过该字节数的响应进行 gzip 压缩
+
+# 统计数据推送间隔（秒）
+STATS_PUSH_INTERVAL = 5
+
+# 多进程模式下连接父进程发布/订阅通道的客户端（单进程模式为 None）
+pubsub_client: Optional[PubSubClient] = None
+
 class MonitorWebInterface:
     """监控Web界面类"""
     
@@ -50,28 +64,30 @@ class MonitorWebInterface:
                 return self._empty_stats()
                 
             with sqlite3.connect(self.db_path) as conn:
+                # 统计全部来自预聚合的汇总表，不再扫描原始消息表
+                rollup.ensure_rollups(conn)
                 cursor = conn.cursor()
                 
                 # 基础统计
-                cursor.execute("SELECT COUNT(*) FROM chat_messages")
+                cursor.execute("SELECT SUM(count) FROM rollup_day")
                 total_messages = cursor.fetchone()[0] or 0
                 
-                cursor.execute("SELECT COUNT(DISTINCT username) FROM chat_messages WHERE username != '系统'")
+                cursor.execute("SELECT COUNT(DISTINCT username) FROM rollup_day WHERE username != '系统'")
                 unique_users = cursor.fetchone()[0] or 0
                 
                 # 今日统计
                 today = datetime.now().strftime('%Y-%m-%d')
                 cursor.execute("""
-                    SELECT COUNT(*) FROM chat_messages 
-                    WHERE DATE(received_at) = ? AND message_type = 'chat'
+                    SELECT SUM(count) FROM rollup_day 
+                    WHERE bucket = ? AND message_type = 'chat'
                 """, (today,))
                 today_messages = cursor.fetchone()[0] or 0
                 
                 # 活跃用户（今日）
                 cursor.execute("""
-                    SELECT username, COUNT(*) as count 
-                    FROM chat_messages 
-                    WHERE DATE(received_at) = ? AND message_type = 'chat' AND username != '系统'
+                    SELECT username, SUM(count) as count 
+                    FROM rollup_day 
+                    WHERE bucket = ? AND message_type = 'chat' AND username != '系统'
                     GROUP BY username 
                     ORDER BY count DESC 
                     LIMIT 10
@@ -80,22 +96,22 @@ class MonitorWebInterface:
                 
                 # 最近7天的消息统计
                 cursor.execute("""
-                    SELECT DATE(received_at) as date, COUNT(*) as count
-                    FROM chat_messages 
-                    WHERE received_at >= DATE('now', '-7 days') AND message_type = 'chat'
-                    GROUP BY DATE(received_at)
+                    SELECT bucket as date, SUM(count) as count
+                    FROM rollup_day 
+                    WHERE bucket >= DATE('now', '-7 days') AND message_type = 'chat'
+                    GROUP BY bucket
                     ORDER BY date DESC
                 """)
                 daily_stats = cursor.fetchall()
                 
                 # 每小时消息分布（今日）
                 cursor.execute("""
-                    SELECT CAST(strftime('%H', received_at) AS INTEGER) as hour, COUNT(*) as count
-                    FROM chat_messages 
-                    WHERE DATE(received_at) = ? AND message_type = 'chat'
+                    SELECT CAST(substr(bucket, 12, 2) AS INTEGER) as hour, SUM(count) as count
+                    FROM rollup_hour 
+                    WHERE bucket BETWEEN ? AND ? AND message_type = 'chat'
                     GROUP BY hour
                     ORDER BY hour
-                """, (today,))
+                """, (f"{today}T00", f"{today}T23"))
                 hourly_stats = cursor.fetchall()
                 
                 return {
@@ -186,34 +202,204 @@ class MonitorWebInterface:
         except Exception as e:
             logger.error(f"搜索消息失败: {e}")
             return []
+    
+    def get_timeseries(
+        self,
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+        message_type: Optional[str] = None,
+        username: Optional[str] = None
+    ) -> Dict:
+        """从汇总表获取时间序列数据"""
+        if not os.path.exists(self.db_path):
+            return {'source': None, 'bucket_seconds': bucket_seconds, 'series': []}
+        
+        with sqlite3.connect(self.db_path) as conn:
+            rollup.ensure_rollups(conn)
+            return rollup.query_timeseries(conn, start, end, bucket_seconds, message_type, username)
+
+class CachedResponse:
+    """缓存的响应内容（已编码的字节、ETag 和可选的 gzip 版本）"""
+    
+    def __init__(self, body: bytes, media_type: str, data_version: Optional[int], etag_content: Optional[bytes] = None):
+        self.body = body
+        self.media_type = media_type
+        self.data_version = data_version
+        self.created_at = time.monotonic()
+        
+        # ETag 取响应内容的哈希：PRAGMA data_version 只在同一个连接内有意义，
+        # 重启后或不同工作进程之间会重复，不能用来标识内容。
+        # 响应里有每次生成都会变的字段（例如生成时间）时，用 etag_content（去掉这些字段的内容）计算
+        content = body if etag_content is None else etag_content
+        self.etag = '"' + hashlib.blake2b(content, digest_size=16).hexdigest() + '"'
+        self.gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+
+
+class ResponseCache:
+    """
+    响应缓存
+    
+    - LRU + TTL，按 接口路径 + 查询参数 作为缓存键
+    - 通过 SQLite 的 PRAGMA data_version 检测其他连接（监控客户端）的写入，
+      数据库变化时整个缓存失效
+    - 支持 ETag / If-None-Match 条件请求（返回 304）和 gzip 压缩
+    """
+    
+    def __init__(self, db_path: str, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+    
+    def _current_data_version(self) -> Optional[int]:
+        """读取数据库的 data_version（需要一直使用同一个连接才能感知其他连接的提交）"""
+        if not os.path.exists(self.db_path):
+            return None
+        
+        try:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"读取 data_version 失败: {e}")
+            self._conn = None
+            return None
+    
+    @staticmethod
+    def make_key(request: Request) -> str:
+        """根据接口路径和排序后的查询参数生成缓存键"""
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{params}"
+    
+    def get(
+        self,
+        key: str,
+        builder: Callable[[], Union[bytes, Tuple[bytes, bytes]]],
+        media_type: str = "application/json"
+    ) -> CachedResponse:
+        """
+        获取缓存的响应，未命中或已失效时调用 builder 重新生成
+
+        builder 返回响应体，或者 (响应体, 计算 ETag 用的内容)
+        """
+        data_version = self._current_data_version()
+        if data_version != self._data_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._data_version = data_version
+        
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.created_at < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        
+        self.misses += 1
+        result = builder()
+        body, etag_content = result if isinstance(result, tuple) else (result, None)
+        entry = CachedResponse(body, media_type, data_version, etag_content)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+    
+    def respond(self, request: Request, entry: CachedResponse) -> Response:
+        """根据请求头把缓存条目转换为响应（304 / gzip / 原始内容）"""
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding"
+        }
+        
+        if_none_match = request.headers.get("if-none-match", "")
+        if entry.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        
+        if entry.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(entry.gzip_body, media_type=entry.media_type, headers=headers)
+        
+        return Response(entry.body, media_type=entry.media_type, headers=headers)
+    
+    def stats(self) -> Dict:
+        """缓存命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "data_version": self._data_version
+        }
+
 
-# 创建监控接口实例
-monitor_interface = MonitorWebInterface()
+def _encode_json(data) -> bytes:
+    """与 JSONResponse 相同的 JSON 编码方式"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _build_stats() -> Tuple[bytes, bytes]:
+    """统计数据的响应体，以及计算 ETag 用的内容（去掉每次生成都会变的 last_updated）"""
+    stats = monitor_interface.get_statistics()
+    etag_content = _encode_json({key: value for key, value in stats.items() if key != "last_updated"})
+    return _encode_json(stats), etag_content
 
-@app.get("/", response_class=HTMLResponse)
+# 创建监控接口实例（可通过环境变量 MONITOR_DB_PATH 指定数据库，例如性能测试时使用合成数据库）
+monitor_interface = MonitorWebInterface(os.environ.get("MONITOR_DB_PATH", "data/chat_monitor.db"))
+
+# 创建响应缓存实例
+response_cache = ResponseCache(monitor_interface.db_path)
+
+@router.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
     """监控面板主页"""
-    stats = monitor_interface.get_statistics()
-    recent_messages = monitor_interface.get_recent_messages(20)
+    def render() -> bytes:
+        stats = monitor_interface.get_statistics()
+        recent_messages = monitor_interface.get_recent_messages(20)
+        return request.app.state.templates.get_template("dashboard.html").render(
+            stats=stats,
+            recent_messages=recent_messages
+        ).encode("utf-8")
     
-    return templates.TemplateResponse("dashboard.html", {
-        "request": request,
-        "stats": stats,
-        "recent_messages": recent_messages
-    })
+    entry = response_cache.get(response_cache.make_key(request), render, media_type="text/html")
+    return response_cache.respond(request, entry)
 
-@app.get("/api/stats")
-async def get_stats():
+@router.get("/api/stats")
+async def get_stats(request: Request):
     """获取统计数据API"""
-    return JSONResponse(monitor_interface.get_statistics())
+    entry = response_cache.get(response_cache.make_key(request), _build_stats)
+    return response_cache.respond(request, entry)
 
-@app.get("/api/messages")
-async def get_messages(limit: int = 50):
+@router.get("/api/messages")
+async def get_messages(request: Request, limit: int = 50):
     """获取消息列表API"""
-    messages = monitor_interface.get_recent_messages(limit)
-    return JSONResponse({"messages": messages})
+    entry = response_cache.get(
+        response_cache.make_key(request),
+        lambda: _encode_json({"messages": monitor_interface.get_recent_messages(limit)})
+    )
+    return response_cache.respond(request, entry)
+
+@router.get("/api/cache/stats")
+async def get_cache_stats():
+    """获取响应缓存命中统计"""
+    return JSONResponse(response_cache.stats())
 
-@app.get("/api/search")
+@router.get("/api/search")
 async def search_messages(q: str, limit: int = 100):
     """搜索消息API"""
     if not q or len(q.strip()) < 2:
@@ -222,23 +408,58 @@ async def search_messages(q: str, limit: int = 100):
     messages = monitor_interface.search_messages(q.strip(), limit)
     return JSONResponse({"messages": messages, "keyword": q})
 
-@app.websocket("/ws")
+@router.get("/api/timeseries")
+async def get_timeseries(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    bucket: str = "1h",
+    message_type: Optional[str] = None,
+    username: Optional[str] = None
+):
+    """
+    时间序列API
+    
+    from/to 为 ISO 格式时间（默认最近24小时），带时区（如 2025-09-01T00:00:00Z）时换算成服务器本地时间；
+    bucket 为时间粒度（如 5m、1h、1d），自动选择能满足该粒度的最粗汇总表。
+    """
+    try:
+        end_time = rollup.to_local_naive(datetime.fromisoformat(end)) if end else datetime.now()
+        start_time = rollup.to_local_naive(datetime.fromisoformat(start)) if start else end_time - timedelta(days=1)
+        bucket_seconds = rollup.parse_bucket(bucket)
+        rollup.choose_level(bucket_seconds)
+    except ValueError as e:
+        return JSONResponse({"error": f"参数错误: {e}"}, status_code=400)
+    
+    if start_time >= end_time:
+        return JSONResponse({"error": "from 必须早于 to"}, status_code=400)
+    
+    try:
+        data = monitor_interface.get_timeseries(start_time, end_time, bucket_seconds, message_type, username)
+    except Exception as e:
+        logger.error(f"获取时间序列失败: {e}")
+        return JSONResponse({"error": "获取时间序列失败"}, status_code=500)
+    
+    return JSONResponse(data)
+
+@router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket端点，用于实时更新数据"""
     await websocket.accept()
     connected_clients.append(websocket)
     
     try:
+        if pubsub_client is not None:
+            # 多进程模式：统计数据由父进程统一推送，先发送一次当前数据，然后等待客户端断开
+            await websocket.send_text(_stats_update_text())
+            while True:
+                await websocket.receive_text()
+        
         while True:
             # 定期发送更新数据
-            stats = monitor_interface.get_statistics()
-            await websocket.send_text(json.dumps({
-                "type": "stats_update",
-                "data": stats
-            }))
+            await websocket.send_text(_stats_update_text())
             
             # 每5秒更新一次
-            await asyncio.sleep(5)
+            await asyncio.sleep(STATS_PUSH_INTERVAL)
             
     except WebSocketDisconnect:
         connected_clients.remove(websocket)
@@ -247,38 +468,126 @@ async def websocket_endpoint(websocket: WebSocket):
         if websocket in connected_clients:
             connected_clients.remove(websocket)
 
-async def broadcast_new_message(message_data: Dict):
-    """广播新消息到所有连接的客户端"""
+def _stats_update_text() -> str:
+    """生成统计推送消息（与 /api/stats 共用缓存，多个面板同时轮询时只查询一次数据库）"""
+    entry = response_cache.get("/api/stats?", _build_stats)
+    return '{"type":"stats_update","data":' + entry.body.decode("utf-8") + '}'
+
+async def _send_to_local_clients(text: str):
+    """发送消息到本进程内所有连接的客户端"""
     if not connected_clients:
         return
     
-    message = {
-        "type": "new_message",
-        "data": message_data
-    }
-    
     # 要移除的客户端列表
     clients_to_remove = []
     
-    for client in connected_clients:
+    for client in list(connected_clients):
         try:
-            await client.send_text(json.dumps(message))
+            await client.send_text(text)
         except Exception:
             clients_to_remove.append(client)
     
     # 移除断开的客户端
     for client in clients_to_remove:
-        connected_clients.remove(client)
+        if client in connected_clients:
+            connected_clients.remove(client)
+
+async def _relay_from_pubsub(channel: str, data):
+    """把发布/订阅通道上的消息转发给本工作进程的客户端（通道名即消息类型）"""
+    await _send_to_local_clients(json.dumps({"type": channel, "data": data}, ensure_ascii=False))
+
+async def broadcast_new_message(message_data: Dict):
+    """广播新消息到所有连接的客户端（多进程模式下经由通道发送到所有工作进程）"""
+    if pubsub_client is not None:
+        await pubsub_client.publish("new_message", message_data)
+        return
+    
+    message = {
+        "type": "new_message",
+        "data": message_data
+    }
+    await _send_to_local_clients(json.dumps(message, ensure_ascii=False))
+
+async def produce_stats(broker: PubSubBroker):
+    """
+    统计数据生产者（多进程模式下在父进程的通道线程中运行）
+    
+    每个推送周期只计算一次统计数据，发布给所有工作进程。
+    """
+    while True:
+        try:
+            stats = await asyncio.to_thread(monitor_interface.get_statistics)
+            await broker.publish("stats_update", stats)
+        except Exception as e:
+            logger.error(f"发布统计数据失败: {e}")
+        
+        await asyncio.sleep(STATS_PUSH_INTERVAL)
 
-@app.on_event("startup")
 async def startup_event():
     """启动事件"""
+    global pubsub_client
+    
+    # 由 main.py 以多进程模式启动时，连接父进程托管的发布/订阅通道
+    address = os.environ.get(PUBSUB_ENV_VAR)
+    if address:
+        pubsub_client = PubSubClient(address)
+        asyncio.create_task(pubsub_client.run(_relay_from_pubsub))
+        logger.info(f"工作进程 {os.getpid()} 使用共享通道: {address}")
+    
     logger.info("WebSocket监控面板启动成功")
     logger.info("访问地址: http://localhost:8001")
 
+async def shutdown_event():
+    """关闭事件"""
+    if pubsub_client is not None:
+        pubsub_client.stop()
+
+def create_app(static_dir: Optional[str] = None, templates_dir: Optional[str] = None) -> FastAPI:
+    """
+    创建 Web 界面应用
+    
+    Args:
+        static_dir: 静态文件目录（默认为本文件所在目录下的 static）
+        templates_dir: 模板目录（默认为本文件所在目录下的 templates）
+    
+    Returns:
+        FastAPI: 注册好路由、静态文件和模板的应用
+    """
+    app = FastAPI(
+        title="WebSocket 监控面板",
+        description="实时监控 WebSocket 聊天数据"
+    )
+    
+    # 设置静态文件和模板
+    app.mount("/static", StaticFiles(directory=static_dir or os.path.join(BASE_DIR, "static")), name="static")
+    app.state.templates = Jinja2Templates(directory=templates_dir or os.path.join(BASE_DIR, "templates"))
+    
+    app.include_router(router)
+    app.on_event("startup")(startup_event)
+    app.on_event("shutdown")(shutdown_event)
+    return app
+
+_app: Optional[FastAPI] = None
+
+def __getattr__(name: str):
+    """
+    按需创建模块级 app，兼容 uvicorn "web_interface:app" 的启动方式
+    
+    只导入本模块（例如父进程运行统计数据生产者）时不会创建应用。
+    """
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
+    import uvicorn
+    
     uvicorn.run(
-        "web_interface:app",
+        "web_interface:create_app",
+        factory=True,
         host="127.0.0.1",
         port=8001,
         reload=True,
@@ -0,0 +1,145 @@
+"""
+热点接口的 ASGI 快速通道
+=====================
+
+uvicorn_tutorial.py 里的 simple_app 说明了：直接写 ASGI 函数没有任何框架开销。
+GET /health、GET /items/{item_id} 这种被频繁调用又很简单的接口，经过 FastAPI 时要走
+路由匹配、参数解析和校验、依赖注入、response_model 校验、jsonable_encoder、JSONResponse 等步骤。
+
+FastPathMiddleware 放在 FastAPI 前面，把指定的 GET 路由交给原始 ASGI 处理函数：
+- 响应头预先拼好；固定内容（/health）的响应体在启动时就编码好
+- 按 ID 查询的响应体编码一次后缓存，数据版本号（存储后端的 data_version）变化时清空
+- 处理函数只处理最常见的情况（例如 ID 是普通数字且物品存在），其他情况
+  （参数格式不对、404、非 GET 请求）原样交给 FastAPI，错误响应和原来完全一样
+
+使用方法：
+    app.add_middleware(FastPathMiddleware, routes={
+        "/health": StaticJSON(HEALTH),
+        "/items/{item_id}": CachedLookup(db.get_item, db.data_version, model=Item),
+    })
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import json
+from typing import Awaitable, Callable, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+JSON_CONTENT_TYPE = (b"content-type", b"application/json")
+
+
+def encode_json(content) -> bytes:
+    """和 FastAPI 的 JSONResponse 相同的编码方式（不转义中文、没有多余空格）"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_messages(body: bytes):
+    """预先构造好的 http.response.start / http.response.body 消息"""
+    start = {
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [JSON_CONTENT_TYPE, (b"content-length", str(len(body)).encode())],
+    }
+    return start, {"type": "http.response.body", "body": body}
+
+
+class StaticJSON:
+    """内容固定的接口：启动时编码一次，之后每个请求直接发送"""
+
+    def __init__(self, content):
+        self.start, self.body = json_messages(encode_json(content))
+
+    async def __call__(self, param: Optional[str], send) -> bool:
+        await send(self.start)
+        await send(self.body)
+        return True
+
+
+class CachedLookup:
+    """
+    按整数 ID 查询的接口：查询结果编码后缓存，数据版本号变化时清空缓存
+
+    ID 不是普通的非负整数、或者查不到时返回 False，由 FastAPI 处理（返回 422 / 404）。
+    """
+
+    def __init__(self, lookup: Callable[[int], Awaitable[Optional[Dict]]], version: Callable[[], int],
+                 model: Optional[Type[BaseModel]] = None, max_entries: int = 100000):
+        """
+        Args:
+            lookup: 根据 ID 查询记录的异步函数，查不到返回 None
+            version: 返回当前数据版本号的函数（必须很快，每个请求调用一次）
+            model: 接口的 response_model，编码前先按它整理字段（字段顺序、类型转换和 FastAPI 一致）
+            max_entries: 最多缓存的响应数，超出时清空
+        """
+        self.lookup = lookup
+        self.version = version
+        self.model = model
+        self.max_entries = max_entries
+        self._messages: Dict[int, tuple] = {}
+        self._version: Optional[int] = None
+
+    async def __call__(self, param: Optional[str], send) -> bool:
+        if not (param and param.isascii() and param.isdigit()):
+            return False
+        key = int(param)
+
+        version = self.version()
+        if version != self._version:
+            self._messages.clear()
+            self._version = version
+
+        messages = self._messages.get(key)
+        if messages is None:
+            record = await self.lookup(key)
+            if record is None:
+                return False
+            if self.model is not None:
+                record = self.model(**record).model_dump(mode="json")
+            messages = json_messages(encode_json(record))
+            # 查询期间数据被修改过：结果可能是旧数据，只发送不缓存
+            if self.version() == version:
+                if len(self._messages) >= self.max_entries:
+                    self._messages.clear()
+                self._messages[key] = messages
+
+        await send(messages[0])
+        await send(messages[1])
+        return True
+
+
+Handler = Callable[[Optional[str], Callable], Awaitable[bool]]
+
+
+class FastPathMiddleware:
+    """
+    在 FastAPI 之前直接处理指定的 GET 路由（ASGI 中间件）
+
+    路由写法：固定路径（"/health"），或者最后一段是参数（"/items/{item_id}"，参数值以字符串传给处理函数）。
+    处理函数返回 False 表示不处理，请求继续交给 FastAPI。
+    """
+
+    def __init__(self, app, routes: Dict[str, Handler]):
+        self.app = app
+        self.exact: Dict[str, Handler] = {}
+        self.prefixes: Dict[str, Handler] = {}
+        for path, handler in routes.items():
+            if path.endswith("}"):
+                self.prefixes[path[:path.rindex("{")]] = handler
+            else:
+                self.exact[path] = handler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "GET":
+            path = scope["path"]
+            handler = self.exact.get(path)
+            if handler is not None:
+                if await handler(None, send):
+                    return
+            else:
+                prefix, _, param = path.rpartition("/")
+                handler = self.prefixes.get(prefix + "/")
+                if handler is not None and await handler(param, send):
+                    return
+        await self.app(scope, receive, send)
@@ -8,11 +8,20 @@ FastAPI + Uvicorn 实践示例
 作者：AI助手
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
+import os
 import uvicorn
 
+from asgi_fastpath import CachedLookup, FastPathMiddleware, StaticJSON
+from item_backend import RecordFormatError, create_backend
+from item_bulk import BULK_CHUNK_SIZE, BulkImport, export_items
+from request_metrics import CONTENT_TYPE, RequestMetrics, RequestMetricsMiddleware
+from response_cache import ResponseCache, ResponseCacheMiddleware
+from item_store import SEARCH_PAGE_SIZE, ItemExistsError, decode_cursor, encode_cursor
+
 # 创建 FastAPI 应用实例
 app = FastAPI(
     title="Uvicorn 教程 API",
@@ -32,17 +41,48 @@ class User(BaseModel):
     username: str
     email: str
 
-# 模拟数据库
-fake_items_db = [
-    {"id": 1, "name": "苹果", "description": "新鲜的红苹果", "price": 3.5},
-    {"id": 2, "name": "香蕉", "description": "黄色香蕉", "price": 2.0},
-    {"id": 3, "name": "橙子", "description": "多汁的橙子", "price": 4.0},
-]
+# 模拟数据库：默认放在进程内存里（带索引的仓库，见 item_store.py）；
+# 设置环境变量 ITEM_STORE=sqlite:items.db 后保存到 SQLite，重启不丢失，多个工作进程共享（见 item_backend.py）
+# ITEM_STORE=shm:items.shm 时放在内存映射文件里，多个工作进程直接读同一份数据（见 item_shared.py）
+db = create_backend(
+    os.environ.get("ITEM_STORE", "memory"),
+    items=[
+        {"id": 1, "name": "苹果", "description": "新鲜的红苹果", "price": 3.5},
+        {"id": 2, "name": "香蕉", "description": "黄色香蕉", "price": 2.0},
+        {"id": 3, "name": "橙子", "description": "多汁的橙子", "price": 4.0},
+    ],
+    users=[
+        {"id": 1, "username": "张三", "email": "zhangsan@example.com"},
+        {"id": 2, "username": "李四", "email": "lisi@example.com"},
+    ],
+)
+
+# 读接口的响应缓存（见 response_cache.py）：数据被修改后自动失效，RESPONSE_CACHE_MAX_BYTES=0 表示不缓存
+response_cache = ResponseCache(max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)))
+if response_cache.max_bytes > 0:
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=response_cache,
+        version=db.data_version,
+        paths=["/items", "/users", "/search/items"],
+    )
 
-fake_users_db = [
-    {"id": 1, "username": "张三", "email": "zhangsan@example.com"},
-    {"id": 2, "username": "李四", "email": "lisi@example.com"},
-]
+# 健康检查的响应内容（/health 接口和快速通道共用）
+HEALTH = {"status": "健康", "message": "服务器运行正常"}
+
+# 热点接口的快速通道（见 asgi_fastpath.py）：/health 和 /items/{item_id} 不经过 FastAPI 的路由和校验，
+# 直接发送预先编码好的响应；ASGI_FAST_PATH=0 表示关闭
+if os.environ.get("ASGI_FAST_PATH", "1") != "0":
+    app.add_middleware(FastPathMiddleware, routes={
+        "/health": StaticJSON(HEALTH),
+        "/items/{item_id}": CachedLookup(db.get_item, db.data_version, model=Item),
+    })
+
+# 每个接口的耗时直方图（见 request_metrics.py），GET /metrics 查看；
+# 多个工作进程时设置 METRICS_DIR 为共享目录，/metrics 返回所有进程合并后的结果
+# 最后添加的中间件在最外层，这样缓存命中的请求也会被统计
+request_metrics = RequestMetrics(directory=os.environ.get("METRICS_DIR"))
+app.add_middleware(RequestMetricsMiddleware, metrics=request_metrics)
 
 # ========================================
 # 路由定义
@@ -65,57 +105,79 @@ async def root():
 @app.get("/health")
 async def health_check():
     """健康检查"""
-    return {"status": "健康", "message": "服务器运行正常"}
+    return HEALTH
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """响应缓存的命中率和内存占用"""
+    return response_cache.stats()
+
+@app.get("/metrics")
+async def metrics():
+    """每个接口的耗时、请求/响应大小直方图和正在处理的请求数（Prometheus 文本格式）"""
+    return PlainTextResponse(await request_metrics.render_all(), media_type=CONTENT_TYPE)
 
 # ========================================
 # 物品相关接口
 # ========================================
 
-# @app.get("/items", response_model=List[Item])
-# async def get_items():
-#     """获取所有物品"""
-#     return fake_items_db
+@app.get("/items", response_model=List[Item])
+async def get_items():
+    """获取所有物品"""
+    return await db.list_items()
+
+@app.get("/items/export")
+async def export_items_ndjson():
+    """导出所有物品（NDJSON，每行一个物品，按价格排序，边读边发送）"""
+    return StreamingResponse(export_items(db), media_type="application/x-ndjson")
 
 @app.get("/items/{item_id}", response_model=Item)
 async def get_item(item_id: int):
     """根据ID获取特定物品"""
-    for item in fake_items_db:
-        if item["id"] == item_id:
-            return item
-    raise HTTPException(status_code=404, detail="物品未找到")
+    item = await db.get_item(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="物品未找到")
+    return item
 
 @app.post("/items", response_model=Item)
 async def create_item(item: Item):
     """创建新物品"""
-    # 检查ID是否已存在
-    for existing_item in fake_items_db:
-        if existing_item["id"] == item.id:
-            raise HTTPException(status_code=400, detail="物品ID已存在")
-    
-    # 添加到"数据库"
-    item_dict = item.dict()
-    fake_items_db.append(item_dict)
-    return item_dict
+    # 添加到"数据库"（ID 已存在时仓库会报错）
+    try:
+        return await db.create_item(item.dict())
+    except ItemExistsError:
+        raise HTTPException(status_code=400, detail="物品ID已存在")
+    except RecordFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/items/bulk")
+async def create_items_bulk(request: Request, chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=100000)):
+    """
+    批量导入物品
+
+    请求体是 NDJSON（每行一个物品），按块校验并写入；返回 NDJSON，每行对应请求的一行的结果，最后一行是汇总
+    """
+    result = await BulkImport(db, Item, chunk_size).feed(request.stream())
+    return StreamingResponse(result.render(), media_type="application/x-ndjson")
 
 @app.put("/items/{item_id}", response_model=Item)
 async def update_item(item_id: int, item: Item):
     """更新物品信息"""
-    for i, existing_item in enumerate(fake_items_db):
-        if existing_item["id"] == item_id:
-            item_dict = item.dict()
-            item_dict["id"] = item_id  # 确保ID一致
-            fake_items_db[i] = item_dict
-            return item_dict
-    raise HTTPException(status_code=404, detail="物品未找到")
+    try:
+        item_dict = await db.update_item(item_id, item.dict())  # 仓库会确保ID一致
+    except RecordFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if item_dict is None:
+        raise HTTPException(status_code=404, detail="物品未找到")
+    return item_dict
 
 @app.delete("/items/{item_id}")
 async def delete_item(item_id: int):
     """删除物品"""
-    for i, item in enumerate(fake_items_db):
-        if item["id"] == item_id:
-            deleted_item = fake_items_db.pop(i)
-            return {"message": f"物品 '{deleted_item['name']}' 已删除"}
-    raise HTTPException(status_code=404, detail="物品未找到")
+    deleted_item = await db.delete_item(item_id)
+    if deleted_item is None:
+        raise HTTPException(status_code=404, detail="物品未找到")
+    return {"message": f"物品 '{deleted_item['name']}' 已删除"}
 
 # ========================================
 # 用户相关接口
@@ -124,15 +186,15 @@ async def delete_item(item_id: int):
 @app.get("/users", response_model=List[User])
 async def get_users():
     """获取所有用户"""
-    return fake_users_db
+    return await db.list_users()
 
 @app.get("/users/{user_id}", response_model=User)
 async def get_user(user_id: int):
     """根据ID获取特定用户"""
-    for user in fake_users_db:
-        if user["id"] == user_id:
-            return user
-    raise HTTPException(status_code=404, detail="用户未找到")
+    user = await db.get_user(user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="用户未找到")
+    return user
 
 # ========================================
 # 查询参数示例
@@ -142,29 +204,57 @@ async def get_user(user_id: int):
 async def search_items(
     q: Optional[str] = None,
     min_price: Optional[float] = None,
-    max_price: Optional[float] = None
+    max_price: Optional[float] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None
 ):
-    """搜索物品（演示查询参数）"""
-    results = fake_items_db.copy()
-    
-    # 按名称搜索
-    if q:
-        results = [item for item in results if q.lower() in item["name"].lower()]
-    
-    # 按价格范围过滤
-    if min_price is not None:
-        results = [item for item in results if item["price"] >= min_price]
-    
-    if max_price is not None:
-        results = [item for item in results if item["price"] <= max_price]
-    
+    """
+    搜索物品（演示查询参数）
+
+    没有 limit、cursor 且 offset 为 0 时和原来一样：按插入顺序返回所有匹配的物品。
+    否则分页：名称用 n-gram 倒排索引、价格用排序索引查找，结果按价格从低到高排列；
+    翻页可以用 offset，也可以把上一页返回的 next_cursor 作为 cursor 传回来。
+    """
+    if limit is None and offset == 0 and cursor is None:
+        results = await db.filter_items(q, min_price, max_price)
+        return {
+            "query": q,
+            "price_range": {"min": min_price, "max": max_price},
+            "results": results,
+            "count": len(results)
+        }
+
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if limit is None:
+        limit = SEARCH_PAGE_SIZE
+    results, last_key = await db.search_items(q, min_price, max_price, offset=offset, limit=limit, after=after)
+
     return {
         "query": q,
         "price_range": {"min": min_price, "max": max_price},
         "results": results,
-        "count": len(results)
+        "count": len(results),
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": encode_cursor(last_key) if last_key is not None else None
     }
 
+@app.on_event("startup")
+async def startup_event():
+    """服务器启动时开始定期写入统计文件（设置了 METRICS_DIR 时）"""
+    await request_metrics.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """服务器关闭时写入最后一次统计、关闭数据库连接"""
+    await request_metrics.stop()
+    await db.close()
+
 # ========================================
 # 启动配置
 # ========================================
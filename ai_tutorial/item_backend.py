@@ -0,0 +1,756 @@
+"""
+物品存储后端
+==========
+
+fastapi_tutorial.py 和 examples/fastapi_test.py 的物品、用户原来只放在进程内存里：
+服务器重启后数据丢失，用 uvicorn --workers N 启动时每个工作进程各有一份、互不相同。
+这里把存储抽象成 ItemBackend，接口全部是 async 的，通过地址选择实现：
+    memory            进程内存（ItemRepository，默认）
+    sqlite:路径       SQLite 数据库文件，例如 sqlite:items.db
+    shm:路径          内存映射文件，所有工作进程共用一份数据，例如 shm:items.shm（见 item_shared.py）
+
+几种实现的行为完全一致（同样的异常、返回值、排序和分页），接口代码不需要关心用的是哪一个。
+
+SQLite 后端：
+- WAL 模式：读不阻塞写、写不阻塞读，多个工作进程可以共用同一个数据库文件
+- 连接池：每个读线程一个只读连接，查询在线程池里执行，不阻塞事件循环
+- 写入只用一个连接、一个线程，并且“组提交”：并发的写请求排队，写线程一次取出
+  一批放进同一个事务（每个写操作一个 SAVEPOINT，失败只回滚它自己），
+  一次提交（一次 fsync）完成一批写入
+- 索引：id 唯一索引、(price, id) 价格索引、物品名的 FTS5 trigram 全文索引
+  （新物品的名称在每个写事务提交前一次性写入全文索引，比每行写一次快得多）
+- 批量新增 create_items：一批物品一个事务，一条 executemany
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from item_store import ItemExistsError, ItemRepository, PriceKey
+
+# 数据库结构版本（PRAGMA user_version），0 表示新数据库
+SCHEMA_VERSION = 2
+
+# 同时有关键词和价格区间时：价格区间内的物品少于该值就沿价格索引扫描，否则用全文索引
+PRICE_SCAN_LIMIT = 2000
+
+SCHEMA = """
+CREATE TABLE items (
+    seq INTEGER PRIMARY KEY,        -- 插入顺序（列表按它排序）
+    id INTEGER NOT NULL UNIQUE,
+    price REAL NOT NULL,
+    name_folded TEXT NOT NULL,      -- 小写的物品名，用于搜索
+    data TEXT NOT NULL              -- 整个物品的 JSON
+);
+CREATE INDEX items_price ON items (price, id);
+
+CREATE TABLE users (
+    seq INTEGER PRIMARY KEY,
+    id INTEGER NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+"""
+
+# 物品名的全文索引（trigram 分词支持任意子串查询）。
+# 逐行写全文索引很慢：插入时触发器只把 seq 记到 items_pending，写事务提交前由 _index_names
+# 一次性把这些行写入全文索引；已经在索引里的行被修改或删除时由触发器同步
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE items_name USING fts5(
+    name_folded, content='items', content_rowid='seq', tokenize='trigram case_sensitive 1'
+);
+CREATE TABLE items_pending (seq INTEGER PRIMARY KEY);
+CREATE TRIGGER items_name_insert AFTER INSERT ON items BEGIN
+    INSERT OR IGNORE INTO items_pending (seq) VALUES (new.seq);
+END;
+CREATE TRIGGER items_name_delete AFTER DELETE ON items
+WHEN NOT EXISTS (SELECT 1 FROM items_pending WHERE seq = old.seq) BEGIN
+    INSERT INTO items_name (items_name, rowid, name_folded) VALUES ('delete', old.seq, old.name_folded);
+END;
+CREATE TRIGGER items_name_update AFTER UPDATE OF name_folded ON items
+WHEN NOT EXISTS (SELECT 1 FROM items_pending WHERE seq = old.seq) BEGIN
+    INSERT INTO items_name (items_name, rowid, name_folded) VALUES ('delete', old.seq, old.name_folded);
+    INSERT INTO items_name (rowid, name_folded) VALUES (new.seq, new.name_folded);
+END;
+"""
+
+# 版本 1 的全文索引每插入一行执行一次触发器：删掉旧触发器，按新方式重建
+MIGRATE_V1 = """
+DROP TRIGGER IF EXISTS items_name_insert;
+DROP TRIGGER IF EXISTS items_name_delete;
+DROP TRIGGER IF EXISTS items_name_update;
+DROP TABLE IF EXISTS items_name;
+"""
+
+# 复用同一个编码器（json.dumps 带参数时每次调用都会新建一个 JSONEncoder）
+_encode_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+INSERT_ITEM = "INSERT INTO items (id, price, name_folded, data) VALUES (?, ?, ?, ?)"
+
+# SQLite 的 INTEGER 是 64 位有符号整数，超出范围的 ID 传给 sqlite3 会抛出 OverflowError
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _fits_int64(value: int) -> bool:
+    return INT64_MIN <= value <= INT64_MAX
+
+
+class UserExistsError(ValueError):
+    """用户 ID 已存在"""
+
+
+class RecordFormatError(ValueError):
+    """记录不能按后端的存储格式保存（例如共享内存后端的字段超过最大长度）"""
+
+
+class ItemBackend:
+    """
+    存储后端接口
+
+    物品和用户都是普通字典；物品方法的语义和 ItemRepository 相同
+    """
+
+    async def get_item(self, item_id: int) -> Optional[Dict]:
+        """按 ID 获取物品，不存在时返回 None"""
+        raise NotImplementedError
+
+    async def list_items(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """按插入顺序列出物品"""
+        raise NotImplementedError
+
+    async def create_item(self, item: Dict) -> Dict:
+        """
+        新增物品
+
+        Raises:
+            ItemExistsError: ID 已存在
+        """
+        raise NotImplementedError
+
+    async def create_items(self, items: List[Dict]) -> List[bool]:
+        """
+        批量新增物品（SQLite 后端在一个事务中写入）
+
+        Returns:
+            List[bool]: 每个物品是否新增成功（False 表示 ID 已存在，包括和同一批中前面的物品重复）
+        """
+        raise NotImplementedError
+
+    async def update_item(self, item_id: int, item: Dict) -> Optional[Dict]:
+        """替换物品（ID 保持不变），不存在时返回 None"""
+        raise NotImplementedError
+
+    async def delete_item(self, item_id: int) -> Optional[Dict]:
+        """删除物品，返回被删除的物品，不存在时返回 None"""
+        raise NotImplementedError
+
+    async def search_items(
+        self,
+        q: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[PriceKey] = None
+    ) -> Tuple[List[Dict], Optional[PriceKey]]:
+        """搜索物品，参数和返回值同 ItemRepository.search"""
+        raise NotImplementedError
+
+    async def filter_items(
+        self,
+        q: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        不分页的搜索：按插入顺序返回所有匹配的物品（/search/items 原来的行为）
+
+        要遍历全部物品，数据多时应该用 search_items 分页
+        """
+        needle = q.lower() if q else None
+        return [
+            item for item in await self.list_items()
+            if (needle is None or needle in item["name"].lower())
+            and (min_price is None or item["price"] >= min_price)
+            and (max_price is None or item["price"] <= max_price)
+        ]
+
+    async def count_items(self) -> int:
+        raise NotImplementedError
+
+    async def list_users(self) -> List[Dict]:
+        """按插入顺序列出用户"""
+        raise NotImplementedError
+
+    async def get_user(self, user_id: int) -> Optional[Dict]:
+        """按 ID 获取用户，不存在时返回 None"""
+        raise NotImplementedError
+
+    async def create_user(self, user: Dict) -> Dict:
+        """
+        新增用户
+
+        Raises:
+            UserExistsError: ID 已存在
+        """
+        raise NotImplementedError
+
+    def check_item(self, item: Dict):
+        """
+        检查物品能否保存（默认都可以），批量导入时用来提前标记无效的行
+
+        Raises:
+            RecordFormatError: 物品不符合后端的存储格式
+        """
+
+    def data_version(self) -> int:
+        """
+        数据版本号：物品或用户被修改后一定会变化（只用来比较是否相同）
+
+        每个请求都可能调用，必须很快、不能等待 I/O
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {}
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(ItemBackend):
+    """进程内存后端：数据在 ItemRepository 和一个字典里，重启后丢失"""
+
+    def __init__(self, items: Iterable[Dict] = (), users: Iterable[Dict] = ()):
+        self.items = ItemRepository(items)
+        self.users: Dict[int, Dict] = {user["id"]: dict(user) for user in users}
+        self.version = 0  # 每次修改加 1
+
+    async def get_item(self, item_id: int) -> Optional[Dict]:
+        return self.items.get(item_id)
+
+    async def list_items(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        return self.items.list(offset, limit)
+
+    async def create_item(self, item: Dict) -> Dict:
+        item = self.items.create(item)
+        self.version += 1
+        return item
+
+    async def create_items(self, items: List[Dict]) -> List[bool]:
+        created = self.items.create_many(items)
+        if any(created):
+            self.version += 1
+        return created
+
+    async def update_item(self, item_id: int, item: Dict) -> Optional[Dict]:
+        item = self.items.update(item_id, item)
+        if item is not None:
+            self.version += 1
+        return item
+
+    async def delete_item(self, item_id: int) -> Optional[Dict]:
+        item = self.items.delete(item_id)
+        if item is not None:
+            self.version += 1
+        return item
+
+    async def search_items(self, q=None, min_price=None, max_price=None, offset=0, limit=None, after=None):
+        return self.items.search(q, min_price, max_price, offset=offset, limit=limit, after=after)
+
+    async def count_items(self) -> int:
+        return len(self.items)
+
+    async def list_users(self) -> List[Dict]:
+        return list(self.users.values())
+
+    async def get_user(self, user_id: int) -> Optional[Dict]:
+        return self.users.get(user_id)
+
+    async def create_user(self, user: Dict) -> Dict:
+        if user["id"] in self.users:
+            raise UserExistsError(f"用户ID已存在: {user['id']}")
+        user = dict(user)
+        self.users[user["id"]] = user
+        self.version += 1
+        return user
+
+    def data_version(self) -> int:
+        return self.version
+
+    def stats(self) -> Dict:
+        return {"backend": "memory", "items": len(self.items), "users": len(self.users), "version": self.version}
+
+
+def _resolve(future: asyncio.Future, ok: bool, value: Any):
+    """在事件循环线程中设置写操作的结果（请求可能已经被取消）"""
+    if future.done():
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
+
+
+class SQLiteBackend(ItemBackend):
+    """SQLite 后端：数据保存在文件里，多个工作进程共享"""
+
+    def __init__(
+        self,
+        path: str,
+        items: Iterable[Dict] = (),
+        users: Iterable[Dict] = (),
+        pool_size: int = 4,
+        synchronous: str = "NORMAL",
+        max_batch: int = 256
+    ):
+        """
+        打开（或创建）数据库
+
+        Args:
+            path: 数据库文件路径
+            items, users: 新建数据库时写入的初始数据（已有数据库时忽略）
+            pool_size: 读连接数（也是读线程数）
+            synchronous: PRAGMA synchronous，NORMAL 在 WAL 模式下只在检查点时 fsync，FULL 每次提交都 fsync
+            max_batch: 一个事务最多包含的写操作数，1 表示不做组提交
+        """
+        self.path = path
+        self.pool_size = pool_size
+        self.synchronous = synchronous
+        self.max_batch = max_batch
+
+        self._writer = self._connect()
+        self.fts = self._init_schema(list(items), list(users))
+        self._open_pool()
+
+        self.commits = 0
+        self.writes = 0
+        self.max_batch_seen = 0
+
+        # 预加载应用后再 fork 出工作进程时（uvicorn_launcher.py），子进程不能使用父进程的连接和线程
+        self._inherited: List[sqlite3.Connection] = []
+        if hasattr(os, "register_at_fork"):
+            backend = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: backend() is not None and backend()._after_fork())
+
+    def _open_pool(self):
+        """打开读连接、版本号连接和线程池"""
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(self.pool_size):
+            connection = self._connect()
+            connection.execute("PRAGMA query_only = ON")
+            self._readers.put(connection)
+        # PRAGMA data_version 专用连接：其他连接（包括本进程的写连接和其他工作进程）提交后它的值就会变化
+        self._version_connection = self._connect()
+        self._version_lock = threading.Lock()
+
+        self._read_executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="sqlite-read")
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-write")
+
+        self._pending: List[Tuple[Callable[[sqlite3.Connection], Any], asyncio.Future, asyncio.AbstractEventLoop]] = []
+        self._pending_lock = threading.Lock()
+        self._flushing = False
+
+    def _after_fork(self):
+        """
+        fork 出的子进程里重新打开所有连接、重建线程池
+
+        继承来的连接不能再用，也不能关闭（关闭最后一个连接时 SQLite 可能做检查点、删除 WAL 文件，
+        而其他工作进程还在用），所以只保留引用
+        """
+        self._inherited.extend([self._writer, self._version_connection, *self._readers.queue])
+        self._writer = self._connect()
+        self._open_pool()
+
+    # ---------- 连接和表结构 ----------
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None：不让 sqlite3 模块自动开启事务，事务由这里显式控制
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        # 64MB 页缓存：批量写入时价格索引的插入位置是随机的，缓存太小会反复读写同一批页
+        connection.execute("PRAGMA cache_size = -65536")
+        # WAL 攒到约 40MB 再写回数据库文件：反复修改的索引页在一次检查点中只写一次
+        connection.execute("PRAGMA wal_autocheckpoint = 10000")
+        return connection
+
+    def _init_schema(self, items: List[Dict], users: List[Dict]) -> bool:
+        """新数据库：建表并写入初始数据。返回是否有物品名全文索引"""
+        connection = self._writer
+        # BEGIN IMMEDIATE 先拿到写锁，多个工作进程同时启动时只有一个会建表
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+            if version == 0:
+                for statement in _split_statements(SCHEMA):
+                    connection.execute(statement)
+                for item in items:
+                    self._insert_item(connection, item)
+                for user in users:
+                    self._insert_user(connection, user)
+            elif version == 1:
+                for statement in _split_statements(MIGRATE_V1):
+                    connection.execute(statement)
+            if version < SCHEMA_VERSION:
+                # 已有的物品用 rebuild 一次性写入全文索引
+                try:
+                    connection.execute("SAVEPOINT fts")
+                    for statement in _split_statements(FTS_SCHEMA):
+                        connection.execute(statement)
+                    connection.execute("INSERT INTO items_name (items_name) VALUES ('rebuild')")
+                    connection.execute("RELEASE fts")
+                except sqlite3.OperationalError:
+                    # SQLite 没有编译 FTS5 或不支持 trigram：名称搜索退化为扫描
+                    connection.execute("ROLLBACK TO fts")
+                    connection.execute("RELEASE fts")
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        row = connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'items_name'").fetchone()
+        return row is not None
+
+    @staticmethod
+    def _index_names(connection: sqlite3.Connection):
+        """把本事务中新插入的物品名一次性写入全文索引（在写事务中调用）"""
+        if connection.execute("SELECT 1 FROM items_pending LIMIT 1").fetchone() is None:
+            return
+        connection.execute(
+            "INSERT INTO items_name (rowid, name_folded) "
+            "SELECT seq, name_folded FROM items WHERE seq IN (SELECT seq FROM items_pending)"
+        )
+        connection.execute("DELETE FROM items_pending")
+
+    # ---------- 在线程中执行 ----------
+
+    def _read_sync(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        connection = self._readers.get()
+        try:
+            return operation(connection)
+        finally:
+            self._readers.put(connection)
+
+    async def _read(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """在读线程池中用一个只读连接执行 operation"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, self._read_sync, operation)
+
+    async def _write(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """把写操作交给写线程，和同时到达的其他写操作在同一个事务中提交"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._pending_lock:
+            self._pending.append((operation, future, loop))
+            start = not self._flushing
+            self._flushing = True
+        if start:
+            self._write_executor.submit(self._flush)
+        return await future
+
+    def _flush(self):
+        """写线程：不断取出排队的写操作，按批提交，直到队列为空"""
+        while True:
+            with self._pending_lock:
+                if not self._pending:
+                    self._flushing = False
+                    return
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+
+            results = self._run_batch([operation for operation, _, _ in batch])
+            for (_, future, loop), (ok, value) in zip(batch, results):
+                loop.call_soon_threadsafe(_resolve, future, ok, value)
+
+    def _run_batch(self, operations: List[Callable[[sqlite3.Connection], Any]]) -> List[Tuple[bool, Any]]:
+        """在一个事务中执行一批写操作，返回每个操作的 (是否成功, 结果或异常)"""
+        connection = self._writer
+        results = []
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for operation in operations:
+                connection.execute("SAVEPOINT op")
+                try:
+                    results.append((True, operation(connection)))
+                    connection.execute("RELEASE op")
+                except Exception as e:
+                    connection.execute("ROLLBACK TO op")
+                    connection.execute("RELEASE op")
+                    results.append((False, e))
+            if self.fts:
+                self._index_names(connection)
+            connection.execute("COMMIT")
+        except Exception as e:
+            # 事务本身失败（例如磁盘已满）：这一批全部失败
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return [(False, e)] * len(operations)
+        self.commits += 1
+        self.writes += len(operations)
+        self.max_batch_seen = max(self.max_batch_seen, len(operations))
+        return results
+
+    # ---------- 物品 ----------
+
+    @staticmethod
+    def _insert_item(connection: sqlite3.Connection, item: Dict) -> Dict:
+        item = dict(item)
+        try:
+            connection.execute(INSERT_ITEM, SQLiteBackend._item_row(item))
+        except sqlite3.IntegrityError:
+            raise ItemExistsError(f"物品ID已存在: {item['id']}")
+        return item
+
+    @staticmethod
+    def _item_row(item: Dict) -> Tuple:
+        return (item["id"], item["price"], item["name"].casefold(), _encode_json(item))
+
+    def check_item(self, item: Dict):
+        if not _fits_int64(item["id"]):
+            raise RecordFormatError("物品ID超出 64 位整数范围")
+
+    async def get_item(self, item_id: int) -> Optional[Dict]:
+        if not _fits_int64(item_id):
+            return None
+
+        def operation(connection):
+            row = connection.execute("SELECT data FROM items WHERE id = ?", (item_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+        return await self._read(operation)
+
+    async def list_items(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        def operation(connection):
+            rows = connection.execute(
+                "SELECT data FROM items ORDER BY seq LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            )
+            return [json.loads(data) for (data,) in rows]
+        return await self._read(operation)
+
+    async def create_item(self, item: Dict) -> Dict:
+        self.check_item(item)
+        return await self._write(lambda connection: self._insert_item(connection, item))
+
+    async def create_items(self, items: List[Dict]) -> List[bool]:
+        items = [dict(item) for item in items]
+        for item in items:
+            self.check_item(item)
+
+        def operation(connection):
+            # 先一次查出已存在的 ID，再用一条 executemany 插入其余的物品
+            existing = {
+                item_id for (item_id,) in connection.execute(
+                    "SELECT id FROM items WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps([item["id"] for item in items]),)
+                )
+            }
+            created, rows = [], []
+            for item in items:
+                if item["id"] in existing:
+                    created.append(False)
+                    continue
+                existing.add(item["id"])
+                rows.append(self._item_row(item))
+                created.append(True)
+            connection.executemany(INSERT_ITEM, rows)
+            return created
+        return await self._write(operation)
+
+    async def update_item(self, item_id: int, item: Dict) -> Optional[Dict]:
+        item = dict(item, id=item_id)
+        self.check_item(item)
+
+        def operation(connection):
+            cursor = connection.execute(
+                "UPDATE items SET price = ?, name_folded = ?, data = ? WHERE id = ?",
+                self._item_row(item)[1:] + (item_id,)
+            )
+            return item if cursor.rowcount else None
+        return await self._write(operation)
+
+    async def delete_item(self, item_id: int) -> Optional[Dict]:
+        if not _fits_int64(item_id):
+            return None
+
+        def operation(connection):
+            row = connection.execute("DELETE FROM items WHERE id = ? RETURNING data", (item_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+        return await self._write(operation)
+
+    async def search_items(self, q=None, min_price=None, max_price=None, offset=0, limit=None, after=None):
+        def operation(connection):
+            conditions, params = [], []
+            if min_price is not None:
+                conditions.append("price >= ?")
+                params.append(min_price)
+            if max_price is not None:
+                conditions.append("price <= ?")
+                params.append(max_price)
+            if after is not None:
+                # 游标来自客户端，ID 可能超出 64 位：所有物品的 ID 都比它小（或都比它大）
+                after_price, after_id = after
+                if after_id > INT64_MAX:
+                    conditions.append("price > ?")
+                    params.append(after_price)
+                elif after_id < INT64_MIN:
+                    conditions.append("price >= ?")
+                    params.append(after_price)
+                else:
+                    conditions.append("(price, id) > (?, ?)")
+                    params.extend(after)
+
+            if q:
+                needle = q.casefold()
+                # trigram 索引只能查三个字以上；价格区间很窄时直接扫描价格索引更快
+                use_fts = self.fts and len(needle) >= 3
+                if use_fts and (min_price is not None or max_price is not None):
+                    use_fts = self._count_limited(connection, conditions, params) >= PRICE_SCAN_LIMIT
+                if use_fts:
+                    conditions.append("seq IN (SELECT rowid FROM items_name WHERE items_name MATCH ?)")
+                    params.append('"' + needle.replace('"', '""') + '"')
+                conditions.append("instr(name_folded, ?) > 0")
+                params.append(needle)
+
+            where = "WHERE " + " AND ".join(conditions) if conditions else ""
+            # 多取一条，用来判断后面还有没有结果
+            fetch = -1 if limit is None else limit + 1
+            rows = connection.execute(
+                f"SELECT data FROM items {where} ORDER BY price, id LIMIT ? OFFSET ?",
+                params + [fetch, offset]
+            ).fetchall()
+            page = [json.loads(data) for (data,) in rows]
+            if limit is not None and len(page) > limit:
+                page = page[:limit]
+                return page, (page[-1]["price"], page[-1]["id"])
+            return page, None
+        return await self._read(operation)
+
+    @staticmethod
+    def _count_limited(connection: sqlite3.Connection, conditions: List[str], params: List[Any]) -> int:
+        """满足价格条件的物品数（最多数到 PRICE_SCAN_LIMIT）"""
+        (count,) = connection.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM items WHERE {' AND '.join(conditions)} LIMIT ?)",
+            params + [PRICE_SCAN_LIMIT]
+        ).fetchone()
+        return count
+
+    async def count_items(self) -> int:
+        return await self._read(lambda connection: connection.execute("SELECT count(*) FROM items").fetchone()[0])
+
+    # ---------- 用户 ----------
+
+    @staticmethod
+    def _insert_user(connection: sqlite3.Connection, user: Dict) -> Dict:
+        user = dict(user)
+        try:
+            connection.execute(
+                "INSERT INTO users (id, data) VALUES (?, ?)",
+                (user["id"], _encode_json(user))
+            )
+        except sqlite3.IntegrityError:
+            raise UserExistsError(f"用户ID已存在: {user['id']}")
+        return user
+
+    async def list_users(self) -> List[Dict]:
+        def operation(connection):
+            return [json.loads(data) for (data,) in connection.execute("SELECT data FROM users ORDER BY seq")]
+        return await self._read(operation)
+
+    async def get_user(self, user_id: int) -> Optional[Dict]:
+        if not _fits_int64(user_id):
+            return None
+
+        def operation(connection):
+            row = connection.execute("SELECT data FROM users WHERE id = ?", (user_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+        return await self._read(operation)
+
+    async def create_user(self, user: Dict) -> Dict:
+        if not _fits_int64(user["id"]):
+            raise RecordFormatError("用户ID超出 64 位整数范围")
+        return await self._write(lambda connection: self._insert_user(connection, user))
+
+    # ---------- 其他 ----------
+
+    def data_version(self) -> int:
+        # 只读取共享内存里的 WAL 索引头，不访问磁盘，可以直接在事件循环中调用
+        with self._version_lock:
+            return self._version_connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "pool_size": self.pool_size,
+            "synchronous": self.synchronous,
+            "full_text_index": self.fts,
+            "writes": self.writes,
+            "commits": self.commits,
+            "max_batch": self.max_batch_seen,
+        }
+
+    def _close_sync(self):
+        self._write_executor.shutdown(wait=True)
+        self._read_executor.shutdown(wait=True)
+        self._writer.close()
+        self._version_connection.close()
+        while not self._readers.empty():
+            self._readers.get().close()
+
+    async def close(self):
+        """等排队的写操作完成后关闭所有连接"""
+        await asyncio.get_running_loop().run_in_executor(None, self._close_sync)
+
+
+def _split_statements(script: str) -> List[str]:
+    """把建表脚本拆成单条语句（executescript 会先提交当前事务，不能在事务中使用）"""
+    statements, current = [], ""
+    for line in script.splitlines():
+        line = line.split("--")[0].rstrip()
+        if not line:
+            continue
+        current += line + "\n"
+        if sqlite3.complete_statement(current):
+            statements.append(current)
+            current = ""
+    return statements
+
+
+# 地址前缀 -> 后端实现
+BACKENDS: Dict[str, Callable[..., ItemBackend]] = {
+    "memory": lambda address, **options: MemoryBackend(options.get("items", ()), options.get("users", ())),
+    "sqlite": lambda address, **options: SQLiteBackend(address.partition(":")[2] or "items.db", **options),
+    "shm": lambda address, **options: _shared_backend(address.partition(":")[2] or "items.shm", **options),
+}
+
+
+def _shared_backend(path: str, **options) -> ItemBackend:
+    from item_shared import SharedMemoryBackend  # item_shared 导入了本模块，在这里导入避免循环导入
+    return SharedMemoryBackend(path, **options)
+
+
+def create_backend(address: str = "", **options) -> ItemBackend:
+    """
+    根据地址创建存储后端，空地址表示进程内存
+
+    Args:
+        address: memory、sqlite:路径 或 shm:路径
+        **options: 传给后端的参数，例如 items、users（初始数据）、pool_size（SQLite）、capacity（共享内存）
+    """
+    scheme = address.partition(":")[0] if address else "memory"
+    if scheme not in BACKENDS:
+        raise ValueError(f"未知的存储后端: {address}")
+    if scheme in ("sqlite", "shm"):
+        directory = os.path.dirname(address.partition(":")[2])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    return BACKENDS[scheme](address, **options)
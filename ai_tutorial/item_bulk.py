@@ -0,0 +1,171 @@
+"""
+物品批量导入和导出（NDJSON）
+=========================
+
+原来导入一份商品目录只能每个物品发一次 POST /items。这里提供两个流式接口用到的函数：
+
+    POST /items/bulk     请求体是 NDJSON（每行一个物品的 JSON），边接收边按块校验、写入，
+                         每块（默认 5000 行）调用一次 create_items（SQLite 后端一个事务），
+                         然后以 NDJSON 返回每一行的处理结果，最后一行是汇总
+    GET /items/export    按 (价格, id) 顺序分批读取所有物品，以 NDJSON 流式返回，
+                         不会把全部物品放进一个列表
+
+每行的处理结果：
+    {"line":1,"id":7,"status":"created"}
+    {"line":2,"id":7,"status":"exists","error":"物品ID已存在"}
+    {"line":3,"status":"invalid","error":"price: Input should be a valid number"}
+
+注意：uvicorn 的 ASGI 版本下，StreamingResponse 发送时会同时读取请求通道来检测客户端断开，
+所以必须先把请求体读完再开始返回结果。为了不占用太多内存，每行结果只记一个状态字节和物品 ID，
+错误信息只保存出错的行。
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import asyncio
+import json
+import time
+from array import array
+from typing import AsyncIterator, Dict, List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from item_backend import ItemBackend, RecordFormatError
+
+# 每块的行数：一块一次 create_items
+BULK_CHUNK_SIZE = 5000
+
+# 导出时每次读取的物品数
+EXPORT_BATCH_SIZE = 1000
+
+# 复用同一个编码器（json.dumps 带参数时每次调用都会新建一个 JSONEncoder）
+_encode_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+# 每行的处理状态
+CREATED, EXISTS, INVALID, BLANK = 0, 1, 2, 3
+STATUS_NAMES = {CREATED: "created", EXISTS: "exists", INVALID: "invalid"}
+
+
+async def iter_line_batches(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[bytes]]:
+    """把请求体的字节块切成行，按块返回这一块中完整的行（一行可能跨多个块）"""
+    rest = b""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        if lines:
+            yield lines
+    if rest:
+        yield [rest]
+
+
+def _describe(error: ValidationError) -> str:
+    """校验错误的简短描述（第一个错误的字段和原因）"""
+    first = error.errors(include_url=False)[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+class BulkImport:
+    """一次批量导入：逐块校验、写入，并紧凑地记录每一行的结果"""
+
+    def __init__(self, db: ItemBackend, model: Type[BaseModel], chunk_size: int = BULK_CHUNK_SIZE):
+        self.db = db
+        self.model = model
+        self.chunk_size = chunk_size
+        self.statuses = bytearray()  # 每行一个状态
+        self.ids = array("q")  # 每行的物品 ID（无效行为 0）
+        self.errors: Dict[int, str] = {}  # 行号（从 0 开始）-> 校验错误
+        self.counts = {name: 0 for name in STATUS_NAMES.values()}
+        self.seconds = 0.0
+
+        self._chunk: List[Dict] = []
+        self._chunk_lines: List[int] = []
+        self._writing: Optional[asyncio.Task] = None  # 正在写入的上一块
+
+    async def feed(self, chunks: AsyncIterator[bytes]) -> "BulkImport":
+        """读完整个请求体（上一块在后台写入时，继续接收和校验下一块）"""
+        start = time.perf_counter()
+        async for lines in iter_line_batches(chunks):
+            for line in lines:
+                self._add_line(line)
+                if len(self._chunk) >= self.chunk_size:
+                    await self._flush()
+        await self._flush()
+        if self._writing is not None:
+            await self._writing
+        self.seconds = time.perf_counter() - start
+        return self
+
+    def _add_line(self, line: bytes):
+        number = len(self.statuses)
+        if not line.strip():
+            self.statuses.append(BLANK)
+            self.ids.append(0)
+            return
+        try:
+            item = self.model.model_validate_json(line).model_dump()
+            self.db.check_item(item)
+        except (ValidationError, RecordFormatError) as e:
+            self.statuses.append(INVALID)
+            self.ids.append(0)
+            self.errors[number] = _describe(e) if isinstance(e, ValidationError) else str(e)
+            self.counts["invalid"] += 1
+            return
+        # 状态在写入后确定，先占位
+        self.statuses.append(CREATED)
+        self.ids.append(item["id"])
+        self._chunk.append(item)
+        self._chunk_lines.append(number)
+
+    async def _flush(self):
+        """开始写入当前块（先等上一块写完，保证按顺序写入）"""
+        if not self._chunk:
+            return
+        if self._writing is not None:
+            await self._writing
+        self._writing = asyncio.create_task(self._write(self._chunk, self._chunk_lines))
+        self._chunk = []
+        self._chunk_lines = []
+
+    async def _write(self, chunk: List[Dict], chunk_lines: List[int]):
+        created = await self.db.create_items(chunk)
+        for number, ok in zip(chunk_lines, created):
+            status = CREATED if ok else EXISTS
+            self.statuses[number] = status
+            self.counts[STATUS_NAMES[status]] += 1
+
+    async def render(self) -> AsyncIterator[bytes]:
+        """按 NDJSON 逐块输出每一行的结果，最后输出汇总"""
+        lines = []
+        for number, status in enumerate(self.statuses):
+            if status == BLANK:
+                continue
+            result = {"line": number + 1}
+            if status != INVALID:
+                result["id"] = self.ids[number]
+            result["status"] = STATUS_NAMES[status]
+            if status == EXISTS:
+                result["error"] = "物品ID已存在"
+            elif status == INVALID:
+                result["error"] = self.errors[number]
+            lines.append(_encode_json(result))
+            if len(lines) >= EXPORT_BATCH_SIZE:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+        summary = {"summary": {"lines": len(self.statuses), **self.counts, "seconds": round(self.seconds, 3)}}
+        lines.append(_encode_json(summary))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def export_items(db: ItemBackend, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """按 (价格, id) 顺序分批读取所有物品，每批输出为一段 NDJSON"""
+    after = None
+    while True:
+        page, after = await db.search_items(limit=batch_size, after=after)
+        if page:
+            yield "".join(_encode_json(item) + "\n" for item in page).encode("utf-8")
+        if after is None:
+            return
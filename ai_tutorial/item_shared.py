@@ -0,0 +1,831 @@
+"""
+共享内存物品存储（多个工作进程共用一份数据）
+========================================
+
+uvicorn --workers 4 启动时，内存后端的每个工作进程各有一份物品数据：一个进程里的修改
+其他进程看不到，内存占用也乘以工作进程数。SharedItemStore 把物品放在一个内存映射文件（mmap）里，
+所有工作进程映射同一个文件：读取直接访问共享的内存页，每个进程不再复制一份数据；
+任何一个进程的修改，其他进程下一次读取就能看到。
+
+地址：shm:路径，例如 ITEM_STORE=shm:items.shm（见 item_backend.py）
+
+文件布局（固定格式，数字都是小端）：
+    文件头（4096 字节）  魔数、序列号、数据版本、容量、已用槽位数、物品数、用户数……
+    哈希表               物品 ID -> 槽位号 + 1（开放寻址，表长是容量的 2 倍以上；0 空，-1 已删除）
+    物品记录             每个槽位一条定长记录，按插入顺序排列：
+                         id(8) 价格(8) 标志(1) 保留(1) 名称长度(2) 描述长度(2) 名称 描述
+    价格索引             按 (价格, id) 排序的数组，每项 (价格, id, 槽位) 共 24 字节，区间查询用二分查找
+    名称列               每个槽位一段小写的物品名，关键词搜索时用 mmap.find 在 C 里扫描
+    用户记录             id(8) 用户名长度(2) 邮箱长度(2) 用户名 邮箱
+
+名称、描述的最大字节数在创建文件时确定（默认 120、360 字节，UTF-8 一个汉字 3 字节），
+超过时抛出 RecordFormatError；物品只保存 id、name、description、price、is_available 这几个字段，
+值为 None 和缺少的字段都原样保留（读出的字典和内存、SQLite 后端相同）。
+
+并发控制：
+- 写：所有进程共用一把文件锁（路径.lock），同一时刻只有一个进程在写
+- 读：顺序锁（seqlock），读不加锁。写之前把文件头的序列号加 1（变成奇数），写完再加 1（变回偶数）；
+  读的前后各看一次序列号，两次相同且是偶数说明读的过程中没有写入，否则重读
+- 删除只做标记。槽位用完时重建一个新文件（物品多就把容量翻倍，删除的多就按原容量压缩）
+  并替换旧文件，同时在旧文件头里标记“已替换”，其他进程下次访问时重新打开
+
+注意：
+- 教程用 struct 直接读写 mmap，没有内存屏障，顺序锁依赖 CPU 按写入顺序看到其他进程的修改（x86 保证这一点）
+- 写入的进程中途崩溃会让序列号停在奇数；读的进程等待一段时间后会拿写锁检查，
+  确认没有进程在写时根据物品记录重建索引（崩溃时正在写的那一条可能丢失）
+- 替换文件依赖 os.replace 能替换其他进程正在映射的文件（Linux、macOS 可以，Windows 不行）
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from item_backend import ItemBackend, RecordFormatError, UserExistsError
+from item_store import ItemExistsError, PriceKey
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ITEMSHM1"
+HEADER_SIZE = 4096
+
+# 文件头：魔数、名称字节数、描述字节数、保留、序列号、数据版本、已替换、容量、已用槽位、物品数、用户容量、用户数
+HEADER = struct.Struct("<8sIIQQQQQQQQQ")
+SEQ, VERSION, REPLACED, CAPACITY, USED, COUNT, USER_CAPACITY, USER_COUNT = range(24, 88, 8)
+
+U64 = struct.Struct("<Q")
+SEQ_AND_REPLACED = struct.Struct("<Q8xQ")  # 从 SEQ 开始一次读出序列号和“已替换”
+I64 = struct.Struct("<q")
+RECORD_HEAD = struct.Struct("<qdBBHH")
+PRICE_ENTRY = struct.Struct("<dqq")
+PRICE_KEY = struct.Struct("<dq")  # 价格索引项的前两个字段
+RECORD_KEY = struct.Struct("<qd")  # 物品记录的前两个字段
+USER_HEAD = struct.Struct("<qHH")
+
+# 记录标志（NO_DESCRIPTION、AVAILABLE_NONE 记录字段不存在 / 值为 None，读出的字典和写入时的字段一致）
+DELETED, HAS_DESCRIPTION, HAS_AVAILABLE, AVAILABLE, NO_DESCRIPTION, AVAILABLE_NONE = 1, 2, 4, 8, 16, 32
+
+ITEM_FIELDS = {"id", "name", "description", "price", "is_available"}
+USER_FIELDS = {"id", "username", "email"}
+USERNAME_BYTES = 64
+EMAIL_BYTES = 128
+
+# 斐波那契散列的乘数（2^64 / 黄金分割比）
+GOLDEN = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+
+# 同时有关键词和价格区间时：价格区间内的物品少于该值就沿价格索引检查名称，否则扫描名称列
+PRICE_SCAN_LIMIT = 2000
+
+# 读取时序列号一直是奇数，等待这么多秒后检查写入的进程是否还活着
+STUCK_WRITER_SECONDS = 1.0
+
+_yield = getattr(os, "sched_yield", lambda: time.sleep(0))
+
+
+def _align(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+class Layout:
+    """根据容量和字段长度计算各部分在文件中的位置"""
+
+    def __init__(self, capacity: int, name_bytes: int, description_bytes: int, user_capacity: int):
+        self.capacity = capacity
+        self.name_bytes = name_bytes
+        self.description_bytes = description_bytes
+        self.user_capacity = user_capacity
+        self.record_size = _align(RECORD_HEAD.size + name_bytes + description_bytes)
+        self.user_size = _align(USER_HEAD.size + USERNAME_BYTES + EMAIL_BYTES)
+        self.hash_bits = max(4, (2 * capacity - 1).bit_length())
+        self.hash_size = 1 << self.hash_bits
+        self.hash_offset = HEADER_SIZE
+        self.records_offset = self.hash_offset + 8 * self.hash_size
+        self.prices_offset = self.records_offset + capacity * self.record_size
+        self.names_offset = self.prices_offset + capacity * PRICE_ENTRY.size
+        self.users_offset = self.names_offset + capacity * name_bytes
+        self.file_size = self.users_offset + user_capacity * self.user_size
+
+    def hash_start(self, item_id: int) -> int:
+        return ((item_id * GOLDEN) & MASK64) >> (64 - self.hash_bits)
+
+
+class SharedItemStore:
+    """
+    保存在内存映射文件里的物品仓库，方法的语义和 ItemRepository 相同
+
+    每个进程创建自己的 SharedItemStore（打开同一个文件）；一个实例只应在一个线程里使用
+    """
+
+    def __init__(
+        self,
+        path: str,
+        items: Iterable[Dict] = (),
+        users: Iterable[Dict] = (),
+        capacity: int = 1024,
+        name_bytes: int = 120,
+        description_bytes: int = 360,
+        user_capacity: int = 256,
+    ):
+        """
+        Args:
+            path: 数据文件路径（另外会创建 路径.lock 作为写锁）
+            items: 文件不存在时写入的初始物品
+            users: 文件不存在时写入的初始用户
+            capacity: 新文件的初始物品槽位数（用完后自动扩容）
+            name_bytes: 新文件中物品名称的最大字节数
+            description_bytes: 新文件中物品描述的最大字节数
+            user_capacity: 新文件的初始用户槽位数
+        """
+        self.path = path
+        self.retries = 0  # 读到一半遇到写入而重读的次数
+        self.rebuilds = 0
+        self._thread_lock = threading.Lock()
+        self._lock_file = open(path + ".lock", "a+b")
+        self._mm: Optional[mmap.mmap] = None
+        self._file = None
+        with self._locked():
+            if not os.path.exists(path) or os.path.getsize(path) < HEADER_SIZE:
+                items = list({item["id"]: dict(item) for item in items}.values())
+                users = list({user["id"]: dict(user) for user in users}.values())
+                layout = Layout(max(capacity, len(items) * 2, 16), name_bytes, description_bytes,
+                                max(user_capacity, len(users) * 2, 16))
+                self.layout = layout
+                entries = [(self._pack_item(item), item["name"].casefold().encode("utf-8")) for item in items]
+                self._build(layout, entries, [self._pack_user(user) for user in users], 0)
+            self._open()
+
+        # 预加载应用后再 fork 出工作进程时（uvicorn_launcher.py），子进程要有自己的写锁
+        if hasattr(os, "register_at_fork"):
+            store = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: store() is not None and store()._after_fork())
+
+    # ---------- 文件和锁 ----------
+
+    def _open(self):
+        """映射数据文件（重新打开时先关闭旧的映射）"""
+        self._close_mapping()
+        self._file = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, name_bytes, description_bytes, *_ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是共享物品文件: {self.path}")
+        self.layout = Layout(self._get(CAPACITY), name_bytes, description_bytes, self._get(USER_CAPACITY))
+
+    def _after_fork(self):
+        """
+        fork 出的子进程重新打开锁文件
+
+        flock 的锁属于打开的文件，父子进程共用继承来的文件时互相不排斥；
+        共享映射（MAP_SHARED）在子进程中可以继续使用
+        """
+        if self._lock_file.closed:
+            return
+        self._lock_file = open(self.path + ".lock", "a+b")
+        self._thread_lock = threading.Lock()
+
+    def _close_mapping(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    def close(self):
+        self._close_mapping()
+        self._lock_file.close()
+
+    def _get(self, offset: int) -> int:
+        return U64.unpack_from(self._mm, offset)[0]
+
+    def _put(self, offset: int, value: int):
+        U64.pack_into(self._mm, offset, value)
+
+    def _reopen_if_replaced(self):
+        if self._get(REPLACED):
+            self._open()
+
+    @contextmanager
+    def _locked(self):
+        """写锁：同一进程的线程之间用 threading.Lock，进程之间用文件锁"""
+        with self._thread_lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._lock_file.seek(0)
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._lock_file.seek(0)
+                    msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @contextmanager
+    def _writing(self):
+        """在写锁内修改数据：序列号先变成奇数，改完变回偶数，数据版本加 1"""
+        seq = self._get(SEQ)
+        self._put(SEQ, seq + 1)
+        try:
+            yield
+        finally:
+            self._put(VERSION, self._get(VERSION) + 1)
+            self._put(SEQ, seq + 2)
+
+    def _read(self, operation: Callable[[], Any]) -> Any:
+        """
+        无锁读取：读的前后序列号相同才返回结果，否则重读
+
+        读的过程中数据可能被改了一半，这时 operation 可能出错（例如解码到半个汉字），
+        只要序列号变了就忽略这个错误并重读
+        """
+        waiting_since = None
+        while True:
+            seq, replaced = SEQ_AND_REPLACED.unpack_from(self._mm, SEQ)
+            if replaced:
+                self._open()
+                continue
+            if seq & 1:
+                if waiting_since is None:
+                    waiting_since = time.monotonic()
+                elif time.monotonic() - waiting_since > STUCK_WRITER_SECONDS:
+                    self._recover()
+                    waiting_since = None
+                _yield()
+                continue
+            try:
+                result = operation()
+            except Exception:
+                if self._get(SEQ) == seq:
+                    raise
+                self.retries += 1
+                continue
+            # 文件被替换时旧文件的序列号也会改变，所以只需要再比较一次序列号
+            if self._get(SEQ) == seq:
+                return result
+            self.retries += 1
+
+    def _recover(self):
+        """拿到写锁后序列号仍是奇数：上一个写入的进程中途退出了，根据物品记录重建"""
+        with self._locked():
+            self._reopen_if_replaced()
+            if self._get(SEQ) & 1:
+                logger.warning("共享物品文件 %s 的写入没有完成，重建索引", self.path)
+                self._rebuild(self.layout.capacity, self.layout.user_capacity)
+
+    # ---------- 建立和重建文件 ----------
+
+    def _build(self, layout: Layout, entries: List[Tuple[bytes, bytes]], users: List[bytes], version: int):
+        """
+        写一个新文件（先写到 路径.new 再改名替换）
+
+        Args:
+            entries: 每个物品的 (记录, 名称列)，按插入顺序
+            users: 每个用户的记录
+        """
+        new_path = self.path + ".new"
+        with open(new_path, "w+b") as f:
+            f.truncate(layout.file_size)
+            with mmap.mmap(f.fileno(), 0) as mm:
+                mm[0:HEADER.size] = HEADER.pack(
+                    MAGIC, layout.name_bytes, layout.description_bytes, 0, 0, version, 0,
+                    layout.capacity, len(entries), len(entries), layout.user_capacity, len(users),
+                )
+                keys = []
+                mask = layout.hash_size - 1
+                for slot, (record, name) in enumerate(entries):
+                    offset = layout.records_offset + slot * layout.record_size
+                    mm[offset:offset + layout.record_size] = record
+                    offset = layout.names_offset + slot * layout.name_bytes
+                    mm[offset:offset + len(name)] = name
+                    item_id, price = RECORD_KEY.unpack_from(record)
+                    keys.append((price, item_id, slot))
+                    position = layout.hash_start(item_id)
+                    while I64.unpack_from(mm, layout.hash_offset + 8 * position)[0]:
+                        position = (position + 1) & mask
+                    I64.pack_into(mm, layout.hash_offset + 8 * position, slot + 1)
+                keys.sort()
+                mm[layout.prices_offset:layout.prices_offset + len(keys) * PRICE_ENTRY.size] = \
+                    b"".join(PRICE_ENTRY.pack(*key) for key in keys)
+                mm[layout.users_offset:layout.users_offset + len(users) * layout.user_size] = b"".join(users)
+        os.replace(new_path, self.path)
+
+    def _rebuild(self, capacity: int, user_capacity: int):
+        """把现有的物品和用户（跳过已删除的）复制到一个新文件，替换当前文件"""
+        layout, mm = self.layout, self._mm
+        entries: Dict[int, Tuple[bytes, bytes]] = {}
+        for slot in range(min(self._get(USED), layout.capacity)):
+            offset = layout.records_offset + slot * layout.record_size
+            item_id, _, flags, *_ = RECORD_HEAD.unpack_from(mm, offset)
+            if flags & DELETED:
+                continue
+            name_offset = layout.names_offset + slot * layout.name_bytes
+            entries[item_id] = (mm[offset:offset + layout.record_size],
+                                mm[name_offset:name_offset + layout.name_bytes].rstrip(b"\0"))
+        users = [
+            mm[layout.users_offset + i * layout.user_size:layout.users_offset + (i + 1) * layout.user_size]
+            for i in range(min(self._get(USER_COUNT), layout.user_capacity))
+        ]
+        new_layout = Layout(capacity, layout.name_bytes, layout.description_bytes, user_capacity)
+        self._build(new_layout, list(entries.values()), users, self._get(VERSION) + 1)
+        # 通知其他进程：旧文件已被替换（改序列号让正在读旧文件的进程重读）
+        seq = self._get(SEQ) | 1
+        self._put(SEQ, seq)
+        self._put(REPLACED, 1)
+        self._put(SEQ, seq + 1)
+        self._open()
+        self.rebuilds += 1
+
+    def _ensure_room(self, items: int = 0, users: int = 0):
+        """槽位不够时重建文件：物品多就扩容，删除的多就按原容量压缩"""
+        layout = self.layout
+        if self._get(USED) + items <= layout.capacity and self._get(USER_COUNT) + users <= layout.user_capacity:
+            return
+        live = self._get(COUNT) + items
+        capacity = layout.capacity
+        while live > capacity * 3 // 4:
+            capacity *= 2
+        user_capacity = layout.user_capacity
+        while self._get(USER_COUNT) + users > user_capacity:
+            user_capacity *= 2
+        self._rebuild(capacity, user_capacity)
+
+    # ---------- 记录编码 ----------
+
+    def _pack_item(self, item: Dict) -> bytes:
+        """
+        把物品编码为定长记录
+
+        Raises:
+            RecordFormatError: 有不支持的字段、字段太长或数值超出范围
+        """
+        layout = self.layout
+        extra = set(item) - ITEM_FIELDS
+        if extra:
+            raise RecordFormatError(f"不支持的字段: {', '.join(sorted(extra))}")
+        name = item["name"].encode("utf-8")
+        if len(name) > layout.name_bytes or len(item["name"].casefold().encode("utf-8")) > layout.name_bytes:
+            raise RecordFormatError(f"物品名称超过 {layout.name_bytes} 字节")
+        description = item.get("description")
+        flags = 0 if "description" in item else NO_DESCRIPTION
+        if description is not None:
+            flags |= HAS_DESCRIPTION
+            description = description.encode("utf-8")
+            if len(description) > layout.description_bytes:
+                raise RecordFormatError(f"物品描述超过 {layout.description_bytes} 字节")
+        else:
+            description = b""
+        available = item.get("is_available")
+        if available is not None:
+            flags |= HAS_AVAILABLE | (AVAILABLE if available else 0)
+        elif "is_available" in item:
+            flags |= AVAILABLE_NONE
+        if not -(1 << 63) <= item["id"] < (1 << 63):
+            raise RecordFormatError("物品ID超出 64 位整数范围")
+        record = (
+            RECORD_HEAD.pack(item["id"], item["price"], flags, 0, len(name), len(description))
+            + name.ljust(layout.name_bytes, b"\0")
+            + description
+        )
+        return record.ljust(layout.record_size, b"\0")
+
+    def _pack_user(self, user: Dict) -> bytes:
+        extra = set(user) - USER_FIELDS
+        if extra:
+            raise RecordFormatError(f"不支持的字段: {', '.join(sorted(extra))}")
+        username = user["username"].encode("utf-8")
+        email = user["email"].encode("utf-8")
+        if len(username) > USERNAME_BYTES or len(email) > EMAIL_BYTES:
+            raise RecordFormatError(f"用户名或邮箱超过 {USERNAME_BYTES}/{EMAIL_BYTES} 字节")
+        if not -(1 << 63) <= user["id"] < (1 << 63):
+            raise RecordFormatError("用户ID超出 64 位整数范围")
+        record = USER_HEAD.pack(user["id"], len(username), len(email)) + username.ljust(USERNAME_BYTES, b"\0") + email
+        return record.ljust(self.layout.user_size, b"\0")
+
+    def check_item(self, item: Dict):
+        """检查物品能否保存为定长记录（不能时抛出 RecordFormatError）"""
+        self._pack_item(item)
+
+    def _decode(self, slot: int) -> Dict:
+        layout, mm = self.layout, self._mm
+        offset = layout.records_offset + slot * layout.record_size
+        item_id, price, flags, _, name_length, description_length = RECORD_HEAD.unpack_from(mm, offset)
+        start = offset + RECORD_HEAD.size
+        item = {"id": item_id, "name": mm[start:start + name_length].decode("utf-8")}
+        if flags & HAS_DESCRIPTION:
+            start += layout.name_bytes
+            item["description"] = mm[start:start + description_length].decode("utf-8")
+        elif not flags & NO_DESCRIPTION:
+            item["description"] = None
+        item["price"] = price
+        if flags & HAS_AVAILABLE:
+            item["is_available"] = bool(flags & AVAILABLE)
+        elif flags & AVAILABLE_NONE:
+            item["is_available"] = None
+        return item
+
+    def _decode_user(self, index: int) -> Dict:
+        offset = self.layout.users_offset + index * self.layout.user_size
+        user_id, username_length, email_length = USER_HEAD.unpack_from(self._mm, offset)
+        start = offset + USER_HEAD.size
+        return {
+            "id": user_id,
+            "username": self._mm[start:start + username_length].decode("utf-8"),
+            "email": self._mm[start + USERNAME_BYTES:start + USERNAME_BYTES + email_length].decode("utf-8"),
+        }
+
+    # ---------- 哈希表和价格索引 ----------
+
+    def _find(self, item_id: int) -> Tuple[int, Optional[int]]:
+        """查找物品：返回 (哈希表位置, 槽位)，不存在时槽位为 None、位置是第一个空位"""
+        layout, mm = self.layout, self._mm
+        mask = layout.hash_size - 1
+        position = layout.hash_start(item_id)
+        while True:
+            value = I64.unpack_from(mm, layout.hash_offset + 8 * position)[0]
+            if value == 0:
+                return position, None
+            if value > 0 and I64.unpack_from(mm, layout.records_offset + (value - 1) * layout.record_size)[0] == item_id:
+                return position, value - 1
+            position = (position + 1) & mask
+
+    def _hash_insert(self, item_id: int, slot: int):
+        """写入哈希表（可以复用已删除的位置）"""
+        layout, mm = self.layout, self._mm
+        mask = layout.hash_size - 1
+        position = layout.hash_start(item_id)
+        while I64.unpack_from(mm, layout.hash_offset + 8 * position)[0] > 0:
+            position = (position + 1) & mask
+        I64.pack_into(mm, layout.hash_offset + 8 * position, slot + 1)
+
+    def _price_bisect(self, key: Tuple, right: bool = False, count: Optional[int] = None) -> int:
+        """在价格索引的前 count 项中二分查找 key 的位置（right=True 时跳过相等的项）"""
+        mm, base = self._mm, self.layout.prices_offset
+        low, high = 0, self._get(COUNT) if count is None else count
+        while low < high:
+            middle = (low + high) // 2
+            entry = PRICE_KEY.unpack_from(mm, base + middle * PRICE_ENTRY.size)
+            if entry < key or (right and entry == key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _price_insert(self, keys: List[Tuple[float, int, int]], count: int):
+        """把新的 (价格, id, 槽位) 插入有 count 项的价格索引"""
+        mm, base, size = self._mm, self.layout.prices_offset, PRICE_ENTRY.size
+        if len(keys) == 1:
+            position = self._price_bisect(keys[0][:2], count=count)
+            mm.move(base + (position + 1) * size, base + position * size, (count - position) * size)
+            PRICE_ENTRY.pack_into(mm, base + position * size, *keys[0])
+            return
+        # 多个新键：在旧数组中找到各自的位置，一次拼接出新数组
+        keys.sort()
+        old = mm[base:base + count * size]
+        parts = []
+        previous = 0
+        for key in keys:
+            position = self._price_bisect(key[:2], count=count)
+            parts.append(old[previous * size:position * size])
+            parts.append(PRICE_ENTRY.pack(*key))
+            previous = position
+        parts.append(old[previous * size:])
+        mm[base:base + (count + len(keys)) * size] = b"".join(parts)
+
+    def _price_remove(self, price: float, item_id: int, count: int):
+        """从有 count 项的价格索引中删除 (价格, id)"""
+        mm, base, size = self._mm, self.layout.prices_offset, PRICE_ENTRY.size
+        position = self._price_bisect((price, item_id), count=count)
+        mm.move(base + position * size, base + (position + 1) * size, (count - position - 1) * size)
+
+    def _price_entries(self, start: int, stop: int) -> Iterator[Tuple[float, int, int]]:
+        mm, base, size = self._mm, self.layout.prices_offset, PRICE_ENTRY.size
+        for position in range(start, stop):
+            yield PRICE_ENTRY.unpack_from(mm, base + position * size)
+
+    def _write_slot(self, slot: int, record: bytes, name: str):
+        """写入一个槽位的记录和名称列"""
+        layout, mm = self.layout, self._mm
+        offset = layout.records_offset + slot * layout.record_size
+        mm[offset:offset + layout.record_size] = record
+        folded = name.casefold().encode("utf-8")
+        offset = layout.names_offset + slot * layout.name_bytes
+        mm[offset:offset + layout.name_bytes] = folded.ljust(layout.name_bytes, b"\0")
+
+    # ---------- 物品 ----------
+
+    def __len__(self) -> int:
+        return self._read(lambda: self._get(COUNT))
+
+    @property
+    def version(self) -> int:
+        """数据版本号（每次修改加 1）"""
+        if self._get(REPLACED):
+            self._open()
+        return self._get(VERSION)
+
+    def get(self, item_id: int) -> Optional[Dict]:
+        def operation():
+            _, slot = self._find(item_id)
+            return None if slot is None else self._decode(slot)
+        return self._read(operation)
+
+    def list(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """按插入顺序列出物品"""
+        def operation():
+            layout, mm = self.layout, self._mm
+            flags_offset = layout.records_offset + 16
+            live = (
+                slot for slot in range(self._get(USED))
+                if not mm[flags_offset + slot * layout.record_size] & DELETED
+            )
+            stop = None if limit is None else offset + limit
+            return [self._decode(slot) for slot in islice(live, offset, stop)]
+        return self._read(operation)
+
+    def create(self, item: Dict) -> Dict:
+        """
+        新增物品
+
+        Raises:
+            ItemExistsError: ID 已存在
+            RecordFormatError: 物品不符合定长记录格式
+        """
+        record = self._pack_item(item)
+        with self._locked():
+            self._reopen_if_replaced()
+            if self._find(item["id"])[1] is not None:
+                raise ItemExistsError(f"物品ID已存在: {item['id']}")
+            self._ensure_room(items=1)
+            slot = self._get(USED)
+            with self._writing():
+                self._write_slot(slot, record, item["name"])
+                self._hash_insert(item["id"], slot)
+                self._price_insert([(item["price"], item["id"], slot)], self._get(COUNT))
+                self._put(USED, slot + 1)
+                self._put(COUNT, self._get(COUNT) + 1)
+            return self._decode(slot)
+
+    def create_many(self, items: Iterable[Dict]) -> List[bool]:
+        """
+        批量新增物品：一次加锁，价格索引一次合并所有新键
+
+        Returns:
+            List[bool]: 每个物品是否新增成功（False 表示 ID 已存在，包括和同一批中前面的物品重复）
+        """
+        items = list(items)
+        records = [self._pack_item(item) for item in items]
+        with self._locked():
+            self._reopen_if_replaced()
+            created = []
+            seen = set()
+            for item in items:
+                ok = item["id"] not in seen and self._find(item["id"])[1] is None
+                seen.add(item["id"])
+                created.append(ok)
+            new = sum(created)
+            if not new:
+                return created
+            self._ensure_room(items=new)
+            slot = self._get(USED)
+            keys = []
+            with self._writing():
+                for item, record, ok in zip(items, records, created):
+                    if not ok:
+                        continue
+                    self._write_slot(slot, record, item["name"])
+                    self._hash_insert(item["id"], slot)
+                    keys.append((item["price"], item["id"], slot))
+                    slot += 1
+                self._price_insert(keys, self._get(COUNT))
+                self._put(USED, slot)
+                self._put(COUNT, self._get(COUNT) + new)
+            return created
+
+    def update(self, item_id: int, item: Dict) -> Optional[Dict]:
+        """替换物品（ID 和插入顺序保持不变），不存在时返回 None"""
+        item = dict(item, id=item_id)
+        record = self._pack_item(item)
+        with self._locked():
+            self._reopen_if_replaced()
+            _, slot = self._find(item_id)
+            if slot is None:
+                return None
+            old_price = RECORD_KEY.unpack_from(self._mm, self.layout.records_offset + slot * self.layout.record_size)[1]
+            with self._writing():
+                self._write_slot(slot, record, item["name"])
+                if old_price != item["price"]:
+                    count = self._get(COUNT)
+                    self._price_remove(old_price, item_id, count)
+                    self._price_insert([(item["price"], item_id, slot)], count - 1)
+            return self._decode(slot)
+
+    def delete(self, item_id: int) -> Optional[Dict]:
+        """删除物品，返回被删除的物品，不存在时返回 None"""
+        with self._locked():
+            self._reopen_if_replaced()
+            position, slot = self._find(item_id)
+            if slot is None:
+                return None
+            item = self._decode(slot)
+            layout = self.layout
+            with self._writing():
+                self._mm[layout.records_offset + slot * layout.record_size + 16] |= DELETED
+                offset = layout.names_offset + slot * layout.name_bytes
+                self._mm[offset:offset + layout.name_bytes] = bytes(layout.name_bytes)
+                I64.pack_into(self._mm, layout.hash_offset + 8 * position, -1)
+                self._price_remove(item["price"], item_id, self._get(COUNT))
+                self._put(COUNT, self._get(COUNT) - 1)
+            return item
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[PriceKey] = None
+    ) -> Tuple[List[Dict], Optional[PriceKey]]:
+        """按名称关键词和价格区间搜索，参数和返回值同 ItemRepository.search"""
+        def operation():
+            start, stop = self._price_bounds(min_price, max_price, after)
+            if not q:
+                matches = self._price_entries(start, stop)
+            elif (min_price is not None or max_price is not None) and stop - start < PRICE_SCAN_LIMIT:
+                needle = q.casefold().encode("utf-8")
+                matches = (entry for entry in self._price_entries(start, stop) if self._name_contains(entry[2], needle))
+            else:
+                matches = iter(self._search_names(q, min_price, max_price, after))
+
+            end = None if limit is None else offset + limit + 1
+            page = list(islice(matches, offset, end))
+            last_key = None
+            if limit is not None and len(page) > limit:
+                page = page[:limit]
+                last_key = page[-1][:2]
+            return [self._decode(slot) for _, _, slot in page], last_key
+        return self._read(operation)
+
+    def _price_bounds(self, min_price: Optional[float], max_price: Optional[float],
+                      after: Optional[PriceKey]) -> Tuple[int, int]:
+        """价格区间（以及游标之后）在价格索引中的位置范围"""
+        minimum = None if min_price is None else (min_price, float("-inf"))
+        if after is not None and (minimum is None or tuple(after) >= minimum):
+            start = self._price_bisect(tuple(after), right=True)
+        else:
+            start = 0 if minimum is None else self._price_bisect(minimum)
+        stop = self._get(COUNT) if max_price is None else self._price_bisect((max_price, float("inf")))
+        return start, max(start, stop)
+
+    def _name_contains(self, slot: int, needle: bytes) -> bool:
+        layout = self.layout
+        offset = layout.names_offset + slot * layout.name_bytes
+        return self._mm.find(needle, offset, offset + layout.name_bytes) >= 0
+
+    def _search_names(self, q: str, min_price: Optional[float], max_price: Optional[float],
+                      after: Optional[PriceKey]) -> List[Tuple[float, int, int]]:
+        """在名称列中扫描关键词（mmap.find），再按价格过滤、排序"""
+        layout, mm = self.layout, self._mm
+        needle = q.casefold().encode("utf-8")
+        width = layout.name_bytes
+        base = layout.names_offset
+        end = base + self._get(USED) * width
+        keys = []
+        position = mm.find(needle, base, end)
+        while position >= 0:
+            slot = (position - base) // width
+            slot_end = base + (slot + 1) * width
+            if position + len(needle) <= slot_end:
+                # 找到了：检查价格，然后从下一个槽位继续
+                item_id, price = RECORD_KEY.unpack_from(mm, layout.records_offset + slot * layout.record_size)
+                key = (price, item_id)
+                if ((min_price is None or price >= min_price) and (max_price is None or price <= max_price)
+                        and (after is None or key > tuple(after))):
+                    keys.append((price, item_id, slot))
+                position = mm.find(needle, slot_end, end)
+            else:
+                # 跨越了两个槽位的边界，不算
+                position = mm.find(needle, position + 1, end)
+        keys.sort()
+        return keys
+
+    # ---------- 用户 ----------
+
+    def list_users(self) -> List[Dict]:
+        return self._read(lambda: [self._decode_user(i) for i in range(self._get(USER_COUNT))])
+
+    def _find_user(self, user_id: int) -> Optional[int]:
+        layout = self.layout
+        for index in range(self._get(USER_COUNT)):
+            if I64.unpack_from(self._mm, layout.users_offset + index * layout.user_size)[0] == user_id:
+                return index
+        return None
+
+    def get_user(self, user_id: int) -> Optional[Dict]:
+        def operation():
+            index = self._find_user(user_id)
+            return None if index is None else self._decode_user(index)
+        return self._read(operation)
+
+    def create_user(self, user: Dict) -> Dict:
+        """
+        新增用户
+
+        Raises:
+            UserExistsError: ID 已存在
+        """
+        record = self._pack_user(user)
+        with self._locked():
+            self._reopen_if_replaced()
+            if self._find_user(user["id"]) is not None:
+                raise UserExistsError(f"用户ID已存在: {user['id']}")
+            self._ensure_room(users=1)
+            index = self._get(USER_COUNT)
+            offset = self.layout.users_offset + index * self.layout.user_size
+            with self._writing():
+                self._mm[offset:offset + self.layout.user_size] = record
+                self._put(USER_COUNT, index + 1)
+            return self._decode_user(index)
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "items": len(self),
+            "users": self._get(USER_COUNT),
+            "capacity": self.layout.capacity,
+            "used_slots": self._get(USED),
+            "file_bytes": self.layout.file_size,
+            "record_bytes": self.layout.record_size,
+            "version": self.version,
+            "read_retries": self.retries,
+            "rebuilds": self.rebuilds,
+        }
+
+
+class SharedMemoryBackend(ItemBackend):
+    """共享内存后端：数据在内存映射文件里，所有工作进程共用一份（见 SharedItemStore）"""
+
+    def __init__(self, path: str, items: Iterable[Dict] = (), users: Iterable[Dict] = (), **options):
+        self.store = SharedItemStore(path, items, users, **options)
+
+    async def get_item(self, item_id: int) -> Optional[Dict]:
+        return self.store.get(item_id)
+
+    async def list_items(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        return self.store.list(offset, limit)
+
+    async def create_item(self, item: Dict) -> Dict:
+        return self.store.create(item)
+
+    async def create_items(self, items: List[Dict]) -> List[bool]:
+        return self.store.create_many(items)
+
+    async def update_item(self, item_id: int, item: Dict) -> Optional[Dict]:
+        return self.store.update(item_id, item)
+
+    async def delete_item(self, item_id: int) -> Optional[Dict]:
+        return self.store.delete(item_id)
+
+    async def search_items(self, q=None, min_price=None, max_price=None, offset=0, limit=None, after=None):
+        return self.store.search(q, min_price, max_price, offset=offset, limit=limit, after=after)
+
+    async def count_items(self) -> int:
+        return len(self.store)
+
+    async def list_users(self) -> List[Dict]:
+        return self.store.list_users()
+
+    async def get_user(self, user_id: int) -> Optional[Dict]:
+        return self.store.get_user(user_id)
+
+    async def create_user(self, user: Dict) -> Dict:
+        return self.store.create_user(user)
+
+    def check_item(self, item: Dict):
+        self.store.check_item(item)
+
+    def data_version(self) -> int:
+        return self.store.version
+
+    def stats(self) -> Dict:
+        return {"backend": "shm", **self.store.stats()}
+
+    async def close(self):
+        self.store.close()
@@ -0,0 +1,471 @@
+"""
+物品仓库（带索引的内存存储）
+========================
+
+fastapi_tutorial.py 和 examples/fastapi_test.py 原来把物品放在一个列表里，
+查找、更新、删除都要从头遍历，删除还要移动后面所有元素，物品越多越慢。
+ItemRepository 把同样的数据放进几个索引：
+- 主索引：id -> 物品的字典（哈希表），按 id 查找、新增、删除都是 O(1)
+- 价格索引：按 (价格, id) 排序的 SortedIndex，价格区间查询只需二分查找
+- 名称索引：NgramIndex，物品名的单字和相邻两字 -> 物品 ID 集合（倒排索引），
+  中文名没有空格分词，按字切分正好适用
+
+搜索时先用名称索引找出包含查询中所有两字片段的物品（候选集只和结果数量有关），
+再按价格过滤；没有关键词时直接按价格索引顺序遍历。结果按 (价格, id) 排序，
+支持 offset/limit 分页，也支持用上一页最后一条的 (价格, id) 作为游标继续翻页。
+
+SortedIndex 把有序数据分成若干个小块（每块最多 LOAD 个元素），
+插入和删除只移动一个小块里的元素，不会因为数据量变大而变慢。
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import base64
+import operator
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# 每个小块的最大元素数：块太小则块数多，块太大则插入时移动的元素多
+LOAD = 512
+
+# /search/items 分页时不指定 limit 的每页数量
+SEARCH_PAGE_SIZE = 50
+
+PriceKey = Tuple[float, int]
+
+
+class ItemExistsError(ValueError):
+    """物品 ID 已存在"""
+
+
+class SortedIndex:
+    """分块的有序列表：插入、删除 O(log n + LOAD)，按范围遍历只访问结果附近的块"""
+
+    def __init__(self, keys: Iterable[Any] = ()):
+        keys = sorted(keys)
+        self._blocks: List[List[Any]] = [keys[i:i + LOAD] for i in range(0, len(keys), LOAD)]
+        self._maxes: List[Any] = [block[-1] for block in self._blocks]  # 每块的最大值，用来二分定位块
+        self._size = len(keys)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _block_index(self, key: Any) -> int:
+        """key 应该所在的块"""
+        index = bisect_left(self._maxes, key)
+        return min(index, len(self._blocks) - 1)
+
+    def add(self, key: Any):
+        """插入一个键"""
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+        else:
+            index = self._block_index(key)
+            block = self._blocks[index]
+            insort(block, key)
+            self._maxes[index] = block[-1]
+            if len(block) > LOAD * 2:
+                # 块太大时一分为二
+                self._blocks[index:index + 1] = [block[:LOAD], block[LOAD:]]
+                self._maxes[index:index + 1] = [block[LOAD - 1], block[-1]]
+        self._size += 1
+
+    def update(self, keys: Iterable[Any]):
+        """
+        批量插入：新键排序后按所在的块分组，每块只定位一次
+
+        新键比块数少时逐个 add 更快
+        """
+        keys = sorted(keys)
+        if len(keys) <= len(self._blocks):
+            for key in keys:
+                self.add(key)
+            return
+        if not self._blocks:
+            self.__init__(keys)
+            return
+
+        blocks = []
+        start = 0
+        last = len(self._blocks) - 1
+        for index, block in enumerate(self._blocks):
+            # 不大于本块最大值的新键放进本块（和 add 的定位规则一致），最后一块收下剩余的键
+            end = len(keys) if index == last else bisect_right(keys, self._maxes[index], start)
+            if end - start > LOAD // 16:
+                # 本块新键很多：拼接后排序一次（两段有序数据，排序只需一次归并）
+                block = block + keys[start:end]
+                block.sort()
+            else:
+                # 新键很少：逐个二分插入，比整块排序的比较次数少
+                for key in keys[start:end]:
+                    insort(block, key)
+            start = end
+            if len(block) > LOAD * 2:
+                blocks.extend(block[i:i + LOAD] for i in range(0, len(block), LOAD))
+            else:
+                blocks.append(block)
+        self._blocks = blocks
+        self._maxes = [block[-1] for block in blocks]
+        self._size += len(keys)
+
+    def remove(self, key: Any):
+        """
+        删除一个键
+
+        Raises:
+            KeyError: 键不存在
+        """
+        if not self._blocks:
+            raise KeyError(key)
+        index = self._block_index(key)
+        block = self._blocks[index]
+        position = bisect_left(block, key)
+        if position == len(block) or block[position] != key:
+            raise KeyError(key)
+        del block[position]
+        if block:
+            self._maxes[index] = block[-1]
+        else:
+            del self._blocks[index]
+            del self._maxes[index]
+        self._size -= 1
+
+    def irange(self, minimum: Any = None, maximum: Any = None, exclusive_min: bool = False) -> Iterator[Any]:
+        """
+        按顺序遍历 minimum <= key <= maximum 的键（None 表示不限）
+
+        Args:
+            exclusive_min: 为 True 时不包含等于 minimum 的键（用于游标分页）
+        """
+        if not self._blocks:
+            return
+        if minimum is None:
+            index, position = 0, 0
+        else:
+            find = bisect_right if exclusive_min else bisect_left
+            index = find(self._maxes, minimum)
+            if index == len(self._blocks):
+                return
+            position = find(self._blocks[index], minimum)
+
+        # 按下标逐块遍历（不切片 self._blocks，切片会复制所有后续块的引用）
+        while index < len(self._blocks):
+            block = self._blocks[index]
+            for key in block[position:] if position else block:
+                if maximum is not None and key > maximum:
+                    return
+                yield key
+            index += 1
+            position = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.irange()
+
+    def count(self, minimum: Any = None, maximum: Any = None) -> int:
+        """minimum <= key <= maximum 的键数（只访问区间两端之间的块）"""
+        if not self._blocks:
+            return 0
+        if minimum is None:
+            first, first_pos = 0, 0
+        else:
+            first = bisect_left(self._maxes, minimum)
+            if first == len(self._blocks):
+                return 0
+            first_pos = bisect_left(self._blocks[first], minimum)
+        if maximum is None:
+            last, last_pos = len(self._blocks) - 1, len(self._blocks[-1])
+        else:
+            last = min(bisect_right(self._maxes, maximum), len(self._blocks) - 1)
+            last_pos = bisect_right(self._blocks[last], maximum)
+        if last < first:
+            return 0
+        if first == last:
+            return max(0, last_pos - first_pos)
+        middle = sum(len(self._blocks[i]) for i in range(first + 1, last))
+        return len(self._blocks[first]) - first_pos + middle + last_pos
+
+
+def encode_cursor(key: PriceKey) -> str:
+    """把 (价格, id) 编码为不透明的游标字符串"""
+    return base64.urlsafe_b64encode(f"{key[0]!r}:{key[1]}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> PriceKey:
+    """
+    解码游标
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        price, item_id = text.split(":")
+        return (float(price), int(item_id))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+
+
+def ngrams(text: str) -> Set[str]:
+    """文本的单字和相邻两字（先转成小写）"""
+    text = text.casefold()
+    # map(operator.add, ...) 在 C 里拼接相邻两字，比逐个切片快
+    return {*text, *map(operator.add, text, text[1:])}
+
+
+class NgramIndex:
+    """名称的 n-gram 倒排索引：片段 -> 物品 ID 集合"""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+
+    def add(self, item_id: int, text: str):
+        postings = self._postings
+        for gram in ngrams(text):
+            ids = postings.get(gram)
+            if ids is None:
+                postings[gram] = {item_id}
+            else:
+                ids.add(item_id)
+
+    def remove(self, item_id: int, text: str):
+        for gram in ngrams(text):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(item_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def _postings_for(self, query: str) -> List[Set[int]]:
+        """查询的片段对应的倒排列表，从小到大排列"""
+        query = query.casefold()
+        grams = {query[i:i + 2] for i in range(len(query) - 1)} if len(query) > 1 else {query}
+        return sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+
+    def estimate(self, query: str) -> int:
+        """候选集大小的上限（最小的倒排列表长度）"""
+        postings = self._postings_for(query)
+        return len(postings[0]) if postings else 0
+
+    def candidates(self, query: str) -> Set[int]:
+        """
+        可能包含 query 的物品 ID（还需要再确认是否真的是子串）
+
+        查询两个字以上时用它的所有两字片段，单字查询用单字片段；
+        从最小的集合开始求交集，代价只和最小集合的大小有关
+        """
+        postings = self._postings_for(query)
+        if not postings or not postings[0]:
+            return set()
+        result = set(postings[0])
+        for other in postings[1:]:
+            result &= other
+            if not result:
+                break
+        return result
+
+
+class ItemRepository:
+    """
+    物品仓库：物品仍然是普通字典（可以直接作为 FastAPI 的返回值），
+    所有修改都通过仓库进行，保证索引和数据一致
+    """
+
+    def __init__(self, items: Iterable[Dict] = ()):
+        self._items: Dict[int, Dict] = {}  # 主索引：id -> 物品（保持插入顺序）
+        for item in items:
+            self._items[item["id"]] = dict(item)
+        self._by_price = SortedIndex(self._price_key(item) for item in self._items.values())
+        self._by_name = NgramIndex()
+        for item in self._items.values():
+            self._by_name.add(item["id"], item["name"])
+
+    @staticmethod
+    def _price_key(item: Dict) -> PriceKey:
+        return (item["price"], item["id"])
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._items
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._items.values())
+
+    def get(self, item_id: int) -> Optional[Dict]:
+        """按 ID 获取物品，不存在时返回 None"""
+        return self._items.get(item_id)
+
+    def list(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """按插入顺序列出物品"""
+        if offset == 0 and limit is None:
+            return list(self._items.values())
+        values = iter(self._items.values())
+        for _ in range(offset):
+            if next(values, None) is None:
+                return []
+        if limit is None:
+            return list(values)
+        return [item for _, item in zip(range(limit), values)]
+
+    def create(self, item: Dict) -> Dict:
+        """
+        新增物品
+
+        Raises:
+            ItemExistsError: ID 已存在
+        """
+        if item["id"] in self._items:
+            raise ItemExistsError(f"物品ID已存在: {item['id']}")
+        item = dict(item)
+        self._items[item["id"]] = item
+        self._by_price.add(self._price_key(item))
+        self._by_name.add(item["id"], item["name"])
+        return item
+
+    def create_many(self, items: Iterable[Dict]) -> List[bool]:
+        """
+        批量新增物品，价格索引一次合并所有新键
+
+        Returns:
+            List[bool]: 每个物品是否新增成功（False 表示 ID 已存在，包括和同一批中前面的物品重复）
+        """
+        created = []
+        keys = []
+        for item in items:
+            if item["id"] in self._items:
+                created.append(False)
+                continue
+            item = dict(item)
+            self._items[item["id"]] = item
+            keys.append(self._price_key(item))
+            self._by_name.add(item["id"], item["name"])
+            created.append(True)
+        self._by_price.update(keys)
+        return created
+
+    def update(self, item_id: int, item: Dict) -> Optional[Dict]:
+        """替换物品（ID 保持不变），不存在时返回 None"""
+        existing = self._items.get(item_id)
+        if existing is None:
+            return None
+        item = dict(item, id=item_id)
+        if item["price"] != existing["price"]:
+            self._by_price.remove(self._price_key(existing))
+            self._by_price.add(self._price_key(item))
+        if item["name"] != existing["name"]:
+            self._by_name.remove(item_id, existing["name"])
+            self._by_name.add(item_id, item["name"])
+        self._items[item_id] = item
+        return item
+
+    def delete(self, item_id: int) -> Optional[Dict]:
+        """删除物品，返回被删除的物品，不存在时返回 None"""
+        item = self._items.pop(item_id, None)
+        if item is not None:
+            self._by_price.remove(self._price_key(item))
+            self._by_name.remove(item_id, item["name"])
+        return item
+
+    def price_range(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Iterator[Dict]:
+        """按价格从低到高遍历价格区间内的物品（价格相同时按 ID）"""
+        minimum = None if min_price is None else (min_price, float("-inf"))
+        maximum = None if max_price is None else (max_price, float("inf"))
+        for _, item_id in self._by_price.irange(minimum, maximum):
+            yield self._items[item_id]
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[PriceKey] = None
+    ) -> Tuple[List[Dict], Optional[PriceKey]]:
+        """
+        按名称关键词和价格区间搜索，结果按 (价格, id) 排序
+
+        Args:
+            q: 名称中包含的关键词（不区分大小写）
+            min_price: 最低价格
+            max_price: 最高价格
+            offset: 跳过的结果数
+            limit: 最多返回的结果数（None 表示不限）
+            after: 游标，只返回排在该 (价格, id) 之后的结果
+
+        Returns:
+            Tuple[List[Dict], Optional[PriceKey]]: 本页结果，以及后面还有结果时最后一条的 (价格, id)
+        """
+        if not q:
+            matches = self._search_by_price(min_price, max_price, after)
+        elif (min_price is not None or max_price is not None) and self._price_count(min_price, max_price) < self._by_name.estimate(q):
+            # 价格区间比关键词更有选择性：沿价格索引遍历，逐个检查名称
+            needle = q.casefold()
+            matches = (
+                item for item in self._search_by_price(min_price, max_price, after)
+                if needle in item["name"].casefold()
+            )
+        else:
+            matches = self._search_by_name(q, min_price, max_price, after)
+
+        # 多取一条，用来判断后面还有没有结果
+        stop = None if limit is None else offset + limit + 1
+        page = list(islice(matches, offset, stop))
+        if limit is not None and len(page) > limit:
+            page = page[:limit]
+            return page, self._price_key(page[-1])
+        return page, None
+
+    def _price_count(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        """价格区间内的物品数"""
+        minimum = None if min_price is None else (min_price, float("-inf"))
+        maximum = None if max_price is None else (max_price, float("inf"))
+        return self._by_price.count(minimum, maximum)
+
+    def _search_by_price(
+        self,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        after: Optional[PriceKey]
+    ) -> Iterator[Dict]:
+        """没有关键词：沿价格索引遍历，只访问返回的那几条"""
+        minimum = None if min_price is None else (min_price, float("-inf"))
+        exclusive = False
+        if after is not None and (minimum is None or after >= minimum):
+            minimum, exclusive = after, True
+        maximum = None if max_price is None else (max_price, float("inf"))
+        for _, item_id in self._by_price.irange(minimum, maximum, exclusive_min=exclusive):
+            yield self._items[item_id]
+
+    def _search_by_name(
+        self,
+        q: str,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        after: Optional[PriceKey]
+    ) -> Iterator[Dict]:
+        """有关键词：名称索引给出候选集，再确认子串、按价格过滤并排序"""
+        needle = q.casefold()
+        keys = []
+        for item_id in self._by_name.candidates(q):
+            item = self._items[item_id]
+            key = self._price_key(item)
+            if min_price is not None and key[0] < min_price:
+                continue
+            if max_price is not None and key[0] > max_price:
+                continue
+            if after is not None and key <= after:
+                continue
+            if needle in item["name"].casefold():
+                keys.append(key)
+        keys.sort()
+        for _, item_id in keys:
+            yield self._items[item_id]
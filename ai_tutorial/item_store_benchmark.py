@@ -0,0 +1,588 @@
+"""
+物品仓库性能测试
+==============
+
+对比原来的列表实现（每次请求遍历 fake_items_db）和 ItemRepository（哈希索引 + 价格排序索引）
+在不同物品数量下每个操作的耗时，以及 item_backend.py 中内存后端和 SQLite 后端在并发写入下的吞吐量。
+bulk 场景启动 fastapi_tutorial.py 服务器，对比逐个 POST /items 和 POST /items/bulk 导入、GET /items/export 导出的速度；
+cache 场景对比开启和关闭响应缓存（response_cache.py）时读接口的吞吐量；
+shared 场景对比多个工作进程各自一份内存数据和共用一份共享内存数据（item_shared.py）时的读取吞吐量和内存占用。
+
+运行示例：
+    python item_store_benchmark.py repository --sizes 1000 10000 100000 1000000
+    python item_store_benchmark.py search --sizes 1000 10000 100000 1000000
+    python item_store_benchmark.py backends --concurrency 1 16 128
+    python item_store_benchmark.py bulk --items 1000000
+    python item_store_benchmark.py cache --items 10000
+    python item_store_benchmark.py shared --items 100000 --workers 1 2 4 --writer
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from item_backend import ItemBackend, MemoryBackend, SQLiteBackend
+from item_shared import SharedItemStore
+from item_store import ItemRepository
+
+
+# 搜索测试用的商品名
+PRODUCT_NAMES = ["苹果", "香蕉", "橙子", "葡萄", "西瓜", "草莓", "Apple Juice", "Banana Milk"]
+
+
+def make_items(count: int, seed: int = 42) -> List[Dict]:
+    """生成 count 个物品（ID 从 1 开始）"""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "name": f"{rng.choice(PRODUCT_NAMES)}{i}",
+            "description": "性能测试物品",
+            "price": round(rng.uniform(1, 1000), 2),
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+# ---------- 原来的列表实现（和改造前的接口代码相同） ----------
+
+def list_get(db: List[Dict], item_id: int) -> Optional[Dict]:
+    for item in db:
+        if item["id"] == item_id:
+            return item
+    return None
+
+
+def list_create(db: List[Dict], item: Dict) -> bool:
+    for existing_item in db:
+        if existing_item["id"] == item["id"]:
+            return False
+    db.append(item)
+    return True
+
+
+def list_update(db: List[Dict], item_id: int, item: Dict) -> Optional[Dict]:
+    for i, existing_item in enumerate(db):
+        if existing_item["id"] == item_id:
+            db[i] = dict(item, id=item_id)
+            return db[i]
+    return None
+
+
+def list_delete(db: List[Dict], item_id: int) -> Optional[Dict]:
+    for i, item in enumerate(db):
+        if item["id"] == item_id:
+            return db.pop(i)
+    return None
+
+
+def time_per_op(operation: Callable[[int], object], operations: int) -> float:
+    """执行 operations 次操作，返回每次操作的平均微秒数"""
+    start = time.perf_counter()
+    for i in range(operations):
+        operation(i)
+    return (time.perf_counter() - start) / operations * 1e6
+
+
+def bench_operations(size: int, operations: int, list_operations: int, seed: int) -> Dict:
+    """某一个物品数量下，列表实现和仓库各操作的平均耗时（微秒）"""
+    items = make_items(size, seed)
+    rng = random.Random(seed)
+    # 随机访问的 ID：列表实现中平均要扫描一半的物品
+    targets = [rng.randint(1, size) for _ in range(max(operations, list_operations))]
+    new_item = {"id": 0, "name": "新物品", "description": "", "price": 9.9}
+
+    result = {"items": size}
+
+    db = list(items)
+    result["list_us"] = {
+        "get": time_per_op(lambda i: list_get(db, targets[i]), list_operations),
+        "create": time_per_op(lambda i: list_create(db, dict(new_item, id=size + 1 + i)), list_operations),
+        "update": time_per_op(lambda i: list_update(db, targets[i], dict(new_item, price=i)), list_operations),
+        "delete": time_per_op(lambda i: list_delete(db, size + 1 + i), list_operations),
+    }
+
+    start = time.perf_counter()
+    repository = ItemRepository(items)
+    result["repository_build_seconds"] = round(time.perf_counter() - start, 3)
+    result["repository_us"] = {
+        "get": time_per_op(lambda i: repository.get(targets[i]), operations),
+        "create": time_per_op(lambda i: repository.create(dict(new_item, id=size + 1 + i)), operations),
+        "update": time_per_op(lambda i: repository.update(targets[i], dict(new_item, price=i % 1000)), operations),
+        "delete": time_per_op(lambda i: repository.delete(size + 1 + i), operations),
+        "price_range_10": time_per_op(
+            lambda i: [item for _, item in zip(range(10), repository.price_range(targets[i] % 900))],
+            operations
+        ),
+    }
+
+    for key in ("list_us", "repository_us"):
+        result[key] = {name: round(value, 3) for name, value in result[key].items()}
+    return result
+
+
+def list_search(db: List[Dict], q: Optional[str], min_price: Optional[float],
+                max_price: Optional[float]) -> List[Dict]:
+    """改造前的搜索：复制整个列表再过滤三遍"""
+    results = db.copy()
+    if q:
+        results = [item for item in results if q.lower() in item["name"].lower()]
+    if min_price is not None:
+        results = [item for item in results if item["price"] >= min_price]
+    if max_price is not None:
+        results = [item for item in results if item["price"] <= max_price]
+    return results
+
+
+def bench_search(size: int, operations: int, list_operations: int, page_size: int, seed: int) -> Dict:
+    """
+    某一个物品数量下的搜索耗时（微秒）
+
+    查询的结果数量不随物品总数变化：按名称精确到某个物品、价格窗口按物品数缩小
+    """
+    items = make_items(size, seed)
+    repository = ItemRepository(items)
+    rng = random.Random(seed)
+    # 价格均匀分布在 1~1000，窗口宽度让每个窗口平均有 page_size 个物品
+    width = 999 * page_size / size
+
+    def name_query(i: int) -> str:
+        return items[(i * 7919) % size]["name"]
+
+    def price_window(i: int) -> float:
+        return 1 + (i * 37 % 900)
+
+    queries = {
+        "name": lambda i: (name_query(i), None, None),
+        "price_range": lambda i: (None, price_window(i), price_window(i) + width),
+        "name_and_price": lambda i: (PRODUCT_NAMES[i % 6], price_window(i), price_window(i) + width * 8),
+    }
+
+    result = {"items": size, "list_us": {}, "repository_us": {}, "result_sizes": {}}
+    for name, query in queries.items():
+        result["list_us"][name] = round(time_per_op(lambda i: list_search(items, *query(i)), list_operations), 3)
+        result["repository_us"][name] = round(time_per_op(
+            lambda i: repository.search(*query(i), limit=page_size), operations
+        ), 3)
+        result["result_sizes"][name] = len(list_search(items, *query(rng.randrange(1000))))
+
+    # 深度翻页：游标翻到第 20 页和 offset 翻到第 20 页
+    q = (None, 1.0, 1000.0)
+    after = None
+    start = time.perf_counter()
+    for _ in range(20):
+        page, after = repository.search(*q, limit=page_size, after=after)
+    result["repository_us"]["cursor_20_pages"] = round((time.perf_counter() - start) * 1e6, 3)
+    start = time.perf_counter()
+    repository.search(*q, offset=19 * page_size, limit=page_size)
+    result["repository_us"]["offset_page_20"] = round((time.perf_counter() - start) * 1e6, 3)
+    return result
+
+
+def run_search(args) -> Dict:
+    """搜索耗时随物品总数的变化"""
+    return {
+        "scenario": "search",
+        "page_size": args.page_size,
+        "results": [
+            bench_search(size, args.operations, args.list_operations, args.page_size, args.seed)
+            for size in args.sizes
+        ],
+    }
+
+
+async def backend_throughput(backend: ItemBackend, concurrency: int, operations: int, first_id: int) -> Dict:
+    """concurrency 个协程同时写入（再同时读取），返回每秒操作数"""
+    per_task = max(1, operations // concurrency)
+
+    async def writer(task: int):
+        for i in range(per_task):
+            item_id = first_id + task * per_task + i
+            await backend.create_item({"id": item_id, "name": f"物品{item_id}", "description": "", "price": i % 1000})
+
+    async def reader(task: int):
+        rng = random.Random(task)
+        for _ in range(per_task):
+            await backend.get_item(first_id + rng.randrange(per_task * concurrency))
+
+    result = {}
+    for name, worker in (("writes_per_second", writer), ("reads_per_second", reader)):
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(task) for task in range(concurrency)))
+        result[name] = round(per_task * concurrency / (time.perf_counter() - start))
+    return result
+
+
+async def bench_backends(args) -> List[Dict]:
+    """内存后端和 SQLite 后端（有/没有组提交）在不同并发数下的吞吐量"""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        configs = [("memory", lambda path: MemoryBackend(make_items(args.size, args.seed)))]
+        for synchronous in args.synchronous:
+            for group_commit in (True, False):
+                configs.append((
+                    f"sqlite synchronous={synchronous} group_commit={group_commit}",
+                    lambda path, synchronous=synchronous, group_commit=group_commit: SQLiteBackend(
+                        path, make_items(args.size, args.seed), pool_size=args.pool_size,
+                        synchronous=synchronous, max_batch=256 if group_commit else 1
+                    )
+                ))
+
+        for index, (name, factory) in enumerate(configs):
+            backend = factory(os.path.join(directory, f"items{index}.db"))
+            entry = {"backend": name}
+            first_id = args.size + 1
+            for concurrency in args.concurrency:
+                entry[f"concurrency_{concurrency}"] = await backend_throughput(
+                    backend, concurrency, args.operations, first_id
+                )
+                first_id += args.operations + concurrency
+            entry["stats"] = backend.stats()
+            await backend.close()
+            results.append(entry)
+    return results
+
+
+def run_backends(args) -> Dict:
+    """存储后端在并发写入下的吞吐量"""
+    return {
+        "scenario": "backends",
+        "initial_items": args.size,
+        "operations": args.operations,
+        "results": asyncio.run(bench_backends(args)),
+    }
+
+
+def start_api_server(port: int, env: Dict) -> subprocess.Popen:
+    """在子进程中启动 fastapi_tutorial.py 的应用，等待就绪"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fastapi_tutorial:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=here, env=dict(os.environ, **env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            connection.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("服务器启动超时")
+
+
+def ndjson_body(items: List[Dict], lines_per_chunk: int = 1000):
+    """按块生成 NDJSON 请求体（分块传输，不需要事先拼出整个请求体）"""
+    for i in range(0, len(items), lines_per_chunk):
+        yield "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items[i:i + lines_per_chunk]).encode("utf-8")
+
+
+def bench_bulk(port: int, items: List[Dict], single_posts: int, chunk_size: int) -> Dict:
+    """对一个已启动的服务器：逐个 POST、批量导入、导出"""
+    result = {}
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+
+    # 逐个 POST /items（只测一小部分，按速率估算全部的耗时）
+    start = time.perf_counter()
+    for item in items[:single_posts]:
+        connection.request("POST", "/items", body=json.dumps(item), headers={"Content-Type": "application/json"})
+        connection.getresponse().read()
+    per_item = (time.perf_counter() - start) / single_posts
+    result["single_post_items_per_second"] = round(1 / per_item)
+    result["single_post_estimated_seconds"] = round(per_item * len(items), 1)
+
+    # POST /items/bulk（前 single_posts 个已存在，结果为 exists）
+    start = time.perf_counter()
+    connection.request(
+        "POST", f"/items/bulk?chunk_size={chunk_size}", body=ndjson_body(items),
+        headers={"Content-Type": "application/x-ndjson"}, encode_chunked=True
+    )
+    response = connection.getresponse()
+    summary = None
+    for line in response:
+        if line.startswith(b'{"summary"'):
+            summary = json.loads(line)["summary"]
+    result["bulk_seconds"] = round(time.perf_counter() - start, 2)
+    result["bulk_items_per_second"] = round(len(items) / result["bulk_seconds"])
+    result["bulk_summary"] = summary
+
+    # GET /items/export
+    start = time.perf_counter()
+    connection.request("GET", "/items/export")
+    response = connection.getresponse()
+    exported = sum(1 for _ in response)
+    result["export_seconds"] = round(time.perf_counter() - start, 2)
+    result["exported_items"] = exported
+    connection.close()
+    return result
+
+
+def run_bulk(args) -> Dict:
+    """逐个 POST 和批量导入在两种存储后端下的速度"""
+    items = make_items(args.items, args.seed)
+    for item in items:
+        item["id"] += 1000  # 避开示例数据的 ID
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends:
+            address = "memory" if backend == "memory" else f"sqlite:{os.path.join(directory, 'bulk.db')}"
+            process = start_api_server(args.port, {"ITEM_STORE": address})
+            try:
+                results.append({"backend": backend, **bench_bulk(args.port, items, args.single_posts, args.chunk_size)})
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+    return {"scenario": "bulk", "items": args.items, "results": results}
+
+
+def bench_cache(port: int, requests: int, paths: List[str]) -> Dict:
+    """每个路径连续请求 requests 次（再带 If-None-Match 请求 requests 次），返回每秒请求数"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    result = {}
+    for path in paths:
+        start = time.perf_counter()
+        for _ in range(requests):
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+        entry = {"requests_per_second": round(requests / (time.perf_counter() - start))}
+        etag = response.getheader("etag")
+        if etag:
+            start = time.perf_counter()
+            for _ in range(requests):
+                connection.request("GET", path, headers={"If-None-Match": etag})
+                connection.getresponse().read()
+            entry["conditional_requests_per_second"] = round(requests / (time.perf_counter() - start))
+        result[path] = entry
+    connection.request("GET", "/cache/stats")
+    result["cache_stats"] = json.loads(connection.getresponse().read())
+    connection.close()
+    return result
+
+
+def run_cache(args) -> Dict:
+    """开启/关闭响应缓存时读接口的吞吐量"""
+    items = make_items(args.items, args.seed)
+    for item in items:
+        item["id"] += 1000
+    paths = ["/items", "/users", f"/search/items?q={quote(PRODUCT_NAMES[0])}&limit=50", "/search/items?min_price=100&max_price=200&limit=100"]
+    results = []
+    for max_bytes in (0, 64 * 1024 * 1024):
+        process = start_api_server(args.port, {"ITEM_STORE": "memory", "RESPONSE_CACHE_MAX_BYTES": str(max_bytes)})
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", args.port, timeout=600)
+            connection.request("POST", "/items/bulk", body=ndjson_body(items),
+                               headers={"Content-Type": "application/x-ndjson"}, encode_chunked=True)
+            connection.getresponse().read()
+            connection.close()
+            results.append({"cache": max_bytes > 0, **bench_cache(args.port, args.requests, paths)})
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    return {"scenario": "cache", "items": args.items, "requests": args.requests, "results": results}
+
+
+def proportional_memory_kb() -> Optional[int]:
+    """当前进程分摊的内存（PSS：共享的内存页按共用的进程数平分），只在 Linux 上可用"""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def shared_reader(kind: str, path: str, size: int, seed: int, seconds: float, barrier, results):
+    """一个读取进程：准备好数据后等所有进程就绪，然后反复按 ID 读取（每 100 次按价格翻一页）"""
+    store = ItemRepository(make_items(size, seed)) if kind == "memory" else SharedItemStore(path)
+    for item_id in range(1, size + 1):  # 预热：共享内存的页面第一次访问时才映射进来
+        store.get(item_id)
+    rng = random.Random(os.getpid())
+    ids = [rng.randint(1, size) for _ in range(100)]
+    gets = searches = 0
+    barrier.wait()
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for item_id in ids:
+            store.get(item_id)
+        low = rng.uniform(1, 990)
+        store.search(min_price=low, max_price=low + 10, limit=20)
+        gets += len(ids)
+        searches += 1
+    results.put({
+        "gets": gets,
+        "searches": searches,
+        "pss_kb": proportional_memory_kb(),
+        "retries": getattr(store, "retries", 0),
+    })
+
+
+def shared_writer(path: str, size: int, seconds: float, barrier, results):
+    """写入进程：不停地修改随机物品的价格"""
+    store = SharedItemStore(path)
+    rng = random.Random(0)
+    writes = 0
+    barrier.wait()
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        item_id = rng.randint(1, size)
+        item = store.get(item_id)
+        store.update(item_id, dict(item, price=round(rng.uniform(1, 1000), 2)))
+        writes += 1
+    results.put({"writes": writes})
+
+
+def bench_shared(kind: str, path: str, workers: int, writer: bool, args) -> Dict:
+    """workers 个读取进程（可选再加一个写入进程）同时运行 args.seconds 秒"""
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers + writer)
+    results = context.Queue()
+    processes = [
+        context.Process(target=shared_reader, args=(kind, path, args.items, args.seed, args.seconds, barrier, results))
+        for _ in range(workers)
+    ]
+    if writer:
+        processes.append(context.Process(target=shared_writer, args=(path, args.items, args.seconds, barrier, results)))
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    readers = [report for report in reports if "gets" in report]
+    memory = [report["pss_kb"] for report in readers]
+    result = {
+        "backend": kind,
+        "workers": workers,
+        "gets_per_second": round(sum(report["gets"] for report in readers) / args.seconds),
+        "searches_per_second": round(sum(report["searches"] for report in readers) / args.seconds),
+        "readers_total_pss_mb": round(sum(memory) / 1024, 1) if None not in memory else None,
+    }
+    if writer:
+        result["writes_per_second"] = round(sum(report.get("writes", 0) for report in reports) / args.seconds)
+        result["read_retries"] = sum(report["retries"] for report in readers)
+    return result
+
+
+def run_shared(args) -> Dict:
+    """每个工作进程一份内存数据 vs 所有工作进程共用一份共享内存数据"""
+    directory = tempfile.mkdtemp(prefix="item_shared_")
+    path = os.path.join(directory, "items.shm")
+    SharedItemStore(path, items=make_items(args.items, args.seed)).close()
+    results = []
+    for workers in args.workers:
+        results.append(bench_shared("memory", path, workers, False, args))
+        results.append(bench_shared("shm", path, workers, False, args))
+        if args.writer:
+            results.append(bench_shared("shm", path, workers, True, args))
+    return {
+        "scenario": "shared",
+        "items": args.items,
+        "seconds": args.seconds,
+        "cpu_count": os.cpu_count(),
+        "file_mb": round(os.path.getsize(path) / 1024 / 1024, 1),
+        "results": results,
+    }
+
+
+def run_repository(args) -> Dict:
+    """仓库和列表实现在不同数据量下的对比"""
+    return {
+        "scenario": "repository",
+        "operations": args.operations,
+        "list_operations": args.list_operations,
+        "results": [
+            bench_operations(size, args.operations, args.list_operations, args.seed)
+            for size in args.sizes
+        ],
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="物品仓库性能测试")
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    repository = subparsers.add_parser("repository", help="对比列表遍历和索引仓库的增删改查耗时")
+    repository.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+                            help="物品数量 (默认: 1000 10000 100000 1000000)")
+    repository.add_argument("--operations", type=int, default=20000, help="仓库每种操作的次数 (默认: 20000)")
+    repository.add_argument("--list-operations", type=int, default=50, help="列表实现每种操作的次数 (默认: 50)")
+    repository.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+
+    search = subparsers.add_parser("search", help="对比列表过滤和索引搜索的耗时")
+    search.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+                        help="物品数量 (默认: 1000 10000 100000 1000000)")
+    search.add_argument("--operations", type=int, default=2000, help="索引搜索的次数 (默认: 2000)")
+    search.add_argument("--list-operations", type=int, default=10, help="列表过滤的次数 (默认: 10)")
+    search.add_argument("--page-size", type=int, default=50, help="每页结果数 (默认: 50)")
+    search.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+
+    backends = subparsers.add_parser("backends", help="对比内存后端和 SQLite 后端在并发写入下的吞吐量")
+    backends.add_argument("--size", type=int, default=10000, help="初始物品数量 (默认: 10000)")
+    backends.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 128],
+                          help="同时写入的协程数 (默认: 1 16 128)")
+    backends.add_argument("--operations", type=int, default=5000, help="每个并发数下的写入/读取次数 (默认: 5000)")
+    backends.add_argument("--pool-size", type=int, default=4, help="SQLite 读连接数 (默认: 4)")
+    backends.add_argument("--synchronous", nargs="+", default=["NORMAL", "FULL"],
+                          help="SQLite 的 synchronous 设置 (默认: NORMAL FULL)")
+    backends.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+
+    bulk = subparsers.add_parser("bulk", help="对比逐个 POST 和 NDJSON 批量导入/导出（会启动 fastapi_tutorial 服务器）")
+    bulk.add_argument("--items", type=int, default=1000000, help="导入的物品数量 (默认: 1000000)")
+    bulk.add_argument("--single-posts", type=int, default=2000, help="逐个 POST 测试的物品数 (默认: 2000)")
+    bulk.add_argument("--chunk-size", type=int, default=5000, help="批量导入每块的行数 (默认: 5000)")
+    bulk.add_argument("--backends", nargs="+", default=["memory", "sqlite"], help="存储后端 (默认: memory sqlite)")
+    bulk.add_argument("--port", type=int, default=8765, help="服务器端口 (默认: 8765)")
+    bulk.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+
+    cache = subparsers.add_parser("cache", help="对比开启和关闭响应缓存时读接口的吞吐量（会启动 fastapi_tutorial 服务器）")
+    cache.add_argument("--items", type=int, default=10000, help="物品数量 (默认: 10000)")
+    cache.add_argument("--requests", type=int, default=500, help="每个接口的请求次数 (默认: 500)")
+    cache.add_argument("--port", type=int, default=8765, help="服务器端口 (默认: 8765)")
+    cache.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+
+    shared = subparsers.add_parser("shared", help="对比每个工作进程一份内存数据和共用共享内存数据时的读取吞吐量")
+    shared.add_argument("--items", type=int, default=100000, help="物品数量 (默认: 100000)")
+    shared.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="读取进程数 (默认: 1 2 4)")
+    shared.add_argument("--seconds", type=float, default=3.0, help="每组测试的时长（秒） (默认: 3)")
+    shared.add_argument("--writer", action="store_true", help="共享内存测试中再加一个不停写入的进程")
+    shared.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+
+    args = parser.parse_args()
+
+    if args.scenario == "repository":
+        result = run_repository(args)
+    elif args.scenario == "search":
+        result = run_search(args)
+    elif args.scenario == "backends":
+        result = run_backends(args)
+    elif args.scenario == "bulk":
+        result = run_bulk(args)
+    elif args.scenario == "cache":
+        result = run_cache(args)
+    elif args.scenario == "shared":
+        result = run_shared(args)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
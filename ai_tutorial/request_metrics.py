@@ -0,0 +1,356 @@
+"""
+接口耗时统计和 /metrics（Prometheus 文本格式）
+=========================================
+
+用 uvicorn 运行 fastapi_tutorial.app 时，看不出哪个接口慢。RequestMetricsMiddleware 记录每个请求：
+
+- 耗时直方图：按 (方法, 路由模板, 状态码) 分组，例如 GET /items/{item_id} 200
+  （用路由模板而不是实际路径，/items/1、/items/2 算同一个接口，分组数量不会无限增长）
+- 请求体和响应体大小的直方图
+- 正在处理的请求数（按方法）
+
+直方图的桶按对数划分（耗时每个桶是上一个的 2 倍：0.1ms、0.2ms、0.4ms……约 52 秒），
+记录一次只是找到桶的位置再把计数加一，不保存每个请求的耗时，内存占用固定。
+每个工作进程是单线程的事件循环，中间件只在事件循环里修改计数，所以不需要加锁。
+
+多个工作进程（uvicorn --workers N）时，每个进程只有自己的计数。设置环境变量 METRICS_DIR
+为一个所有工作进程都能访问的空目录后：
+- 每个工作进程每秒把自己的计数写到 METRICS_DIR/worker_<pid>.json
+- 任意一个工作进程收到 GET /metrics 时，读取目录中所有文件合并后返回
+- 也可以不经过服务器直接合并：python request_metrics.py METRICS_DIR
+已经退出的工作进程留下的计数继续计入（计数器不会变小），但它的“正在处理的请求数”不再计入。
+
+使用方法：
+    metrics = RequestMetrics(directory=os.environ.get("METRICS_DIR"))
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics)   # 最后添加，放在最外层
+
+    @app.get("/metrics")
+    async def get_metrics():
+        return PlainTextResponse(await metrics.render_all(), media_type=CONTENT_TYPE)
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 耗时桶的上界（秒）：0.1ms 起每个桶翻倍，共 20 个，最大约 52 秒
+LATENCY_BUCKETS = tuple(0.0001 * 2 ** i for i in range(20))
+
+# 大小桶的上界（字节）：64B 起每个桶乘 4，最大 64MB
+SIZE_BUCKETS = tuple(64 * 4 ** i for i in range(11))
+
+# 工作进程写计数文件的间隔（秒）
+FLUSH_INTERVAL = 1.0
+
+# 找不到路由的请求（404）统一记在这个路由名下
+UNMATCHED_ROUTE = "<unmatched>"
+
+# 分组键：(方法, 路由模板, 状态码)
+SeriesKey = Tuple[str, str, str]
+
+
+class Histogram:
+    """对数分桶的直方图（每个桶只存计数，最后一个桶是 +Inf）"""
+
+    __slots__ = ("bounds", "buckets", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets)
+
+    def merge(self, buckets: List[int], total: float):
+        for i, count in enumerate(buckets):
+            self.buckets[i] += count
+        self.sum += total
+
+    def to_list(self) -> List:
+        return [self.buckets, self.sum]
+
+
+class Series:
+    """一个分组（方法 + 路由 + 状态码）的三个直方图"""
+
+    __slots__ = ("latency", "request_size", "response_size")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_size = Histogram(SIZE_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+
+
+class RequestMetrics:
+    """一个工作进程的请求统计（可选：和其他工作进程通过 directory 共享）"""
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = FLUSH_INTERVAL):
+        """
+        Args:
+            directory: 多个工作进程共享计数的目录（None 表示只统计当前进程）
+            flush_interval: 写计数文件的间隔（秒）
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.series: Dict[SeriesKey, Series] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.started = time.time()
+        self._flusher: Optional[asyncio.Task] = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # ---------- 记录 ----------
+
+    def request_started(self, method: str):
+        self.in_flight[method] = self.in_flight.get(method, 0) + 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float,
+                         request_bytes: int, response_bytes: int):
+        self.in_flight[method] -= 1
+        key = (method, route, str(status))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = Series()
+        series.latency.observe(seconds)
+        series.request_size.observe(request_bytes)
+        series.response_size.observe(response_bytes)
+
+    # ---------- 快照和合并 ----------
+
+    def snapshot(self) -> Dict:
+        """当前进程计数的快照（可以 JSON 序列化）"""
+        return {
+            "pid": os.getpid(),
+            "started": self.started,
+            "in_flight": dict(self.in_flight),
+            "series": [
+                [*key, series.latency.to_list(), series.request_size.to_list(), series.response_size.to_list()]
+                for key, series in self.series.items()
+            ],
+        }
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, f"worker_{os.getpid()}.json")
+
+    def flush(self):
+        """把快照写到共享目录（先写临时文件再改名，读取方不会读到写了一半的文件）"""
+        if not self.directory:
+            return
+        temporary = self.snapshot_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, separators=(",", ":"))
+        os.replace(temporary, self.snapshot_path)
+
+    async def start(self):
+        """启动后台任务，定期写计数文件（没有共享目录时什么都不做）"""
+        if self.directory and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """停止后台任务并写最后一次计数（此时正在处理的请求数为 0）"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    async def render_all(self) -> str:
+        """所有工作进程合并后的 Prometheus 文本（没有共享目录时只有当前进程）"""
+        if not self.directory:
+            return render([self.snapshot()])
+        self.flush()
+        return render(load_snapshots(self.directory, self.flush_interval))
+
+    def stats(self) -> Dict:
+        return {
+            "series": len(self.series),
+            "requests": sum(series.latency.count for series in self.series.values()),
+            "in_flight": sum(self.in_flight.values()),
+            "directory": self.directory,
+        }
+
+
+def load_snapshots(directory: str, flush_interval: float = FLUSH_INTERVAL) -> List[Dict]:
+    """
+    读取目录中所有工作进程的快照
+
+    超过 3 个写入间隔没有更新的文件视为已退出的工作进程：计数保留，正在处理的请求数清零
+    """
+    snapshots = []
+    now = time.time()
+    for path in sorted(glob.glob(os.path.join(directory, "worker_*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            stale = now - os.path.getmtime(path) > 3 * flush_interval
+        except (OSError, ValueError):
+            continue  # 文件刚被删除或不完整
+        if stale:
+            snapshot["in_flight"] = {}
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def merge(snapshots: Iterable[Dict]) -> Tuple[Dict[SeriesKey, Series], Dict[str, int], int]:
+    """合并多个快照：返回 (分组 -> 直方图, 方法 -> 正在处理的请求数, 工作进程数)"""
+    merged: Dict[SeriesKey, Series] = {}
+    in_flight: Dict[str, int] = {}
+    workers = 0
+    for snapshot in snapshots:
+        workers += 1
+        for method, count in snapshot["in_flight"].items():
+            in_flight[method] = in_flight.get(method, 0) + count
+        for method, route, status, latency, request_size, response_size in snapshot["series"]:
+            key = (method, route, status)
+            series = merged.get(key)
+            if series is None:
+                series = merged[key] = Series()
+            series.latency.merge(*latency)
+            series.request_size.merge(*request_size)
+            series.response_size.merge(*response_size)
+    return merged, in_flight, workers
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return repr(round(bound, 6)) if isinstance(bound, float) else str(bound)
+
+
+def _render_histogram(lines: List[str], name: str, help_text: str, series: Dict[SeriesKey, Series],
+                      attribute: str):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route, status), item in sorted(series.items()):
+        histogram: Histogram = getattr(item, attribute)
+        labels = f'method="{_escape(method)}",route="{_escape(route)}",status="{status}"'
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.buckets):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {cumulative}')
+        cumulative += histogram.buckets[-1]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum!r}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+
+def render(snapshots: Iterable[Dict]) -> str:
+    """把快照合并后输出为 Prometheus 文本格式"""
+    series, in_flight, workers = merge(snapshots)
+    lines: List[str] = []
+    _render_histogram(lines, "http_request_duration_seconds", "请求耗时（秒）", series, "latency")
+    _render_histogram(lines, "http_request_size_bytes", "请求体大小（字节）", series, "request_size")
+    _render_histogram(lines, "http_response_size_bytes", "响应体大小（字节）", series, "response_size")
+    lines.append("# HELP http_requests_in_flight 正在处理的请求数")
+    lines.append("# TYPE http_requests_in_flight gauge")
+    for method, count in sorted(in_flight.items()):
+        lines.append(f'http_requests_in_flight{{method="{_escape(method)}"}} {count}')
+    lines.append("# HELP http_metrics_workers 参与统计的工作进程数")
+    lines.append("# TYPE http_metrics_workers gauge")
+    lines.append(f"http_metrics_workers {workers}")
+    return "\n".join(lines) + "\n"
+
+
+def route_template(scope: Dict) -> str:
+    """
+    请求对应的路由模板
+
+    路由匹配后 scope["route"] 就是匹配到的路由；请求被外层中间件（例如响应缓存）直接处理时
+    没有经过路由，这时自己匹配一次
+    """
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", UNMATCHED_ROUTE)
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    if router is not None:
+        from starlette.routing import Match
+        for candidate in router.routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                return getattr(candidate, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+class RequestMetricsMiddleware:
+    """记录每个 HTTP 请求的耗时、大小和状态码（ASGI 中间件，应放在最外层）"""
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500  # 应用没有发送响应就抛出异常时记为 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def counting_receive():
+            nonlocal request_bytes
+            message = await receive()
+            request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.request_started(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            self.metrics.request_finished(
+                method, route_template(scope), status, time.perf_counter() - start,
+                request_bytes, response_bytes,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并多个工作进程的计数，输出 Prometheus 文本格式")
+    parser.add_argument("directory", help="工作进程写计数文件的目录（METRICS_DIR）")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL,
+                        help=f"工作进程写文件的间隔，用于判断进程是否已退出 (默认: {FLUSH_INTERVAL})")
+    args = parser.parse_args()
+    sys.stdout.write(render(load_snapshots(args.directory, args.flush_interval)))
+
+
+if __name__ == "__main__":
+    main()
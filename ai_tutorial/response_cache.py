@@ -0,0 +1,220 @@
+"""
+响应缓存中间件
+============
+
+GET /items、GET /users、/search/items 这类读接口，在数据没变的情况下每次请求都要重新查询、
+重新序列化出完全相同的 JSON。写操作很少时，可以把序列化好的响应字节缓存起来：
+
+- 缓存键：请求路径 + 查询参数（参数按名称排序，顺序不同也能命中）
+- 缓存容量有上限（条数和字节数），超出时淘汰最久没用过的（LRU）
+- 失效：每个请求先取一次数据版本号（存储后端的 data_version），版本号变了说明数据被修改过，
+  清空整个缓存。SQLite 后端的版本号来自数据库文件，其他工作进程的写入也会让缓存失效
+- 条件请求：响应带 ETag（响应内容的哈希），客户端带 If-None-Match 再次请求时，
+  内容没变就只返回 304，不再发送响应体
+- 统计：命中率、304 次数、淘汰次数、失效次数、缓存占用的字节数
+
+使用方法：
+    cache = ResponseCache()
+    app.add_middleware(ResponseCacheMiddleware, cache=cache, version=db.data_version,
+                       paths=["/items", "/users", "/search/items"])
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class CachedResponse:
+    """缓存的一个响应（状态码、响应头、响应体和 ETag）"""
+
+    __slots__ = ("status", "headers", "body", "etag", "size")
+
+    def __init__(self, status: int, headers: Headers, body: bytes):
+        self.status = status
+        self.body = body
+        self.etag = b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+        self.headers = [
+            (name, value) for name, value in headers if name.lower() not in (b"etag", b"content-length")
+        ] + [(b"etag", self.etag), (b"content-length", str(len(body)).encode())]
+        self.size = len(body) + sum(len(name) + len(value) for name, value in self.headers)
+
+
+class ResponseCache:
+    """按数据版本失效的 LRU 响应缓存"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 max_entry_bytes: int = 8 * 1024 * 1024):
+        """
+        Args:
+            max_entries: 最多缓存的响应数
+            max_bytes: 所有缓存响应的总字节数上限
+            max_entry_bytes: 单个响应超过该字节数时不缓存
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.version: Optional[int] = None
+        self.bytes = 0
+        self.counters = {
+            "hits": 0, "misses": 0, "not_modified": 0, "stores": 0,
+            "evictions": 0, "invalidations": 0, "uncacheable": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def sync_version(self, version: int):
+        """数据版本变化时清空缓存"""
+        if version != self.version:
+            if self._entries:
+                self.counters["invalidations"] += 1
+            self.clear()
+            self.version = version
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters["hits"] += 1
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        """保存响应，超出容量时从最久没用过的开始淘汰"""
+        if entry.size > self.max_entry_bytes or entry.size > self.max_bytes:
+            self.counters["uncacheable"] += 1
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self.counters["stores"] += 1
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.counters["evictions"] += 1
+
+    def stats(self) -> Dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "version": self.version,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            **self.counters,
+        }
+
+
+def cache_key(scope: Dict) -> str:
+    """路径 + 排序后的查询参数"""
+    query = scope.get("query_string", b"").decode("latin-1")
+    if query:
+        query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+    return f"{scope['path']}?{query}"
+
+
+def _header(scope: Dict, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+
+def _etag_matches(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    """If-None-Match 是否包含 etag（可以是逗号分隔的多个值，或者 *）"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(b",")]
+    return b"*" in candidates or etag in candidates or b"W/" + etag in candidates
+
+
+class ResponseCacheMiddleware:
+    """缓存指定路径的 GET 响应（ASGI 中间件）"""
+
+    def __init__(self, app, cache: ResponseCache, version: Callable[[], int], paths: Iterable[str]):
+        """
+        Args:
+            app: 下一层 ASGI 应用
+            cache: 响应缓存
+            version: 返回当前数据版本号的函数（必须很快，每个请求调用一到两次）
+            paths: 要缓存的路径（精确匹配）
+        """
+        self.app = app
+        self.cache = cache
+        self.version = version
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        version = self.version()
+        self.cache.sync_version(version)
+        key = cache_key(scope)
+        if_none_match = _header(scope, b"if-none-match")
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            await self._send_entry(send, entry, if_none_match, b"HIT")
+            return
+
+        # 未命中：缓冲下游的响应，计算 ETag 后再发送
+        start = None
+        chunks = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            else:
+                await send(message)
+
+        await self.app(scope, receive, capture)
+        if start is None:
+            return
+
+        if start["status"] != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": b"".join(chunks)})
+            return
+
+        entry = CachedResponse(start["status"], list(start.get("headers", [])), b"".join(chunks))
+        # 计算响应期间数据被修改过：这个响应可能是旧数据，不缓存
+        if self.cache.version == version and self.version() == version:
+            self.cache.put(key, entry)
+        await self._send_entry(send, entry, if_none_match, b"MISS")
+
+    async def _send_entry(self, send, entry: CachedResponse, if_none_match: Optional[bytes], status: bytes):
+        if _etag_matches(if_none_match, entry.etag):
+            self.cache.counters["not_modified"] += 1
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", entry.etag), (b"x-cache", status)],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({
+            "type": "http.response.start",
+            "status": entry.status,
+            "headers": entry.headers + [(b"x-cache", status)],
+        })
+        await send({"type": "http.response.body", "body": entry.body})
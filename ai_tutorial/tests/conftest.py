@@ -0,0 +1,6 @@
+"""ai_tutorial 的模块按平铺方式互相导入（在本目录下运行），测试前把 ai_tutorial 目录加入 sys.path"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
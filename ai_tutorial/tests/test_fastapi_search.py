@@ -0,0 +1,40 @@
+"""
+/search/items 接口测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_tutorial/tests
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import fastapi_tutorial
+
+
+@pytest.fixture
+def client():
+    with TestClient(fastapi_tutorial.app) as c:
+        yield c
+
+
+def test_search_without_paging_returns_all_matches_in_insertion_order(client):
+    body = client.get("/search/items").json()
+    assert [item["id"] for item in body["results"]] == [1, 2, 3]
+    assert body["count"] == 3
+
+    body = client.get("/search/items", params={"min_price": 3}).json()
+    assert [item["id"] for item in body["results"]] == [1, 3]
+
+
+def test_search_with_limit_pages_by_price(client):
+    body = client.get("/search/items", params={"limit": 2}).json()
+    assert [item["id"] for item in body["results"]] == [2, 1]
+    assert body["next_cursor"] is not None
+
+    body = client.get("/search/items", params={"limit": 2, "cursor": body["next_cursor"]}).json()
+    assert [item["id"] for item in body["results"]] == [3]
+    assert body["next_cursor"] is None
+
+
+def test_search_with_bad_cursor_is_rejected(client):
+    assert client.get("/search/items", params={"cursor": "!!"}).status_code == 400
@@ -0,0 +1,221 @@
+"""
+物品存储后端测试：memory、sqlite、shm 三种后端的行为应该完全一致
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_tutorial/tests
+"""
+
+import asyncio
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from item_backend import RecordFormatError, UserExistsError, create_backend
+from item_bulk import BulkImport
+from item_store import ItemExistsError
+
+# 超出 64 位有符号整数的 ID（SQLite 和共享内存后端存不下）
+HUGE_ID = 2 ** 70
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    price: float
+
+
+ITEMS = [
+    {"id": 1, "name": "Red Apple", "description": "新鲜的红苹果", "price": 3.5},
+    {"id": 2, "name": "Banana", "description": None, "price": 2.0},
+    {"id": 3, "name": "Orange", "price": 4.0},
+    {"id": 4, "name": "Green Apple", "description": "青苹果", "price": 3.5, "is_available": True},
+    {"id": 5, "name": "Pineapple", "description": "菠萝", "price": 9.0, "is_available": None},
+    {"id": 6, "name": "苹果干", "description": "零食", "price": 12.0},
+]
+
+
+@pytest.fixture(params=["memory", "sqlite", "shm"])
+def address(request, tmp_path):
+    if request.param == "memory":
+        return "memory"
+    return f"{request.param}:{tmp_path / ('items.' + request.param)}"
+
+
+def run(address, scenario):
+    """在新的事件循环中创建后端、执行测试，最后关闭后端"""
+    async def main():
+        db = create_backend(address, items=ITEMS, users=[{"id": 1, "username": "张三", "email": "a@example.com"}])
+        try:
+            await scenario(db)
+        finally:
+            await db.close()
+    asyncio.run(main())
+
+
+def test_get_and_list_round_trip_fields(address):
+    async def scenario(db):
+        # None 值和缺少的字段都原样保留
+        for item in ITEMS:
+            assert await db.get_item(item["id"]) == item
+        assert await db.get_item(100) is None
+        assert await db.list_items() == ITEMS
+        assert await db.list_items(offset=2, limit=2) == ITEMS[2:4]
+        assert await db.count_items() == len(ITEMS)
+    run(address, scenario)
+
+
+def test_create_update_delete(address):
+    async def scenario(db):
+        new = {"id": 7, "name": "Mango", "description": None, "price": 6.0}
+        assert await db.create_item(new) == new
+        with pytest.raises(ItemExistsError):
+            await db.create_item(new)
+
+        updated = await db.update_item(7, {"id": 99, "name": "Ripe Mango", "description": "熟芒果", "price": 7.0})
+        assert updated == {"id": 7, "name": "Ripe Mango", "description": "熟芒果", "price": 7.0}
+        assert await db.get_item(7) == updated
+        assert await db.update_item(100, new) is None
+
+        assert await db.delete_item(7) == updated
+        assert await db.get_item(7) is None
+        assert await db.delete_item(7) is None
+        assert await db.count_items() == len(ITEMS)
+    run(address, scenario)
+
+
+def test_users(address):
+    async def scenario(db):
+        user = {"id": 2, "username": "李四", "email": "b@example.com"}
+        assert await db.create_user(user) == user
+        with pytest.raises(UserExistsError):
+            await db.create_user(user)
+        assert await db.get_user(2) == user
+        assert [u["id"] for u in await db.list_users()] == [1, 2]
+    run(address, scenario)
+
+
+def test_search_by_name_and_price(address):
+    async def scenario(db):
+        async def ids(**kwargs):
+            page, _ = await db.search_items(**kwargs)
+            return [item["id"] for item in page]
+
+        # 结果按 (价格, id) 排序，名称不区分大小写
+        assert await ids() == [2, 1, 4, 3, 5, 6]
+        assert await ids(q="apple") == [1, 4, 5]
+        assert await ids(q="APPLE", max_price=5) == [1, 4]
+        assert await ids(q="苹果") == [6]
+        assert await ids(q="a", min_price=3.5, max_price=4.0) == [1, 4, 3]
+        assert await ids(min_price=3.5, max_price=3.5) == [1, 4]
+        assert await ids(q="kiwi") == []
+        assert await ids(offset=4) == [5, 6]
+    run(address, scenario)
+
+
+def test_search_cursor_paging(address):
+    async def scenario(db):
+        everything, last = await db.search_items()
+        assert last is None
+
+        for kwargs in ({}, {"q": "apple"}, {"min_price": 3.0}):
+            expected, _ = await db.search_items(**kwargs)
+            collected, after = [], None
+            while True:
+                page, after = await db.search_items(limit=2, after=after, **kwargs)
+                assert len(page) <= 2
+                collected += page
+                if after is None:
+                    break
+                assert after == (page[-1]["price"], page[-1]["id"])
+            assert collected == expected
+
+        # 游标之后没有结果
+        page, after = await db.search_items(limit=10, after=(everything[-1]["price"], everything[-1]["id"]))
+        assert page == [] and after is None
+    run(address, scenario)
+
+
+def test_out_of_range_ids(address):
+    async def scenario(db):
+        for item_id in (HUGE_ID, -HUGE_ID):
+            assert await db.get_item(item_id) is None
+            assert await db.delete_item(item_id) is None
+            assert await db.get_user(item_id) is None
+
+        page, _ = await db.search_items(after=(3.5, HUGE_ID))
+        assert [item["id"] for item in page] == [3, 5, 6]
+        page, _ = await db.search_items(after=(3.5, -HUGE_ID))
+        assert [item["id"] for item in page] == [1, 4, 3, 5, 6]
+
+        if address == "memory":
+            # 进程内存里的 ID 是 Python 整数，没有范围限制
+            return
+        item = {"id": HUGE_ID, "name": "Huge", "price": 1.0}
+        with pytest.raises(RecordFormatError):
+            db.check_item(item)
+        with pytest.raises(RecordFormatError):
+            await db.create_item(item)
+        with pytest.raises(RecordFormatError):
+            await db.create_items([{"id": 30, "name": "Ok", "price": 1.0}, item])
+        with pytest.raises(RecordFormatError):
+            await db.update_item(HUGE_ID, item)
+        with pytest.raises(RecordFormatError):
+            await db.create_user({"id": HUGE_ID, "username": "x", "email": "x@example.com"})
+        assert await db.count_items() == len(ITEMS)
+    run(address, scenario)
+
+
+def test_filter_items_keeps_insertion_order(address):
+    async def scenario(db):
+        assert [item["id"] for item in await db.filter_items()] == [1, 2, 3, 4, 5, 6]
+        assert [item["id"] for item in await db.filter_items("apple", max_price=5)] == [1, 4]
+    run(address, scenario)
+
+
+def test_bulk_import(address):
+    async def scenario(db):
+        lines = [
+            b'{"id": 10, "name": "Kiwi", "price": 5}',
+            b'',
+            b'{"id": 1, "name": "Duplicate", "price": 1}',
+            b'{"id": 11, "name": "Lemon"}',
+            b'{"id": 12, "name": "Lime", "description": "\\u9752\\u67e0", "price": 1.5}',
+            b'{"id": 10, "name": "Kiwi again", "price": 5}',
+        ]
+
+        async def body():
+            # 故意把一行拆到两个块里
+            data = b"\n".join(lines) + b"\n"
+            yield data[:20]
+            yield data[20:]
+
+        result = await BulkImport(db, Item, chunk_size=2).feed(body())
+        assert result.counts == {"created": 2, "exists": 2, "invalid": 1}
+        assert "price" in result.errors[3]
+        assert await db.get_item(10) == {"id": 10, "name": "Kiwi", "description": None, "price": 5.0}
+        assert await db.get_item(12) == {"id": 12, "name": "Lime", "description": "青柠", "price": 1.5}
+        assert (await db.get_item(1))["name"] == "Red Apple"
+        assert await db.count_items() == len(ITEMS) + 2
+    run(address, scenario)
+
+
+def test_data_version_changes_on_writes(address):
+    async def scenario(db):
+        version = db.data_version()
+        await db.get_item(1)
+        await db.search_items(q="apple")
+        assert db.data_version() == version
+
+        for write in (
+            db.create_item({"id": 20, "name": "Fig", "price": 2.5}),
+            db.update_item(20, {"name": "Dried Fig", "price": 3.0}),
+            db.create_items([{"id": 21, "name": "Date", "price": 1.0}]),
+            db.delete_item(20),
+            db.create_user({"id": 3, "username": "王五", "email": "c@example.com"}),
+        ):
+            await write
+            assert db.data_version() != version
+            version = db.data_version()
+    run(address, scenario)
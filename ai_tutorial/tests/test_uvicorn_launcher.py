@@ -0,0 +1,26 @@
+"""
+启动器配置翻译测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_tutorial/tests
+"""
+
+from uvicorn_launcher import make_plan
+
+
+def test_max_requests_override_caps_profile_jitter():
+    plan = make_plan("fastapi_tutorial:app", "production", {"max_requests": 50})
+    assert plan.limit_max_requests == 50
+    assert plan.limit_max_requests_jitter == 5
+    assert any("--max-requests-jitter" in note for note in plan.notes)
+
+
+def test_explicit_jitter_is_kept():
+    plan = make_plan("fastapi_tutorial:app", "production", {"max_requests": 5, "max_requests_jitter": 3})
+    assert (plan.limit_max_requests, plan.limit_max_requests_jitter) == (5, 3)
+
+
+def test_profile_jitter_without_override():
+    plan = make_plan("fastapi_tutorial:app", "production")
+    assert plan.limit_max_requests_jitter == 100
+    assert not any("--max-requests-jitter" in note for note in plan.notes)
@@ -0,0 +1,134 @@
+"""
+背板服务测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_tutorial/tests
+"""
+
+import asyncio
+import json
+
+import websocket_backplane
+from websocket_backplane import BackplaneBroker, BrokerBackplane, encode_command, open_connection
+
+
+async def _malformed_lines_keep_connection():
+    broker = BackplaneBroker("tcp:127.0.0.1:0")
+    await broker.start()
+    try:
+        sub_reader, sub_writer = await open_connection(broker.address)
+        pub_reader, pub_writer = await open_connection(broker.address)
+
+        # 合法 JSON 但不是对象、字段缺失或类型不对的行都应该被跳过
+        for line in [b"[1]\n", b"5\n", b'"x"\n', b"null\n", b"not json\n",
+                     b'{"op":"pub"}\n', b'{"op":"sub","room":1}\n', b'{"op":"pub","room":"r","data":[]}\n']:
+            sub_writer.write(line)
+            pub_writer.write(line)
+
+        sub_writer.write(encode_command("sub", "r"))
+        await sub_writer.drain()
+        await asyncio.sleep(0.05)
+        pub_writer.write(encode_command("pub", "r", {"text": "hi"}))
+        await pub_writer.drain()
+
+        line = await asyncio.wait_for(sub_reader.readline(), timeout=5)
+        assert json.loads(line)["data"] == {"text": "hi"}
+        assert broker.rejected == 16
+        assert broker.connections == 2
+
+        sub_writer.close()
+        pub_writer.close()
+    finally:
+        await broker.stop()
+
+
+def test_malformed_lines_do_not_drop_connection():
+    asyncio.run(_malformed_lines_keep_connection())
+
+
+async def _stop_disconnects_clients():
+    broker = BackplaneBroker("tcp:127.0.0.1:0")
+    await broker.start()
+    reader, writer = await open_connection(broker.address)
+    writer.write(encode_command("sub", "r"))
+    await writer.drain()
+    await asyncio.sleep(0.05)
+
+    await broker.stop()
+    assert await asyncio.wait_for(reader.read(), timeout=5) == b""
+    writer.close()
+
+
+def test_stop_disconnects_clients():
+    asyncio.run(_stop_disconnects_clients())
+
+
+async def _long_lines_are_skipped():
+    broker = BackplaneBroker("tcp:127.0.0.1:0")
+    await broker.start()
+    received = []
+    arrived = asyncio.Event()
+
+    async def handler(room, data):
+        received.append((room, data))
+        arrived.set()
+
+    subscriber = BrokerBackplane(broker.address)
+    await subscriber.start(handler)
+    subscriber.subscribe("r")
+    try:
+        pub_reader, pub_writer = await open_connection(broker.address)
+        await asyncio.sleep(0.1)
+
+        pub_writer.write(encode_command("pub", "r", {"text": "x" * 4000}))
+        pub_writer.write(encode_command("pub", "r", {"text": "short"}))
+        await pub_writer.drain()
+
+        await asyncio.wait_for(arrived.wait(), timeout=5)
+        assert received == [("r", {"text": "short"})]
+        assert broker.rejected >= 1
+        assert broker.connections == 2
+
+        # 太长的消息在客户端就被丢弃，不发给背板服务
+        subscriber.publish("r", {"text": "y" * 4000})
+        assert subscriber.dropped == 1
+        pub_writer.close()
+    finally:
+        await subscriber.stop()
+        await broker.stop()
+
+
+def test_long_lines_do_not_drop_connection(monkeypatch):
+    monkeypatch.setattr(websocket_backplane, "MAX_LINE_BYTES", 1024)
+    asyncio.run(_long_lines_are_skipped())
+
+
+async def _client_survives_long_line():
+    # 模拟一个不限制行长度的背板服务：先发一条超长的行，再发一条正常消息
+    async def serve(reader, writer):
+        writer.write(encode_command("pub", "r", {"text": "x" * 4000}))
+        writer.write(encode_command("pub", "r", {"text": "ok"}))
+        await writer.drain()
+        await reader.read()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    received = asyncio.Queue()
+
+    async def handler(room, data):
+        await received.put(data)
+
+    client = BrokerBackplane(f"tcp:127.0.0.1:{port}")
+    await client.start(handler)
+    try:
+        assert await asyncio.wait_for(received.get(), timeout=5) == {"text": "ok"}
+        assert client.rejected >= 1
+        assert client.is_connected
+    finally:
+        await client.stop()
+        server.close()
+
+
+def test_client_skips_long_lines(monkeypatch):
+    monkeypatch.setattr(websocket_backplane, "MAX_LINE_BYTES", 1024)
+    asyncio.run(_client_survives_long_line())
@@ -0,0 +1,35 @@
+"""
+限流测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_tutorial/tests
+"""
+
+import time
+
+from websocket_limits import KeyedRateLimiter
+
+
+def test_idle_buckets_are_pruned_without_background_task():
+    limiter = KeyedRateLimiter(rate=10, burst=5, prune_threshold=100)
+    now = time.monotonic()
+    for i in range(10000):
+        # 每个 IP 只发一条消息，1 秒后它的桶就补满了
+        now += 0.01
+        assert limiter.consume(f"10.0.{i // 256}.{i % 256}", now)
+        assert len(limiter) <= 200
+    assert limiter.allowed == 10000
+
+
+def test_busy_buckets_are_kept():
+    limiter = KeyedRateLimiter(rate=1, burst=2, prune_threshold=4)
+    # 新桶按 time.monotonic() 记录创建时间，测试时间取在它之后
+    now = time.monotonic() + 0.5
+    for _ in range(3):
+        limiter.consume("busy", now)
+    assert limiter.rejected == 1
+
+    for i in range(10):
+        limiter.consume(f"other{i}", now)
+    # "busy" 的桶还没补满，清理后限流状态仍然保留
+    assert not limiter.consume("busy", now)
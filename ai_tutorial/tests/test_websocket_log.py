@@ -0,0 +1,38 @@
+"""
+消息日志测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_tutorial/tests
+"""
+
+from websocket_log import INDEX_INTERVAL, MessageLog
+
+
+def test_reader_survives_remap_while_log_grows(tmp_path):
+    log = MessageLog(str(tmp_path))
+    for i in range(10):
+        log.append("lobby", f'{{"seq":{log.next_seq},"n":{i}}}')
+
+    # 补发时生成器跨 await 持有映射，期间有新消息写入、其他读取触发重新映射
+    reader = log.read_after(0, {"lobby"}, batch_size=3)
+    first = next(reader)
+    for i in range(10, 10 + INDEX_INTERVAL * 3):
+        log.append("lobby", f'{{"seq":{log.next_seq},"n":{i}}}')
+        list(log.read_after(log.last_seq - 1))
+
+    seqs = [seq for seq, _, _ in first] + [seq for batch in reader for seq, _, _ in batch]
+    assert seqs == list(range(1, 11))
+    log.close()
+
+
+def test_reopen_recovers_last_seq(tmp_path):
+    log = MessageLog(str(tmp_path))
+    for i in range(INDEX_INTERVAL * 2 + 5):
+        log.append("r", "{}")
+    log.close()
+
+    log = MessageLog(str(tmp_path))
+    assert log.last_seq == INDEX_INTERVAL * 2 + 5
+    assert [seq for batch in log.read_after(INDEX_INTERVAL * 2) for seq, _, _ in batch] == \
+        list(range(INDEX_INTERVAL * 2 + 1, INDEX_INTERVAL * 2 + 6))
+    log.close()
@@ -0,0 +1,55 @@
+"""
+断线重连补发测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_tutorial/tests
+"""
+
+import asyncio
+import os
+
+# 导入服务器模块时不在当前目录创建默认的消息日志，测试里换成临时目录
+os.environ.setdefault("WS_MESSAGE_LOG", "")
+
+import websocket_server as ws
+from websocket_fanout import ClientConnection
+from websocket_log import MessageLog
+
+
+class FakeWebSocket:
+    async def send_text(self, text):
+        pass
+
+    async def send_bytes(self, data):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_disconnect_during_replay_does_not_join_room(tmp_path, monkeypatch):
+    log = MessageLog(str(tmp_path))
+    for i in range(50):
+        log.append("replay", f'{{"seq":{log.next_seq},"message":"m{i}"}}')
+    monkeypatch.setattr(ws, "message_log", log)
+    monkeypatch.setattr(ws.config, "resume_batch_size", 5)
+
+    async def scenario():
+        connection = ClientConnection(FakeWebSocket(), "resume_client", on_close=ws._remove_client)
+        ws.connected_clients.add(connection.client_id, connection)
+        # 没有启动写任务：发送队列不会被取走，补发停在等待队列发完的地方
+        task = asyncio.create_task(ws.join_room("replay", connection, last_seq=0))
+        await asyncio.sleep(0.05)
+        assert not task.done()
+
+        connection.close("测试断开")
+        await asyncio.wait_for(task, timeout=5)
+
+        assert not ws.rooms.rooms_of("resume_client")
+        assert "replay" not in ws.rooms
+        assert connection.client_id not in ws.connected_clients
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        log.close()
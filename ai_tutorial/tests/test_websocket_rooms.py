@@ -0,0 +1,48 @@
+"""
+聊天室历史记录测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_tutorial/tests
+"""
+
+import pytest
+
+from websocket_registry import HistoryRing
+from websocket_rooms import DEFAULT_ROOM, RoomManager
+
+
+def test_history_survives_empty_room():
+    rooms = RoomManager(history_size=10)
+    rooms.join(DEFAULT_ROOM, "a", object()).history.append("m1")
+    rooms.leave(DEFAULT_ROOM, "a")
+    assert DEFAULT_ROOM not in rooms
+
+    room = rooms.join(DEFAULT_ROOM, "b", object())
+    assert room.history.latest(10) == ["m1"]
+
+
+def test_idle_histories_are_bounded_but_default_room_is_kept():
+    rooms = RoomManager(history_size=10, max_idle_histories=2)
+    for name in [DEFAULT_ROOM, "r1", "r2", "r3"]:
+        rooms.join(name, "a", object()).history.append(name)
+        rooms.leave(name, "a")
+
+    assert rooms.join(DEFAULT_ROOM, "b", object()).history.latest(1) == [DEFAULT_ROOM]
+    assert len(rooms.join("r1", "b", object()).history) == 0  # 最久没用过，已丢弃
+    assert rooms.join("r3", "b", object()).history.latest(1) == ["r3"]
+
+
+def test_zero_capacity_means_no_history():
+    ring = HistoryRing(0)
+    ring.append("m1")
+    assert len(ring) == 0
+    assert ring.latest(10) == []
+
+    rooms = RoomManager(history_size=0)
+    rooms.join(DEFAULT_ROOM, "a", object()).history.append("m1")
+    assert rooms.get(DEFAULT_ROOM).history.latest(10) == []
+
+
+def test_negative_capacity_is_rejected():
+    with pytest.raises(ValueError):
+        HistoryRing(-1)
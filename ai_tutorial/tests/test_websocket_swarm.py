@@ -0,0 +1,32 @@
+"""
+压力测试客户端测试
+
+运行方式（在仓库根目录）：
+    python -m pytest ai_tutorial/tests
+"""
+
+import asyncio
+
+from websocket_swarm import LatencySample, SwarmClient, SwarmConfig
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, message):
+        self.messages.append(message)
+
+
+def test_each_probe_is_counted_once():
+    client = SwarmClient("ws://127.0.0.1:8000/ws/chat", "room", SwarmConfig(run_id="t"), LatencySample())
+    client.websocket = FakeWebSocket()
+    client.is_connected = True
+
+    async def send_probes():
+        for _ in range(5):
+            assert await client.send_probe()
+
+    asyncio.run(send_probes())
+    assert len(client.websocket.messages) == 5
+    assert client.sent == 5
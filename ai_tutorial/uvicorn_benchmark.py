@@ -0,0 +1,362 @@
+"""
+Uvicorn 配置性能测试
+==================
+
+uvicorn_tutorial.py 的注释里说 uvloop、httptools、多工作进程、keep-alive 能提高性能，
+这个脚本在本机把这些说法变成数据：按配置矩阵逐个启动被测应用，用内置的异步 HTTP 压测客户端
+在固定时间内持续发请求，输出每种配置的每秒请求数和延迟百分位表格。
+
+配置矩阵（每一维都可以用命令行参数指定）：
+- 应用：simple（uvicorn_tutorial.simple_app，裸 ASGI）、fastapi（uvicorn_tutorial.app）
+- 事件循环：asyncio、uvloop
+- HTTP 解析：h11、httptools
+- 工作进程数：1、2、...
+- keep-alive：on 表示客户端复用连接；off 表示每个请求新建连接（请求头带 Connection: close），
+  相当于服务器关闭 keep-alive
+- 快速通道：health（GET /health）、item（GET /items/1）两个应用是 fastapi_tutorial.py，
+  on / off 对应开启和关闭 asgi_fastpath.py 的快速通道（ASGI_FAST_PATH），其他应用这一列是 -
+
+没有安装的 uvloop / httptools 对应的配置会被跳过，并在结果里注明原因。
+压测客户端和服务器在同一台机器上，会争抢 CPU；CPU 核心少时工作进程数的结果要结合 cpu_count 看。
+
+运行示例：
+    python uvicorn_benchmark.py
+    python uvicorn_benchmark.py --apps simple fastapi --loops asyncio uvloop --http h11 httptools \\
+        --workers 1 2 4 --keep-alive on off --connections 64 --duration 10
+    python uvicorn_benchmark.py --apps health item --fast-path on off --workers 1 --keep-alive on
+    python uvicorn_benchmark.py --json > result.json     # 输出 JSON 而不是表格
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+# 被测应用（模块:对象，在本目录下导入）、压测的路径、是否有快速通道
+APPS = {
+    "simple": ("uvicorn_tutorial:simple_app", "/", False),
+    "fastapi": ("uvicorn_tutorial:app", "/", False),
+    "health": ("fastapi_tutorial:app", "/health", True),
+    "item": ("fastapi_tutorial:app", "/items/1", True),
+}
+
+# 事件循环 / HTTP 解析的实现依赖的模块
+IMPLEMENTATIONS = {
+    "asyncio": None,
+    "uvloop": "uvloop",
+    "h11": "h11",
+    "httptools": "httptools",
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """计算百分位（输入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    """把延迟列表（秒）汇总为毫秒统计"""
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+# ---------- 内置的异步 HTTP 压测客户端 ----------
+
+class HttpLoadGenerator:
+    """
+    用 asyncio 的 TCP 连接直接收发 HTTP/1.1 请求（不依赖第三方压测工具）
+
+    每个连接一个协程：发请求 -> 读完整响应 -> 记录延迟 -> 下一个请求。
+    keep_alive 为 False 时每个请求都新建连接，延迟包含建立连接的时间。
+    """
+
+    def __init__(self, host: str, port: int, path: str, connections: int, keep_alive: bool = True):
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.keep_alive = keep_alive
+        # 请求字节只拼一次，所有请求复用
+        self.request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n"
+        ).encode("latin-1")
+        self.latencies: List[float] = []
+        self.requests = 0
+        self.errors = 0
+        self.bad_status = 0
+        self.connects = 0
+
+    async def run(self, duration: float, warmup: float = 1.0) -> Dict:
+        """
+        压测 warmup + duration 秒，只统计预热之后的 duration 秒
+
+        Returns:
+            请求数、错误数、每秒请求数和延迟百分位
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time() + warmup
+        deadline = start + duration
+        await asyncio.gather(*(self._connection(start, deadline) for _ in range(self.connections)))
+        return self.report(duration)
+
+    def report(self, duration: float) -> Dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "bad_status": self.bad_status,
+            "connects": self.connects,
+            "requests_per_second": round(self.requests / duration, 1),
+            "latency": latency_summary(self.latencies),
+        }
+
+    async def _connection(self, start: float, deadline: float):
+        loop = asyncio.get_running_loop()
+        reader = writer = None
+        while True:
+            now = loop.time()
+            if now >= deadline:
+                break
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(self.host, self.port)
+                    self.connects += 1
+                writer.write(self.request)
+                status, reusable = await self._read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                if now >= start:
+                    self.errors += 1
+                reusable = False
+                status = None
+                await asyncio.sleep(0.01)
+            else:
+                finished = loop.time()
+                if now >= start:
+                    self.requests += 1
+                    self.latencies.append(finished - now)
+                    if status != 200:
+                        self.bad_status += 1
+            if not (reusable and self.keep_alive) and writer is not None:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    async def _read_response(self, reader: asyncio.StreamReader):
+        """读取一个完整响应，返回 (状态码, 连接能否继续使用)"""
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip().lower()
+
+        if "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.read()  # 没有长度：读到服务器关闭连接
+            return status, False
+        return status, headers.get("connection") != "close"
+
+
+def client_process(host, port, path, connections, keep_alive, duration, warmup, results):
+    """在独立进程里运行一个压测客户端，把结果（含原始延迟）放进队列"""
+    generator = HttpLoadGenerator(host, port, path, connections, keep_alive)
+    report = asyncio.run(generator.run(duration, warmup))
+    report["latencies"] = generator.latencies
+    results.put(report)
+
+
+def run_load(host: str, port: int, path: str, connections: int, keep_alive: bool,
+             duration: float, warmup: float, client_procs: int) -> Dict:
+    """用 client_procs 个进程共同发起 connections 个连接的压测，合并结果"""
+    if client_procs <= 1:
+        return asyncio.run(HttpLoadGenerator(host, port, path, connections, keep_alive).run(duration, warmup))
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    per_proc = max(1, connections // client_procs)
+    processes = [
+        context.Process(target=client_process,
+                        args=(host, port, path, per_proc, keep_alive, duration, warmup, results))
+        for _ in range(client_procs)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get(timeout=warmup + duration + 60) for _ in processes]
+    for process in processes:
+        process.join()
+
+    requests = sum(r["requests"] for r in reports)
+    return {
+        "requests": requests,
+        "errors": sum(r["errors"] for r in reports),
+        "bad_status": sum(r["bad_status"] for r in reports),
+        "connects": sum(r["connects"] for r in reports),
+        "requests_per_second": round(requests / duration, 1),
+        "latency": latency_summary([lat for r in reports for lat in r["latencies"]]),
+    }
+
+
+# ---------- 启动被测服务器 ----------
+
+def start_server(app: str, path: str, port: int, loop: str, http: str, workers: int,
+                 env: Optional[Dict] = None) -> subprocess.Popen:
+    """用 uvicorn 命令行启动被测应用，等到能响应请求再返回"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+         "--loop", loop, "--http", http, "--workers", str(workers),
+         "--no-access-log", "--log-level", "warning"],
+        cwd=here, env=dict(os.environ, **(env or {})), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务器启动失败（退出码 {process.returncode}）")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1).read()
+            # 多工作进程时等所有进程都启动完（同一个端口上先启动的进程先响应）
+            time.sleep(0.5 * workers)
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError("服务器启动超时")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def missing_dependency(name: str) -> Optional[str]:
+    """实现依赖的模块没有安装时返回原因"""
+    module = IMPLEMENTATIONS[name]
+    if module is None or importlib.util.find_spec(module) is not None:
+        return None
+    return f"未安装 {module}"
+
+
+def bench_config(args, app_name: str, loop: str, http: str, workers: int, keep_alive: str, fast_path: str) -> Dict:
+    """启动一种配置的服务器并压测"""
+    app, path, _ = APPS[app_name]
+    config = {"app": app_name, "loop": loop, "http": http, "workers": workers, "keep_alive": keep_alive,
+              "fast_path": fast_path}
+    skipped = missing_dependency(loop) or missing_dependency(http)
+    if skipped:
+        return {**config, "skipped": skipped}
+
+    env = {} if fast_path == "-" else {"ASGI_FAST_PATH": "1" if fast_path == "on" else "0"}
+    process = start_server(app, path, args.port, loop, http, workers, env)
+    try:
+        result = run_load("127.0.0.1", args.port, path, args.connections, keep_alive == "on",
+                          args.duration, args.warmup, args.client_procs)
+    finally:
+        stop_server(process)
+    return {**config, **result}
+
+
+def format_table(results: List[Dict]) -> str:
+    """把结果排成文本表格"""
+    columns = ["app", "loop", "http", "workers", "keep_alive", "fast_path", "req/s", "p50 ms", "p90 ms", "p99 ms", "max ms",
+               "errors", "note"]
+    rows = []
+    for result in results:
+        config = [result["app"], result["loop"], result["http"], str(result["workers"]), result["keep_alive"],
+                  result["fast_path"]]
+        if "skipped" in result:
+            rows.append(config + ["-"] * 6 + [f"跳过：{result['skipped']}"])
+            continue
+        latency = result["latency"]
+        rows.append(config + [
+            f"{result['requests_per_second']:.0f}",
+            f"{latency['p50_ms']:.2f}", f"{latency['p90_ms']:.2f}",
+            f"{latency['p99_ms']:.2f}", f"{latency['max_ms']:.2f}",
+            str(result["errors"] + result["bad_status"]), "",
+        ])
+    widths = [max(len(columns[i]), *(len(row[i]) for row in rows)) for i in range(len(columns))]
+    lines = ["  ".join(name.ljust(width) for name, width in zip(columns, widths))]
+    lines.append("  ".join("-" * width for width in widths))
+    lines += ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+    return "\n".join(lines)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="按配置矩阵压测 uvicorn_tutorial.py 中的应用")
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=["simple", "fastapi"],
+                        help="被测应用 (默认: simple fastapi)")
+    parser.add_argument("--loops", nargs="+", choices=["asyncio", "uvloop"], default=["asyncio", "uvloop"],
+                        help="事件循环 (默认: asyncio uvloop)")
+    parser.add_argument("--http", nargs="+", choices=["h11", "httptools"], default=["h11", "httptools"],
+                        help="HTTP 解析 (默认: h11 httptools)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2], help="工作进程数 (默认: 1 2)")
+    parser.add_argument("--keep-alive", nargs="+", choices=["on", "off"], default=["on", "off"],
+                        help="客户端是否复用连接 (默认: on off)")
+    parser.add_argument("--fast-path", nargs="+", choices=["on", "off"], default=["on"],
+                        help="health / item 应用是否开启快速通道 (默认: on)")
+    parser.add_argument("--connections", type=int, default=32, help="并发连接数 (默认: 32)")
+    parser.add_argument("--duration", type=float, default=5.0, help="每种配置统计的秒数 (默认: 5)")
+    parser.add_argument("--warmup", type=float, default=1.0, help="每种配置的预热秒数，不计入结果 (默认: 1)")
+    parser.add_argument("--client-procs", type=int, default=1, help="运行压测客户端的进程数 (默认: 1)")
+    parser.add_argument("--port", type=int, default=8900, help="被测服务器端口 (默认: 8900)")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 而不是表格")
+    args = parser.parse_args()
+
+    results = [
+        bench_config(args, app, loop, http, workers, keep_alive, fast_path)
+        for app, loop, http, workers, keep_alive in itertools.product(
+            args.apps, args.loops, args.http, args.workers, args.keep_alive)
+        for fast_path in (args.fast_path if APPS[app][2] else ["-"])
+    ]
+
+    if args.json:
+        print(json.dumps({
+            # 压测客户端和服务器共用这些 CPU
+            "cpu_count": os.cpu_count(),
+            "connections": args.connections,
+            "duration_seconds": args.duration,
+            "client_processes": args.client_procs,
+            "results": results,
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(f"CPU 核心: {os.cpu_count()}  并发连接: {args.connections}  "
+              f"每种配置: 预热 {args.warmup:g} 秒 + 统计 {args.duration:g} 秒  客户端进程: {args.client_procs}")
+        print(format_table(results))
+
+
+if __name__ == "__main__":
+    main()
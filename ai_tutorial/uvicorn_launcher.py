@@ -0,0 +1,456 @@
+"""
+Uvicorn 启动器：把 uvicorn_tutorial.py 里的配置字典变成真正运行的服务器
+=====================================================================
+
+uvicorn_tutorial.create_production_server() 和 development_server() 只返回字典，
+其中 worker_class、keepalive、max_requests、timeout 等是 gunicorn 的写法，不能直接传给 uvicorn.run。
+这个启动器负责：
+
+- 翻译配置：keepalive -> timeout_keep_alive，max_requests(_jitter) -> limit_max_requests(_jitter)，
+  timeout -> 工作进程启动超时，graceful_timeout -> timeout_graceful_shutdown；
+  uvicorn 不支持的项（worker_class、error_log、debug）不使用，并在启动报告里说明原因
+- 工作进程数：workers 为 "auto" 时按可用 CPU 核心数（考虑 CPU 亲和性和容器的 CPU 配额）
+- 自动选择 uvloop / httptools（已安装时），否则用 asyncio / h11
+- 最大请求数回收：工作进程处理 max_requests + 随机 0~jitter 个请求后优雅退出，主进程立即补一个新的，
+  各进程的随机数不同，不会同时重启；命令行只改了 --max-requests 时，配置里的 jitter 最多取它的 10%
+- 预加载（preload）：主进程先导入应用再 fork 工作进程，导入的模块和只读数据由所有工作进程共享内存页
+  （item_backend.py / item_shared.py 的后端会在子进程里重新打开连接和锁）
+- 滚动重启：向主进程发送 SIGHUP，逐个启动新工作进程，新进程就绪后再优雅关闭一个旧进程，
+  服务不中断（预加载时新进程仍是 fork 自主进程，代码改动需要重启主进程或使用 --no-preload）
+- 启动报告：打印最终使用的配置
+
+运行示例：
+    python uvicorn_launcher.py fastapi_tutorial:app --profile production --port 8000
+    python uvicorn_launcher.py fastapi_tutorial:app --profile production --dry-run   # 只打印启动报告
+    python uvicorn_launcher.py fastapi_tutorial:app --profile development
+    kill -HUP <主进程 PID>                                                            # 滚动重启
+
+预加载和自己管理工作进程依赖 fork，只在 Linux、macOS 上可用；Windows 上交给 uvicorn.run 的多进程模式。
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import argparse
+import importlib.util
+import logging
+import math
+import os
+import select
+import signal
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import uvicorn
+from uvicorn.config import STARTUP_FAILURE
+
+from uvicorn_tutorial import create_production_server, development_server
+
+logger = logging.getLogger("uvicorn.error")
+
+PROFILES: Dict[str, Callable[[], Dict]] = {
+    "production": create_production_server,
+    "development": development_server,
+}
+
+# 配置字典中 uvicorn 不支持的项，以及不使用的原因
+IGNORED_KEYS = {
+    "worker_class": "gunicorn 的选项，启动器自己管理 uvicorn 工作进程",
+    "error_log": "uvicorn 的错误日志总是输出到 uvicorn.error 日志器",
+    "debug": "uvicorn 没有 debug 选项，请用 log_level",
+}
+
+# 命令行只覆盖 max_requests 时，随机抖动最多为它的 1/MAX_JITTER_RATIO
+MAX_JITTER_RATIO = 10
+
+
+def available_cores() -> int:
+    """当前进程可用的 CPU 核心数（考虑 CPU 亲和性和 cgroup v2 的 CPU 配额）"""
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+@dataclass
+class LaunchPlan:
+    """启动计划：翻译后的 uvicorn 配置和启动器自己的选项"""
+    app: str
+    profile: str
+    host: str = "127.0.0.1"
+    port: int = 8000
+    workers: int = 1
+    cores: int = 1
+    loop: str = "asyncio"
+    http: str = "h11"
+    reload: bool = False
+    preload: bool = True
+    limit_max_requests: Optional[int] = None
+    limit_max_requests_jitter: int = 0
+    timeout_keep_alive: int = 5
+    timeout_graceful_shutdown: Optional[int] = None
+    startup_timeout: float = 30.0
+    access_log: bool = True
+    log_level: str = "info"
+    ignored: Dict[str, str] = field(default_factory=dict)
+    notes: List[str] = field(default_factory=list)
+    env: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def forking(self) -> bool:
+        """是否由启动器 fork 并管理工作进程"""
+        return not self.reload and hasattr(os, "fork")
+
+    def uvicorn_options(self) -> Dict:
+        """传给 uvicorn.Config / uvicorn.run 的参数"""
+        return {
+            "host": self.host,
+            "port": self.port,
+            "loop": self.loop,
+            "http": self.http,
+            "reload": self.reload,
+            "limit_max_requests": self.limit_max_requests,
+            "limit_max_requests_jitter": self.limit_max_requests_jitter,
+            "timeout_keep_alive": self.timeout_keep_alive,
+            "timeout_graceful_shutdown": self.timeout_graceful_shutdown,
+            "timeout_worker_healthcheck": int(self.startup_timeout),
+            "access_log": self.access_log,
+            "log_level": self.log_level,
+        }
+
+
+def make_plan(app: str, profile: str = "production", overrides: Optional[Dict] = None) -> LaunchPlan:
+    """
+    把配置字典翻译成启动计划
+
+    Args:
+        app: 应用的导入路径，例如 fastapi_tutorial:app
+        profile: PROFILES 中的配置名
+        overrides: 覆盖配置字典中的项（命令行参数）
+    """
+    config = dict(PROFILES[profile]())
+    config.update({key: value for key, value in (overrides or {}).items() if value is not None})
+
+    plan = LaunchPlan(app=app, profile=profile, cores=available_cores())
+    plan.host = config.get("host", plan.host)
+    plan.port = int(config.get("port", plan.port))
+    plan.reload = bool(config.get("reload", False))
+    plan.access_log = bool(config.get("access_log", True))
+    plan.log_level = config.get("log_level", plan.log_level)
+    plan.timeout_keep_alive = int(config.get("keepalive", plan.timeout_keep_alive))
+    plan.startup_timeout = float(config.get("timeout", plan.startup_timeout))
+    plan.timeout_graceful_shutdown = config.get("graceful_timeout")
+    if config.get("max_requests"):
+        plan.limit_max_requests = int(config["max_requests"])
+        plan.limit_max_requests_jitter = int(config.get("max_requests_jitter", 0))
+        overrides = overrides or {}
+        if overrides.get("max_requests") is not None and overrides.get("max_requests_jitter") is None:
+            # 配置里的 jitter 是按配置的 max_requests 定的，命令行把 max_requests 改小时按比例缩小
+            cap = plan.limit_max_requests // MAX_JITTER_RATIO
+            if plan.limit_max_requests_jitter > cap:
+                plan.notes.append(f"--max-requests {plan.limit_max_requests}：配置的随机抖动 "
+                                  f"{plan.limit_max_requests_jitter} 缩小为 {cap}（不超过 10%），"
+                                  f"可以用 --max-requests-jitter 指定")
+                plan.limit_max_requests_jitter = cap
+
+    workers = config.get("workers", 1)
+    plan.workers = plan.cores if workers in (None, "auto") else int(workers)
+    if plan.workers > plan.cores:
+        plan.notes.append(f"工作进程数 {plan.workers} 多于可用 CPU 核心数 {plan.cores}，进程之间会争抢 CPU")
+
+    plan.loop = "uvloop" if installed("uvloop") else "asyncio"
+    plan.http = "httptools" if installed("httptools") else "h11"
+
+    for key, reason in IGNORED_KEYS.items():
+        if key in config:
+            plan.ignored[key] = reason
+
+    if plan.reload:
+        # 热重载由 uvicorn 的重载进程管理，只能有一个工作进程，也没有预加载
+        plan.workers = 1
+        plan.preload = False
+        plan.limit_max_requests = None
+        plan.notes.append("热重载模式：单个工作进程，文件修改后自动重启")
+    else:
+        plan.preload = bool(config.get("preload", True)) and plan.forking
+        if config.get("preload", True) and not plan.forking:
+            plan.notes.append("当前平台不支持 fork，不能预加载，工作进程由 uvicorn.run 启动")
+
+    if plan.workers > 1:
+        store = os.environ.get("ITEM_STORE", "memory")
+        if store.partition(":")[0] == "memory":
+            plan.notes.append("ITEM_STORE 是 memory：每个工作进程各有一份物品数据，"
+                              "可以设置 ITEM_STORE=shm:items.shm 或 sqlite:items.db 共享")
+        if not os.environ.get("METRICS_DIR"):
+            plan.env["METRICS_DIR"] = tempfile.mkdtemp(prefix="uvicorn_metrics_")
+            plan.notes.append("已设置 METRICS_DIR，/metrics 返回所有工作进程合并后的统计")
+    return plan
+
+
+def startup_report(plan: LaunchPlan, pid: Optional[int] = None) -> List[str]:
+    """启动报告的每一行（pid 是主进程的 PID，用于提示滚动重启命令）"""
+    if plan.limit_max_requests:
+        recycle = (f"{plan.limit_max_requests} + 随机 0~{plan.limit_max_requests_jitter} 个请求后优雅退出，"
+                   f"由主进程补上新的工作进程")
+    else:
+        recycle = "不限制"
+    rows = [
+        ("配置", plan.profile),
+        ("应用", plan.app),
+        ("监听地址", f"http://{plan.host}:{plan.port}"),
+        ("工作进程", f"{plan.workers}（可用 CPU 核心 {plan.cores}）"),
+        ("事件循环", plan.loop if plan.loop == "uvloop" else "asyncio（未安装 uvloop）"),
+        ("HTTP 解析", plan.http if plan.http == "httptools" else "h11（未安装 httptools）"),
+        ("预加载应用", "是：主进程导入应用后 fork，工作进程共享内存页" if plan.preload else "否：每个工作进程自己导入应用"),
+        ("热重载", "是" if plan.reload else "否"),
+        ("最大请求数", recycle),
+        ("keep-alive", f"{plan.timeout_keep_alive} 秒"),
+        ("启动超时", f"{plan.startup_timeout:g} 秒"),
+        ("优雅关闭超时", "一直等到请求处理完" if plan.timeout_graceful_shutdown is None
+         else f"{plan.timeout_graceful_shutdown} 秒"),
+        ("访问日志", "开启" if plan.access_log else "关闭"),
+        ("日志级别", plan.log_level),
+    ]
+    if plan.forking and not plan.reload:
+        rows.append(("滚动重启", f"kill -HUP {pid or '<主进程 PID>'}"))
+    lines = ["=" * 60, "Uvicorn 启动配置", "=" * 60]
+    lines += [f"{label}: {value}" for label, value in rows]
+    for name, value in plan.env.items():
+        lines.append(f"环境变量: {name}={value}")
+    for key, reason in plan.ignored.items():
+        lines.append(f"忽略配置项 {key}: {reason}")
+    for note in plan.notes:
+        lines.append(f"提示: {note}")
+    lines.append("=" * 60)
+    return lines
+
+
+@dataclass
+class Worker:
+    pid: int
+    ready_fd: int  # 工作进程启动完成后写入一个字节
+    started: float
+
+
+def _serve_in_child(config: uvicorn.Config, sockets, ready_fd: int) -> int:
+    """在 fork 出的子进程里运行 uvicorn.Server，返回退出码"""
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)  # SIGHUP 只给主进程用
+    server = uvicorn.Server(config)
+
+    def report_ready():
+        while not server.started and not server.should_exit:
+            time.sleep(0.05)
+        os.write(ready_fd, b"1" if server.started else b"0")
+        os.close(ready_fd)
+
+    threading.Thread(target=report_ready, daemon=True).start()
+    server.run(sockets=sockets)
+    return 0 if server.started else STARTUP_FAILURE
+
+
+class PreforkSupervisor:
+    """
+    主进程：绑定端口、（可选）预加载应用，然后 fork 工作进程并管理它们
+
+    - 工作进程退出（例如达到最大请求数）时补上新的；启动失败时停止整个服务
+    - SIGHUP：滚动重启；SIGINT / SIGTERM：优雅关闭所有工作进程后退出
+    """
+
+    def __init__(self, plan: LaunchPlan):
+        self.plan = plan
+        self.config = uvicorn.Config(plan.app, **plan.uvicorn_options())
+        self.workers: Dict[int, Worker] = {}
+        self.signals: List[int] = []
+        self.should_exit = False
+        self.restarts = 0
+
+    def run(self):
+        if self.plan.preload:
+            self.config.load()
+        sockets = [self.config.bind_socket()]
+        self.sockets = sockets
+        for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(sig, lambda sig, frame: self.signals.append(sig))
+
+        for _ in range(self.plan.workers):
+            worker = self._start_worker()
+            if not self._wait_ready(worker):
+                logger.error("工作进程 [%s] 启动失败，停止服务", worker.pid)
+                self.should_exit = True
+                break
+        if not self.should_exit:
+            logger.info("主进程 [%s]：%s 个工作进程已就绪", os.getpid(), len(self.workers))
+
+        while not self.should_exit:
+            self._handle_signals()
+            self._reap()
+            time.sleep(0.2)
+        self._stop_all()
+        for sock in sockets:
+            sock.close()
+
+    def _start_worker(self) -> Worker:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            code = 1
+            try:
+                code = _serve_in_child(self.config, self.sockets, write_fd)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        os.close(write_fd)
+        worker = Worker(pid, read_fd, time.monotonic())
+        self.workers[pid] = worker
+        logger.info("启动工作进程 [%s]", pid)
+        return worker
+
+    def _wait_ready(self, worker: Worker) -> bool:
+        """等待工作进程完成启动（超时或启动失败返回 False）"""
+        readable, _, _ = select.select([worker.ready_fd], [], [], self.plan.startup_timeout)
+        ready = bool(readable) and os.read(worker.ready_fd, 1) == b"1"
+        os.close(worker.ready_fd)
+        worker.ready_fd = -1
+        return ready
+
+    def _handle_signals(self):
+        while self.signals:
+            sig = self.signals.pop(0)
+            if sig == signal.SIGHUP:
+                logger.info("收到 SIGHUP，滚动重启工作进程")
+                self.rolling_restart()
+            else:
+                logger.info("收到 %s，关闭服务", signal.Signals(sig).name)
+                self.should_exit = True
+
+    def _reap(self):
+        """回收退出的工作进程并补上新的"""
+        while self.workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            if worker.ready_fd >= 0:
+                os.close(worker.ready_fd)
+            code = os.waitstatus_to_exitcode(status)
+            if self.should_exit or self.signals:
+                continue
+            if code == STARTUP_FAILURE:
+                logger.error("工作进程 [%s] 启动失败，停止服务", pid)
+                self.should_exit = True
+                return
+            reason = "达到最大请求数" if code == 0 and self.plan.limit_max_requests else f"退出码 {code}"
+            logger.info("工作进程 [%s] 已退出（%s），启动新的工作进程", pid, reason)
+            self.restarts += 1
+            self._wait_ready(self._start_worker())
+
+    def rolling_restart(self):
+        """逐个替换工作进程：新进程就绪后才关闭一个旧进程"""
+        for old in list(self.workers.values()):
+            new = self._start_worker()
+            if not self._wait_ready(new):
+                logger.error("新工作进程 [%s] 没有在 %s 秒内就绪，保留旧进程，停止滚动重启",
+                             new.pid, self.plan.startup_timeout)
+                self._stop(new)
+                return
+            self._stop(old)
+        logger.info("滚动重启完成")
+
+    def _stop(self, worker: Worker):
+        """优雅关闭一个工作进程（超时后强制结束）"""
+        self.workers.pop(worker.pid, None)
+        try:
+            os.kill(worker.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = None if self.plan.timeout_graceful_shutdown is None else (
+            time.monotonic() + self.plan.timeout_graceful_shutdown + 5)
+        while True:
+            pid, _ = os.waitpid(worker.pid, os.WNOHANG)
+            if pid:
+                return
+            if deadline is not None and time.monotonic() > deadline:
+                os.kill(worker.pid, signal.SIGKILL)
+                os.waitpid(worker.pid, 0)
+                return
+            time.sleep(0.05)
+
+    def _stop_all(self):
+        for worker in list(self.workers.values()):
+            try:
+                os.kill(worker.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for worker in list(self.workers.values()):
+            self._stop(worker)
+        logger.info("主进程 [%s] 退出", os.getpid())
+
+
+def launch(plan: LaunchPlan):
+    """按启动计划运行服务器（阻塞到服务器关闭）"""
+    os.environ.update(plan.env)
+    for line in startup_report(plan, os.getpid()):
+        print(line)
+    if plan.forking:
+        PreforkSupervisor(plan).run()
+    else:
+        uvicorn.run(plan.app, workers=None if plan.reload else plan.workers, **plan.uvicorn_options())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按 uvicorn_tutorial.py 中的配置启动 uvicorn")
+    parser.add_argument("app", nargs="?", default="fastapi_tutorial:app", help="应用 (默认: fastapi_tutorial:app)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="production", help="配置 (默认: production)")
+    parser.add_argument("--host", help="监听地址（覆盖配置）")
+    parser.add_argument("--port", type=int, help="端口（覆盖配置）")
+    parser.add_argument("--workers", help="工作进程数或 auto（覆盖配置）")
+    parser.add_argument("--max-requests", type=int, help="每个工作进程处理多少个请求后重启（覆盖配置）")
+    parser.add_argument("--max-requests-jitter", type=int,
+                        help="在 max-requests 上随机多处理 0~N 个请求（覆盖配置，默认不超过 max-requests 的 10%%）")
+    parser.add_argument("--no-preload", action="store_true", help="不预加载，每个工作进程自己导入应用")
+    parser.add_argument("--dry-run", action="store_true", help="只打印启动报告，不启动")
+    args = parser.parse_args()
+
+    overrides = {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "preload": False if args.no_preload else None,
+    }
+    plan = make_plan(args.app, args.profile, overrides)
+    if args.dry_run:
+        for line in startup_report(plan):
+            print(line)
+        return
+    launch(plan)
+
+
+if __name__ == "__main__":
+    main()
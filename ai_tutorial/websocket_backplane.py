@@ -0,0 +1,417 @@
+"""
+WebSocket 多进程消息背板（backplane）
+==================================
+
+websocket_server.py 用 uvicorn --workers N 启动多个工作进程时，每个进程只知道
+连到自己的客户端。背板负责把聊天消息在工作进程之间转发：
+
+- 每个工作进程把本地产生的消息发布到背板
+- 每个工作进程只订阅自己有成员的聊天室，没人关心的聊天室不会收到消息
+- 背板把消息转发给订阅了该聊天室的其他工作进程（不回发给发布者，
+  发布者已经直接投递给了本地成员）
+
+背板是可替换的，通过地址选择实现：
+    local            单进程，不转发（默认）
+    unix:/路径       连接本机 BackplaneBroker（Unix socket）
+    tcp:主机:端口    连接 BackplaneBroker（TCP）
+其他实现（例如 Redis）只需继承 Backplane 并用 register_backplane 注册地址前缀。
+
+BackplaneBroker 是一个很小的 asyncio 发布/订阅服务，不依赖任何外部服务，
+通信协议为按行分隔的 JSON：
+    {"op": "sub", "room": "..."}              订阅聊天室
+    {"op": "unsub", "room": "..."}            取消订阅
+    {"op": "pub", "room": "...", "data": {}}  发布消息（原样转发给订阅者）
+格式不对的行（不是 JSON 对象、缺少字段、未知操作）和超过 MAX_LINE_BYTES 的行会被跳过并计数，
+不会断开连接。
+
+单独运行背板服务：
+    python websocket_backplane.py --address unix:/tmp/ws_backplane.sock
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 转发给单个订阅者的写缓冲超过该字节数时，暂停读取发布方的数据
+WRITE_BUFFER_LIMIT = 1024 * 1024
+
+# 一行命令的最大字节数（StreamReader 的 limit，默认只有 64 KiB）。
+# uvicorn 默认接收最大 16 MiB 的 WebSocket 消息，编码成 JSON 时转义可能变长，留 4 倍余量
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+# 接收远程消息的回调：(聊天室, 消息字典)
+MessageHandler = Callable[[str, Dict], Awaitable[None]]
+
+
+def default_address() -> str:
+    """生成当前进程专用的背板地址"""
+    if hasattr(socket, "AF_UNIX"):
+        return "unix:" + os.path.join(tempfile.gettempdir(), f"ws_backplane_{os.getpid()}.sock")
+    # Windows 等不支持 Unix socket 的平台使用本机 TCP 端口
+    return "tcp:127.0.0.1:0"
+
+
+def encode_command(op: str, room: str, data: Optional[Dict] = None) -> bytes:
+    """编码一条背板命令"""
+    command = {"op": op, "room": room}
+    if data is not None:
+        command["data"] = data
+    return json.dumps(command, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+async def open_connection(address: str):
+    """根据地址连接到背板服务"""
+    kind, _, target = address.partition(":")
+    if kind == "unix":
+        return await asyncio.open_unix_connection(target, limit=MAX_LINE_BYTES)
+    host, _, port = target.rpartition(":")
+    return await asyncio.open_connection(host, int(port), limit=MAX_LINE_BYTES)
+
+
+class Backplane:
+    """
+    背板接口（默认实现即单进程：什么都不转发）
+    publish / subscribe / unsubscribe 都不等待网络，可以在同步回调中调用
+    """
+
+    async def start(self, handler: MessageHandler):
+        """开始接收其他工作进程发布的消息"""
+
+    async def stop(self):
+        """停止背板"""
+
+    def publish(self, room: str, message: Dict):
+        """发布一条本地产生的消息"""
+
+    def subscribe(self, room: str):
+        """本进程有成员加入了该聊天室"""
+
+    def unsubscribe(self, room: str):
+        """本进程在该聊天室已经没有成员了"""
+
+    def stats(self) -> Dict:
+        return {"type": "local"}
+
+
+class LocalBackplane(Backplane):
+    """单进程背板"""
+
+
+class BrokerBackplane(Backplane):
+    """连接 BackplaneBroker 的背板客户端，断线后自动重连并重新订阅"""
+
+    def __init__(self, address: str, reconnect_interval: float = 1.0):
+        self.address = address
+        self.reconnect_interval = reconnect_interval
+        self._rooms: Set[str] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def start(self, handler: MessageHandler):
+        self._task = asyncio.create_task(self._run(handler))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _write(self, line: bytes) -> bool:
+        if not self.is_connected:
+            return False
+        self._writer.write(line)
+        return True
+
+    def publish(self, room: str, message: Dict):
+        # 背板服务跟不上时丢弃，避免写缓冲无限增长
+        if self.is_connected and self._writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+            self.dropped += 1
+            return
+        line = encode_command("pub", room, message)
+        if len(line) > MAX_LINE_BYTES:
+            # 背板服务会丢弃太长的行，不发送
+            self.dropped += 1
+            return
+        if self._write(line):
+            self.published += 1
+        else:
+            self.dropped += 1
+
+    def subscribe(self, room: str):
+        if room not in self._rooms:
+            self._rooms.add(room)
+            self._write(encode_command("sub", room))
+
+    def unsubscribe(self, room: str):
+        if room in self._rooms:
+            self._rooms.discard(room)
+            self._write(encode_command("unsub", room))
+
+    async def _run(self, handler: MessageHandler):
+        """持续接收消息，断线后自动重连"""
+        while True:
+            try:
+                reader, self._writer = await open_connection(self.address)
+                logger.info(f"已连接到背板: {self.address}")
+
+                # 重连后重新订阅所有聊天室
+                for room in self._rooms:
+                    self._writer.write(encode_command("sub", room))
+
+                while True:
+                    try:
+                        line = await reader.readline()
+                    except ValueError:
+                        # 超过 MAX_LINE_BYTES 的行：已被丢弃，继续接收后面的消息
+                        self.rejected += 1
+                        continue
+                    if not line:
+                        break
+                    try:
+                        command = json.loads(line)
+                    except ValueError:
+                        command = None
+                    if not isinstance(command, dict) or not isinstance(command.get("data"), dict):
+                        self.rejected += 1
+                        continue
+                    try:
+                        self.received += 1
+                        await handler(command["room"], command["data"])
+                    except Exception as e:
+                        logger.error(f"处理背板消息失败: {e}")
+
+            except (ConnectionError, FileNotFoundError, OSError) as e:
+                logger.warning(f"背板连接失败: {e}")
+
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            await asyncio.sleep(self.reconnect_interval)
+
+    def stats(self) -> Dict:
+        return {
+            "type": "broker",
+            "address": self.address,
+            "connected": self.is_connected,
+            "subscribed_rooms": len(self._rooms),
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
+
+
+# 地址前缀 -> 背板实现
+BACKPLANES: Dict[str, Callable[[str], Backplane]] = {
+    "local": lambda address: LocalBackplane(),
+    "unix": BrokerBackplane,
+    "tcp": BrokerBackplane,
+}
+
+
+def register_backplane(scheme: str, factory: Callable[[str], Backplane]):
+    """注册新的背板实现，例如 register_backplane("redis", RedisBackplane)"""
+    BACKPLANES[scheme] = factory
+
+
+def create_backplane(address: str = "") -> Backplane:
+    """根据地址创建背板，空地址表示单进程"""
+    scheme = address.partition(":")[0] if address else "local"
+    if scheme not in BACKPLANES:
+        raise ValueError(f"未知的背板类型: {address}")
+    return BACKPLANES[scheme](address)
+
+
+class BackplaneBroker:
+    """背板服务端：按聊天室把消息转发给订阅了它的连接"""
+
+    def __init__(self, address: Optional[str] = None):
+        self.address = address or default_address()
+        self._subscribers: Dict[str, Set[asyncio.StreamWriter]] = {}  # 聊天室 -> 订阅的连接
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.connections = 0
+        self.published = 0
+        self.forwarded = 0
+        self.rejected = 0
+
+    async def start(self):
+        """开始监听"""
+        kind, _, target = self.address.partition(":")
+        if kind == "unix":
+            if os.path.exists(target):
+                os.remove(target)
+            self._server = await asyncio.start_unix_server(self._handle_client, path=target, limit=MAX_LINE_BYTES)
+        else:
+            host, _, port = target.rpartition(":")
+            self._server = await asyncio.start_server(self._handle_client, host, int(port), limit=MAX_LINE_BYTES)
+            # 端口为0时由系统分配，更新为实际地址供工作进程使用
+            bound_port = self._server.sockets[0].getsockname()[1]
+            self.address = f"tcp:{host}:{bound_port}"
+
+        logger.info(f"背板服务已启动: {self.address}")
+
+    async def stop(self):
+        """停止监听并断开所有工作进程"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in list(self._clients):
+            writer.close()
+        self._clients.clear()
+        self._subscribers.clear()
+
+        kind, _, target = self.address.partition(":")
+        if kind == "unix" and os.path.exists(target):
+            os.remove(target)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个工作进程连接"""
+        self.connections += 1
+        self._clients.add(writer)
+        rooms: Set[str] = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # 超过 MAX_LINE_BYTES 的行：StreamReader 已经丢弃了读到的部分，
+                    # 这一行剩下的内容会作为格式不对的行被跳过
+                    self.rejected += 1
+                    continue
+                if not line:
+                    break
+                command = self._parse(line)
+                if command is None:
+                    self.rejected += 1
+                    continue
+                op, room = command
+
+                if op == "pub":
+                    backlogged = self._forward(room, line, writer)
+                    if backlogged:
+                        # 有订阅者的写缓冲积压了：等它们发完再读下一条，给发布方施加背压
+                        results = await asyncio.gather(*(w.drain() for w in backlogged), return_exceptions=True)
+                        for subscriber, result in zip(backlogged, results):
+                            if isinstance(result, Exception):
+                                # 连接已经断开：关闭后由它自己的处理协程退订
+                                subscriber.close()
+                elif op == "sub":
+                    self._subscribers.setdefault(room, set()).add(writer)
+                    rooms.add(room)
+                elif op == "unsub":
+                    self._unsubscribe(room, writer)
+                    rooms.discard(room)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for room in rooms:
+                self._unsubscribe(room, writer)
+            self._clients.discard(writer)
+            self.connections -= 1
+            writer.close()
+
+    @staticmethod
+    def _parse(line: bytes) -> Optional[Tuple[str, str]]:
+        """解析一行命令，返回 (操作, 聊天室)；格式不对时返回 None"""
+        try:
+            command = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(command, dict):
+            return None
+        op, room = command.get("op"), command.get("room")
+        if op not in ("pub", "sub", "unsub") or not isinstance(room, str):
+            return None
+        if op == "pub" and not isinstance(command.get("data"), dict):
+            return None
+        return op, room
+
+    def _unsubscribe(self, room: str, writer: asyncio.StreamWriter):
+        subscribers = self._subscribers.get(room)
+        if subscribers is not None:
+            subscribers.discard(writer)
+            if not subscribers:
+                del self._subscribers[room]
+
+    def _forward(self, room: str, line: bytes, sender: asyncio.StreamWriter) -> List[asyncio.StreamWriter]:
+        """
+        把原始行转发给该聊天室的其他订阅者（不重新编码）
+
+        Returns:
+            List[asyncio.StreamWriter]: 写缓冲超过 WRITE_BUFFER_LIMIT 的订阅者
+        """
+        self.published += 1
+        backlogged = []
+        for writer in self._subscribers.get(room, ()):
+            if writer is not sender and not writer.is_closing():
+                writer.write(line)
+                self.forwarded += 1
+                if writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+                    backlogged.append(writer)
+        return backlogged
+
+    def run_in_thread(self) -> threading.Thread:
+        """在后台线程中运行背板服务（主线程留给 uvicorn），启动完成后才返回"""
+        started = threading.Event()
+
+        async def serve():
+            await self.start()
+            started.set()
+            await asyncio.Event().wait()
+
+        def run():
+            try:
+                asyncio.run(serve())
+            except Exception as e:
+                logger.error(f"背板服务运行错误: {e}")
+                started.set()
+
+        thread = threading.Thread(target=run, name="ws-backplane", daemon=True)
+        thread.start()
+        started.wait()
+        return thread
+
+
+async def serve_forever(address: str):
+    broker = BackplaneBroker(address)
+    await broker.start()
+    print(f"背板服务已启动: {broker.address}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await broker.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket 背板服务")
+    parser.add_argument("--address", default=default_address(), help="监听地址 unix:/路径 或 tcp:主机:端口")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve_forever(args.address))
+    except KeyboardInterrupt:
+        print("背板服务已停止")
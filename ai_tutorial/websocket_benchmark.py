@@ -0,0 +1,695 @@
+"""
+WebSocket 服务器性能测试
+======================
+
+对 websocket_server.py 中各项优化做可重复的本地测试。
+
+fanout 场景：
+    在同一个进程内模拟 1000 个客户端（其中一部分很慢），对比
+    - 顺序广播：依次 await 每个客户端的 send_text（原来的做法）
+    - 扇出引擎：每个客户端一个发送队列 + 写任务（websocket_fanout.py）
+    的广播耗时和快客户端的消息送达延迟。
+
+churn 场景：
+    模拟大量用户加入/离开和持续的聊天消息，对比
+    - list + list.remove + chat_history.pop(0)（原来的做法）
+    - ConnectionRegistry + HistoryRing（websocket_registry.py）
+    每次操作的平均耗时。
+
+codec 场景：
+    对小消息和大消息分别统计每次广播的 CPU 耗时和每个客户端收到的字节数：
+    - 每个客户端各自 json.dumps（原来回放历史记录的做法）
+    - EncodedMessage 只编码一次（JSON / 二进制）
+    - permessage-deflate：全部压缩 对比 只压缩大消息（websocket_deflate.py）
+
+backplane 场景：
+    分别用 1、2、4 个 uvicorn 工作进程（多进程时通过本地背板转发）启动
+    websocket_server.py，所有客户端加入同一个聊天室并同时发送消息，
+    统计每秒送达的消息数和扇出延迟。
+
+coalesce 场景：
+    同一个聊天室里多个客户端按固定速率发送消息，分别在逐条发送和
+    按时间片合并发送（WS_COALESCE_MS）下统计客户端收到的帧数和服务器 CPU。
+
+运行方式：
+    python websocket_benchmark.py fanout --clients 1000 --slow 50
+    python websocket_benchmark.py churn --connections 10000
+    python websocket_benchmark.py codec --clients 1000
+    python websocket_benchmark.py backplane --workers 1 2 4
+    python websocket_benchmark.py coalesce --tick-ms 20
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from websocket_codec import EncodedMessage, PROTOCOL_BINARY, PROTOCOL_JSON
+from websocket_fanout import FanoutEngine
+from websocket_registry import ConnectionRegistry, HistoryRing
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """计算百分位（输入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    """把延迟列表（秒）汇总为毫秒统计"""
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+class FakeWebSocket:
+    """
+    模拟的 WebSocket 连接
+    send_text 会等待 delay 秒，用来模拟网络慢的客户端
+    """
+
+    def __init__(self, delay: float = 0.0, stalled: bool = False):
+        self.delay = delay
+        self.stalled = stalled
+        self.received: List[float] = []  # 每条消息的到达时间
+        self.closed = False
+
+    async def send_text(self, text: str):
+        if self.stalled:
+            # 永远不读数据的客户端：发送一直卡住
+            await asyncio.Event().wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(time.perf_counter())
+
+    async def send_bytes(self, data: bytes):
+        await self.send_text(data)
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+def create_clients(total: int, slow: int, stalled: int, slow_delay: float) -> List[FakeWebSocket]:
+    """创建客户端：前面是慢客户端和卡死的客户端，其余是正常客户端"""
+    clients = [FakeWebSocket(stalled=True) for _ in range(stalled)]
+    clients += [FakeWebSocket(delay=slow_delay) for _ in range(slow)]
+    clients += [FakeWebSocket() for _ in range(total - slow - stalled)]
+    return clients
+
+
+async def bench_sequential(args) -> Dict:
+    """原来的做法：依次 await 每个客户端（卡死的客户端无法参与，否则广播永远不结束）"""
+    clients = create_clients(args.clients, args.slow, 0, args.slow_delay)
+    fast_clients = clients[args.slow:]
+    message = json.dumps({"type": "chat", "username": "bench", "message": "x" * 64})
+
+    broadcast_times = []
+    send_starts = []
+    for _ in range(args.messages):
+        start = time.perf_counter()
+        send_starts.append(start)
+        for client in clients:
+            try:
+                await client.send_text(message)
+            except Exception:
+                pass
+        broadcast_times.append(time.perf_counter() - start)
+
+    latencies = [
+        received - send_starts[i]
+        for client in fast_clients
+        for i, received in enumerate(client.received)
+    ]
+    return {
+        "mode": "sequential",
+        "broadcast_call": latency_summary(broadcast_times),
+        "fast_client_delivery": latency_summary(latencies),
+    }
+
+
+async def bench_fanout(args) -> Dict:
+    """扇出引擎：广播只入队，由每个客户端的写任务发送"""
+    clients = create_clients(args.clients, args.slow, args.stalled, args.slow_delay)
+    fast_clients = clients[args.slow + args.stalled:]
+
+    engine = FanoutEngine(max_queue=args.queue_size, policy=args.policy, send_timeout=args.send_timeout)
+    connections = set()
+    for i, ws in enumerate(clients):
+        connections.add(engine.create_connection(ws, f"client_{i}", on_close=connections.discard))
+
+    message = json.dumps({"type": "chat", "username": "bench", "message": "x" * 64})
+    broadcast_times = []
+    send_starts = []
+    for _ in range(args.messages):
+        start = time.perf_counter()
+        send_starts.append(start)
+        engine.broadcast(connections, message)
+        broadcast_times.append(time.perf_counter() - start)
+        # 让写任务有机会运行（模拟消息之间的间隔）
+        await asyncio.sleep(0)
+
+    # 等待快客户端收完全部消息
+    deadline = time.perf_counter() + 10
+    while time.perf_counter() < deadline and any(len(c.received) < args.messages for c in fast_clients):
+        await asyncio.sleep(0.001)
+
+    latencies = [
+        received - send_starts[i]
+        for client in fast_clients
+        for i, received in enumerate(client.received)
+    ]
+
+    result = {
+        "mode": "fanout",
+        "policy": args.policy,
+        "broadcast_call": latency_summary(broadcast_times),
+        "fast_client_delivery": latency_summary(latencies),
+        "disconnected_clients": engine.disconnected_slow,
+        "dropped_messages": sum(c.dropped for c in connections),
+    }
+    for connection in list(connections):
+        connection.close()
+    return result
+
+
+async def run_fanout(args) -> Dict:
+    return {
+        "scenario": "fanout",
+        "clients": args.clients,
+        "slow_clients": args.slow,
+        "stalled_clients": args.stalled,
+        "slow_delay_ms": args.slow_delay * 1000,
+        "messages": args.messages,
+        "results": [await bench_sequential(args), await bench_fanout(args)],
+    }
+
+
+def run_churn(args) -> Dict:
+    """连接加入/离开和历史记录追加的耗时对比"""
+    rng = random.Random(1)
+    leave_order = list(range(args.connections))
+    rng.shuffle(leave_order)
+
+    # 原来的做法：列表保存连接，断开时 list.remove
+    start = time.perf_counter()
+    clients = []
+    for i in range(args.connections):
+        clients.append(f"用户_{i}")
+    for i in leave_order:
+        clients.remove(f"用户_{i}")
+    list_seconds = time.perf_counter() - start
+
+    # 注册表：字典按 ID 保存连接
+    start = time.perf_counter()
+    registry = ConnectionRegistry()
+    ids = []
+    for i in range(args.connections):
+        client_id = registry.next_id()
+        registry.add(client_id, object())
+        ids.append(client_id)
+    for i in leave_order:
+        registry.remove(ids[i])
+    registry_seconds = time.perf_counter() - start
+
+    # 历史记录：list.pop(0) 对比环形缓冲区
+    start = time.perf_counter()
+    history = []
+    for i in range(args.messages):
+        history.append(i)
+        if len(history) > args.history_size:
+            history.pop(0)
+    history_list_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ring = HistoryRing(args.history_size)
+    for i in range(args.messages):
+        ring.append(i)
+    ring_seconds = time.perf_counter() - start
+
+    operations = args.connections * 2
+    return {
+        "scenario": "churn",
+        "connections": args.connections,
+        "messages": args.messages,
+        "history_size": args.history_size,
+        "join_leave_us_per_op": {
+            "list": round(list_seconds / operations * 1e6, 3),
+            "registry": round(registry_seconds / operations * 1e6, 3),
+        },
+        "history_append_us_per_op": {
+            "list_pop0": round(history_list_seconds / args.messages * 1e6, 3),
+            "ring": round(ring_seconds / args.messages * 1e6, 3),
+        },
+    }
+
+
+WORDS = ["你好", "大家", "今天", "天气", "不错", "Python", "WebSocket", "服务器", "消息", "测试",
+         "hello", "world", "延迟", "吞吐量", "广播", "客户端", "😀", "编码", "压缩", "性能"]
+
+
+def make_message(rng: random.Random, length: int) -> Dict:
+    """生成一条长度约为 length 个字符的聊天消息"""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return {
+        "type": "chat",
+        "username": f"用户_{rng.randint(1, 9999)}",
+        "message": " ".join(words),
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def frame_size(payload_size: int) -> int:
+    """服务器发出的 WebSocket 帧大小（帧头 + 负载，服务器帧没有掩码）"""
+    if payload_size < 126:
+        return payload_size + 2
+    if payload_size < 65536:
+        return payload_size + 4
+    return payload_size + 10
+
+
+class DeflateStream:
+    """模拟一个连接上的 permessage-deflate 压缩（保留上下文，窗口 12 位）"""
+
+    def __init__(self, min_size: int, level: int = 6, window_bits: int = 12):
+        self.min_size = min_size
+        self.encoder = zlib.compressobj(level, zlib.DEFLATED, -window_bits, 5)
+
+    def encode(self, data: bytes) -> bytes:
+        if len(data) < self.min_size:
+            return data
+        return (self.encoder.compress(data) + self.encoder.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+
+def bench_codec_size(messages: List[Dict], clients: int, deflate_clients: int, deflate_min_size: int) -> Dict:
+    """某一种消息大小下各种编码方式的 CPU 和字节数"""
+    count = len(messages)
+
+    # 每个客户端各自编码（原来回放历史记录时的做法）
+    start = time.process_time()
+    for message in messages:
+        for _ in range(clients):
+            json.dumps(message)
+    per_client_json = time.process_time() - start
+
+    # 只编码一次，所有客户端共享
+    start = time.process_time()
+    encoded = [EncodedMessage(message) for message in messages]
+    for message in encoded:
+        for _ in range(clients):
+            message.encoded(PROTOCOL_JSON)
+    once_json = time.process_time() - start
+
+    start = time.process_time()
+    for message in encoded:
+        for _ in range(clients):
+            message.encoded(PROTOCOL_BINARY)
+    once_binary = time.process_time() - start
+
+    text_sizes = [len(m.text.encode("utf-8")) for m in encoded]
+    binary_sizes = [len(m.binary) for m in encoded]
+
+    # permessage-deflate 是每个连接单独压缩的，CPU 随客户端数线性增长
+    deflate_results = {}
+    for name, min_size in (("deflate_all", 0), ("deflate_large_only", deflate_min_size)):
+        streams = [DeflateStream(min_size) for _ in range(deflate_clients)]
+        wire = 0
+        start = time.process_time()
+        for message in encoded:
+            data = message.text.encode("utf-8")
+            for stream in streams:
+                wire += frame_size(len(stream.encode(data)))
+        seconds = time.process_time() - start
+        deflate_results[name] = {
+            "bytes_per_message_per_client": round(wire / count / deflate_clients, 1),
+            # 按实测的连接数换算到全部客户端
+            "cpu_ms_per_broadcast": round(seconds / count * 1000 * clients / deflate_clients, 3),
+        }
+
+    return {
+        "messages": count,
+        "avg_message_chars": round(sum(len(m["message"]) for m in messages) / count, 1),
+        "cpu_ms_per_broadcast": {
+            "json_per_client": round(per_client_json / count * 1000, 3),
+            "json_encode_once": round(once_json / count * 1000, 3),
+            "binary_encode_once": round(once_binary / count * 1000, 3),
+            **{name: result["cpu_ms_per_broadcast"] for name, result in deflate_results.items()},
+        },
+        "bytes_per_message_per_client": {
+            "json": round(sum(frame_size(n) for n in text_sizes) / count, 1),
+            "binary": round(sum(frame_size(n) for n in binary_sizes) / count, 1),
+            **{name: result["bytes_per_message_per_client"] for name, result in deflate_results.items()},
+        },
+    }
+
+
+def run_codec(args) -> Dict:
+    """小消息和大消息的编码 CPU / 字节数对比"""
+    rng = random.Random(1)
+    deflate_clients = min(args.clients, args.deflate_clients)
+    results = {}
+    for name, length in (("small", args.small_size), ("large", args.large_size)):
+        messages = [make_message(rng, length) for _ in range(args.messages)]
+        results[name] = bench_codec_size(messages, args.clients, deflate_clients, args.deflate_min_size)
+    return {
+        "scenario": "codec",
+        "clients": args.clients,
+        "deflate_min_size": args.deflate_min_size,
+        "results": results,
+    }
+
+
+# 启动被测服务器时关闭限流和空闲断开：所有压测客户端都来自 127.0.0.1，
+# 默认的按连接（10 条/秒）和按 IP（50 条/秒）限流会让测到的变成限流器
+BENCH_SERVER_ENV = {
+    "WS_MESSAGE_RATE": "0",
+    "WS_IP_MESSAGE_RATE": "0",
+    "WS_IDLE_TIMEOUT": "0",
+}
+
+
+def start_backplane_server(workers: int, port: int, env: Dict) -> List[subprocess.Popen]:
+    """启动被测服务器（多进程时先启动独立的背板服务），返回所有子进程"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    processes = []
+    env = dict(os.environ, **env)
+
+    if workers > 1:
+        address = f"unix:{tempfile.gettempdir()}/ws_backplane_bench_{os.getpid()}.sock"
+        processes.append(subprocess.Popen(
+            [sys.executable, "websocket_backplane.py", "--address", address],
+            cwd=here, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ))
+        env["WS_BACKPLANE"] = address
+        time.sleep(0.5)
+
+    processes.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "websocket_server:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=here, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ))
+
+    # 等待服务器就绪
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1).read()
+            return processes
+        except OSError:
+            time.sleep(0.2)
+    stop_processes(processes)
+    raise RuntimeError("服务器启动超时")
+
+
+def stop_processes(processes: List[subprocess.Popen]):
+    for process in reversed(processes):
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def backplane_clients(url: str, clients: int, messages: int, total_messages: int,
+                            barrier, timeout: float) -> Dict:
+    """一个客户端进程：连接 clients 个客户端，每个发送 messages 条消息并接收所有消息"""
+    import websockets
+
+    connections = [await websockets.connect(url, max_queue=None) for _ in range(clients)]
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, barrier.wait)
+
+    received = [0] * clients
+    latencies = []
+
+    async def receive(index: int, ws):
+        while received[index] < total_messages:
+            data = json.loads(await ws.recv())
+            text = data.get("message", "")
+            if data.get("type") == "chat" and text.startswith("bench:"):
+                received[index] += 1
+                latencies.append(time.time() - float(text[len("bench:"):]))
+
+    async def send(ws):
+        for _ in range(messages):
+            await ws.send(f"bench:{time.time()}")
+
+    start = time.time()
+    receivers = [asyncio.create_task(receive(i, ws)) for i, ws in enumerate(connections)]
+    await asyncio.gather(*(send(ws) for ws in connections))
+    await asyncio.wait(receivers, timeout=timeout)
+    end = time.time()
+
+    for task in receivers:
+        task.cancel()
+    for ws in connections:
+        await ws.close()
+
+    return {"start": start, "end": end, "received": sum(received), "latencies": latencies}
+
+
+def backplane_client_process(url, clients, messages, total_messages, barrier, timeout, results):
+    results.put(asyncio.run(backplane_clients(url, clients, messages, total_messages, barrier, timeout)))
+
+
+def bench_backplane_workers(args, workers: int) -> Dict:
+    """某一个工作进程数下的聚合吞吐量"""
+    processes = start_backplane_server(workers, args.port, {
+        **BENCH_SERVER_ENV,
+        # 测吞吐量：发送队列足够大，不因为突发流量丢消息
+        "WS_SEND_QUEUE_SIZE": str(args.clients * args.messages * 2),
+        "WS_HISTORY_REPLAY": "0",
+    })
+    try:
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(args.client_procs)
+        results = context.Queue()
+        per_proc = args.clients // args.client_procs
+        total_clients = per_proc * args.client_procs
+        total_messages = total_clients * args.messages
+        url = f"ws://127.0.0.1:{args.port}/ws/chat/bench"
+
+        clients = [
+            context.Process(target=backplane_client_process,
+                            args=(url, per_proc, args.messages, total_messages, barrier, args.timeout, results))
+            for _ in range(args.client_procs)
+        ]
+        for process in clients:
+            process.start()
+        reports = [results.get(timeout=args.timeout + 60) for _ in clients]
+        for process in clients:
+            process.join()
+    finally:
+        stop_processes(processes)
+
+    elapsed = max(r["end"] for r in reports) - min(r["start"] for r in reports)
+    received = sum(r["received"] for r in reports)
+    expected = total_clients * total_messages
+    return {
+        "workers": workers,
+        "clients": total_clients,
+        "published_messages": total_messages,
+        "deliveries": received,
+        "lost_deliveries": expected - received,
+        "elapsed_seconds": round(elapsed, 3),
+        "deliveries_per_second": round(received / elapsed) if elapsed else 0,
+        "fanout_latency": latency_summary([lat for r in reports for lat in r["latencies"]]),
+    }
+
+
+def run_backplane(args) -> Dict:
+    """不同工作进程数下的聚合消息吞吐量"""
+    return {
+        "scenario": "backplane",
+        # 工作进程数超过 CPU 核数后吞吐量不会再增长
+        "cpu_count": os.cpu_count(),
+        "clients": args.clients,
+        "messages_per_client": args.messages,
+        "client_processes": args.client_procs,
+        "results": [bench_backplane_workers(args, workers) for workers in args.workers],
+    }
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """读取进程累计使用的 CPU 秒数（仅 Linux，其他平台返回 None）"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    # utime 和 stime 是第 14、15 个字段（去掉前两个字段后的下标 11、12）
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def coalesce_clients(url: str, args) -> Dict:
+    """一轮测试：receivers 个客户端接收，senders 个客户端按固定速率发送"""
+    import websockets
+
+    connections = [await websockets.connect(url, max_queue=None) for _ in range(args.clients)]
+    frames = [0] * len(connections)
+    messages = [0] * len(connections)
+
+    async def receive(index: int, ws):
+        async for raw in ws:
+            data = json.loads(raw)
+            frames[index] += 1
+            messages[index] += len(data) if isinstance(data, list) else 1
+
+    async def send(ws):
+        interval = 1 / args.rate
+        next_time = time.perf_counter()
+        end = next_time + args.duration
+        while next_time < end:
+            await ws.send(f"bench:{time.time()}")
+            next_time += interval
+            await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+
+    receivers = [asyncio.create_task(receive(i, ws)) for i, ws in enumerate(connections)]
+    await asyncio.sleep(0.5)
+    frames[:] = [0] * len(connections)
+    messages[:] = [0] * len(connections)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(ws) for ws in connections[:args.senders]))
+    await asyncio.sleep(0.5)  # 等最后一个时间片发出
+    elapsed = time.perf_counter() - start
+
+    for task in receivers:
+        task.cancel()
+    for ws in connections:
+        await ws.close()
+    return {"frames": sum(frames), "messages": sum(messages), "elapsed": elapsed}
+
+
+def bench_coalesce_tick(args, tick_ms: float) -> Dict:
+    processes = start_backplane_server(1, args.port, {
+        **BENCH_SERVER_ENV,
+        "WS_COALESCE_MS": str(tick_ms),
+        "WS_SEND_QUEUE_SIZE": "10000",
+        "WS_HISTORY_REPLAY": "0",
+    })
+    server_pid = processes[-1].pid
+    try:
+        cpu_before = process_cpu_seconds(server_pid)
+        result = asyncio.run(coalesce_clients(f"ws://127.0.0.1:{args.port}/ws/chat/bench", args))
+        cpu_after = process_cpu_seconds(server_pid)
+    finally:
+        stop_processes(processes)
+
+    cpu = cpu_after - cpu_before if cpu_before is not None else None
+    return {
+        "tick_ms": tick_ms,
+        "messages_received": result["messages"],
+        "frames_received": result["frames"],
+        "frames_per_second": round(result["frames"] / result["elapsed"]),
+        "messages_per_frame": round(result["messages"] / result["frames"], 2) if result["frames"] else 0.0,
+        "server_cpu_seconds": round(cpu, 3) if cpu is not None else None,
+        "server_cpu_percent": round(cpu / result["elapsed"] * 100, 1) if cpu is not None else None,
+    }
+
+
+def run_coalesce(args) -> Dict:
+    """逐条发送和合并发送的帧数、服务器 CPU 对比"""
+    results = [bench_coalesce_tick(args, 0), bench_coalesce_tick(args, args.tick_ms)]
+    baseline, coalesced = results
+    saved = None
+    if baseline["server_cpu_seconds"] and coalesced["server_cpu_seconds"] is not None:
+        saved = round((1 - coalesced["server_cpu_seconds"] / baseline["server_cpu_seconds"]) * 100, 1)
+    return {
+        "scenario": "coalesce",
+        "clients": args.clients,
+        "senders": args.senders,
+        "messages_per_second": args.senders * args.rate,
+        "duration_seconds": args.duration,
+        "results": results,
+        "server_cpu_saved_percent": saved,
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="WebSocket 服务器性能测试")
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    fanout = subparsers.add_parser("fanout", help="对比顺序广播和扇出引擎的广播延迟")
+    fanout.add_argument("--clients", type=int, default=1000, help="客户端总数 (默认: 1000)")
+    fanout.add_argument("--slow", type=int, default=50, help="慢客户端数量 (默认: 50)")
+    fanout.add_argument("--stalled", type=int, default=5, help="完全卡死的客户端数量，仅扇出模式 (默认: 5)")
+    fanout.add_argument("--slow-delay", type=float, default=0.005, help="慢客户端每次发送的耗时（秒）(默认: 0.005)")
+    fanout.add_argument("--messages", type=int, default=20, help="广播的消息数 (默认: 20)")
+    fanout.add_argument("--queue-size", type=int, default=8, help="每个客户端发送队列长度 (默认: 8)")
+    fanout.add_argument("--policy", default="drop_oldest", help="慢客户端策略 (默认: drop_oldest)")
+    fanout.add_argument("--send-timeout", type=float, default=1.0, help="发送超时秒数 (默认: 1.0)")
+
+    churn = subparsers.add_parser("churn", help="对比连接列表/注册表和历史记录列表/环形缓冲区")
+    churn.add_argument("--connections", type=int, default=10000, help="加入再离开的连接数 (默认: 10000)")
+    churn.add_argument("--messages", type=int, default=200000, help="追加的聊天消息数 (默认: 200000)")
+    churn.add_argument("--history-size", type=int, default=1000, help="历史记录容量 (默认: 1000)")
+
+    codec = subparsers.add_parser("codec", help="对比各种消息编码方式的 CPU 和字节数")
+    codec.add_argument("--clients", type=int, default=1000, help="每次广播的客户端数 (默认: 1000)")
+    codec.add_argument("--messages", type=int, default=200, help="每种大小广播的消息数 (默认: 200)")
+    codec.add_argument("--small-size", type=int, default=40, help="小消息字符数 (默认: 40)")
+    codec.add_argument("--large-size", type=int, default=4000, help="大消息字符数 (默认: 4000)")
+    codec.add_argument("--deflate-min-size", type=int, default=512, help="只压缩超过该字节数的消息 (默认: 512)")
+    codec.add_argument("--deflate-clients", type=int, default=50, help="实际模拟压缩的连接数 (默认: 50)")
+
+    backplane = subparsers.add_parser("backplane", help="多工作进程 + 背板的聚合吞吐量")
+    backplane.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="要测试的工作进程数 (默认: 1 2 4)")
+    backplane.add_argument("--clients", type=int, default=200, help="客户端总数 (默认: 200)")
+    backplane.add_argument("--messages", type=int, default=10, help="每个客户端发送的消息数 (默认: 10)")
+    backplane.add_argument("--client-procs", type=int, default=4, help="运行客户端的进程数 (默认: 4)")
+    backplane.add_argument("--port", type=int, default=8800, help="被测服务器端口 (默认: 8800)")
+    backplane.add_argument("--timeout", type=float, default=60.0, help="等待消息送达的超时秒数 (默认: 60)")
+
+    coalesce = subparsers.add_parser("coalesce", help="对比逐条发送和按时间片合并发送")
+    coalesce.add_argument("--clients", type=int, default=50, help="聊天室中的客户端数 (默认: 50)")
+    coalesce.add_argument("--senders", type=int, default=10, help="其中持续发送消息的客户端数 (默认: 10)")
+    coalesce.add_argument("--rate", type=float, default=30.0, help="每个发送者每秒发送的消息数 (默认: 30)")
+    coalesce.add_argument("--duration", type=float, default=5.0, help="每轮发送持续的秒数 (默认: 5)")
+    coalesce.add_argument("--tick-ms", type=float, default=20.0, help="合并发送的时间片毫秒数 (默认: 20)")
+    coalesce.add_argument("--port", type=int, default=8801, help="被测服务器端口 (默认: 8801)")
+
+    args = parser.parse_args()
+
+    if args.scenario == "fanout":
+        result = asyncio.run(run_fanout(args))
+    elif args.scenario == "churn":
+        result = run_churn(args)
+    elif args.scenario == "codec":
+        result = run_codec(args)
+    elif args.scenario == "backplane":
+        result = run_backplane(args)
+    elif args.scenario == "coalesce":
+        result = run_coalesce(args)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
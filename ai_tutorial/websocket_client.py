@@ -12,77 +12,296 @@ WebSocket 客户端基础教程
 import asyncio
 import websockets
 import json
+import random
 import threading
 import time
-from typing import Optional
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
 import sys
 
+from websocket_codec import SUBPROTOCOL_BINARY, decode_binary_frames
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """计算百分位（输入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
 class WebSocketClient:
     """
     WebSocket 客户端类
     封装了 WebSocket 连接的基本操作
+
+    开启 auto_reconnect 后，连接断开时按指数退避自动重连；断线期间发送的消息
+    先放进有上限的发送缓冲区，重连后按原来的顺序发出。
+    开启 pipeline 后，send_message 只把消息放进缓冲区就返回，由后台写任务连续发送，
+    调用方不需要等待每条消息写完。
     """
 
-    def __init__(self, server_url: str = "ws://localhost:8000/ws/chat"):
+    def __init__(
+        self,
+        server_url: str = "ws://localhost:8000/ws/chat",
+        binary: bool = False,
+        verbose: bool = True,
+        auto_reconnect: bool = False,
+        pipeline: bool = False,
+        max_buffer: int = 1000,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0
+    ):
         """
         初始化 WebSocket 客户端
 
         Args:
             server_url: WebSocket 服务器地址
+            binary: 是否请求紧凑二进制编码（子协议 chat.bin.v1）
+            verbose: 是否打印连接状态和收发的消息（压力测试时关闭）
+            auto_reconnect: 连接断开后是否自动重连
+            pipeline: 是否由后台任务连续发送（send_message 不等待网络）
+            max_buffer: 发送缓冲区最多保存的消息数，满了丢弃最旧的
+            reconnect_delay: 第一次重连前等待的秒数，之后每次翻倍
+            max_reconnect_delay: 重连等待的最大秒数
         """
         self.server_url = server_url
+        self.binary = binary
+        self.verbose = verbose
+        self.last_error = ""  # 最近一次连接或收发失败的原因
         self.websocket: Optional[websockets.WebSocketServerProtocol] = None
         self.is_connected = False
         self.client_id = f"Python客户端_{int(time.time())}"
+        self.last_seq: Optional[int] = None  # 收到的最后一条聊天消息的序号
+
+        self.auto_reconnect = auto_reconnect
+        self.pipeline = pipeline
+        self.max_buffer = max_buffer
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.joined_rooms: Set[str] = set()  # 通过 join_room 加入的聊天室，重连后重新加入
+
+        # 发送缓冲区：(消息, 放入时间)，只有写任务在发送成功后才移除队首
+        self._outbox: Deque[Tuple[str, float]] = deque()
+        self._outbox_ready = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # 统计
+        self.sent = 0
+        self.dropped = 0  # 发送缓冲区满了被丢弃的消息
+        self.max_queued = 0
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self._send_latencies: Deque[float] = deque(maxlen=1000)  # 最近的发送耗时（放入缓冲区 -> 写出）
+
+    def connect_url(self) -> str:
+        """连接地址：重连时带上最后收到的序号，服务器会补发错过的消息"""
+        if self.last_seq is None:
+            return self.server_url
+        separator = "&" if "?" in self.server_url else "?"
+        return f"{self.server_url}{separator}last_seq={self.last_seq}"
+
+    def log(self, text: str):
+        """打印状态信息（verbose 关闭时不打印）"""
+        if self.verbose:
+            print(text)
 
     async def connect(self):
         """
         连接到 WebSocket 服务器
         """
+        self._closing = False
         try:
-            print(f"正在连接到服务器: {self.server_url}")
-            # 创建 WebSocket 连接
-            self.websocket = await websockets.connect(self.server_url)
-            self.is_connected = True
-            print("✅ 连接成功！")
-            print(f"客户端ID: {self.client_id}")
-
-            # 启动消息监听任务
-            asyncio.create_task(self.listen_for_messages())
+            await self._open()
+            if self.binary:
+                self.log(f"消息编码: {self.websocket.subprotocol or 'JSON'}")
+            self.log(f"客户端ID: {self.client_id}")
 
         except Exception as e:
-            print(f"❌ 连接失败: {e}")
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.log(f"❌ 连接失败: {e}")
             self.is_connected = False
+            if self.auto_reconnect:
+                self._schedule_reconnect()
+
+    async def _open(self):
+        """建立连接，启动监听任务，重新加入聊天室并发出缓冲区里的消息"""
+        url = self.connect_url()
+        self.log(f"正在连接到服务器: {url}")
+        # 创建 WebSocket 连接
+        # 请求二进制编码时通过子协议协商，服务器不支持时会退回 JSON
+        subprotocols = [SUBPROTOCOL_BINARY] if self.binary else None
+        self.websocket = await websockets.connect(url, subprotocols=subprotocols)
+        self.is_connected = True
+        self.log("✅ 连接成功！")
+
+        # 启动消息监听任务
+        asyncio.create_task(self.listen_for_messages())
+
+        # 重连时重新加入之前加入的聊天室（带上序号，补收断线期间的消息），再按顺序发出缓冲的消息
+        for room in sorted(self.joined_rooms):
+            await self.websocket.send(self._join_command(room))
+        if self.pipeline or self.auto_reconnect:
+            if self._writer_task is None or self._writer_task.done():
+                self._writer_task = asyncio.create_task(self._write_outbox())
+            self._outbox_ready.set()
+
+    def _schedule_reconnect(self):
+        if self._closing or (self._reconnect_task is not None and not self._reconnect_task.done()):
+            return
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        """按指数退避重连（加随机抖动，避免大量客户端同时重连）"""
+        attempt = 0
+        while not self._closing and not self.is_connected:
+            delay = min(self.max_reconnect_delay, self.reconnect_delay * 2 ** attempt)
+            delay *= random.uniform(0.5, 1.0)
+            self.log(f"🔄 {delay:.1f} 秒后重连（缓冲 {len(self._outbox)} 条消息）")
+            await asyncio.sleep(delay)
+            if self._closing:
+                return
+            attempt += 1
+            self.reconnect_attempts += 1
+            try:
+                await self._open()
+                self.reconnects += 1
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.log(f"❌ 重连失败: {e}")
 
     async def disconnect(self):
         """
         断开 WebSocket 连接
         """
+        self._closing = True
+        for task in (self._reconnect_task, self._writer_task):
+            if task is not None:
+                task.cancel()
         if self.websocket and self.is_connected:
             try:
                 await self.websocket.close()
                 self.is_connected = False
-                print("🔌 连接已断开")
+                self.log("🔌 连接已断开")
             except Exception as e:
-                print(f"断开连接时出错: {e}")
+                self.log(f"断开连接时出错: {e}")
 
     async def send_message(self, message: str):
         """
         发送消息到服务器
 
+        开启 pipeline 时只放入发送缓冲区；开启 auto_reconnect 时，断线期间或发送失败的消息
+        也放入缓冲区，重连后按顺序发出。
+
         Args:
             message: 要发送的消息内容
+
+        Returns:
+            bool: 是否发送成功（放入缓冲区也算成功）
         """
+        if self.pipeline or (self.auto_reconnect and not self.is_connected) or self._outbox:
+            # 缓冲区里还有没发出的消息时也要排队，保证顺序
+            return self._enqueue(message)
+
         if not self.is_connected or not self.websocket:
-            print("❌ 未连接到服务器，无法发送消息")
-            return
+            self.log("❌ 未连接到服务器，无法发送消息")
+            return False
 
+        start = time.perf_counter()
         try:
             # 发送消息
             await self.websocket.send(message)
-            print(f"📤 发送: {message}")
+            self._send_latencies.append(time.perf_counter() - start)
+            self.sent += 1
+            self.log(f"📤 发送: {message}")
+            return True
         except Exception as e:
-            print(f"❌ 发送消息失败: {e}")
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.log(f"❌ 发送消息失败: {e}")
+            if self.auto_reconnect:
+                return self._enqueue(message)
+            return False
+
+    def _enqueue(self, message: str) -> bool:
+        """放入发送缓冲区，满了丢弃最旧的消息"""
+        if len(self._outbox) >= self.max_buffer:
+            self._outbox.popleft()
+            self.dropped += 1
+        self._outbox.append((message, time.perf_counter()))
+        self.max_queued = max(self.max_queued, len(self._outbox))
+        self._outbox_ready.set()
+        return True
+
+    async def _write_outbox(self):
+        """后台写任务：按顺序连续发送缓冲区中的消息，发送失败的消息留在队首等重连"""
+        while True:
+            await self._outbox_ready.wait()
+            self._outbox_ready.clear()
+            while self._outbox and self.is_connected:
+                message, queued_at = self._outbox[0]
+                try:
+                    await self.websocket.send(message)
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    break
+                self._outbox.popleft()
+                self._send_latencies.append(time.perf_counter() - queued_at)
+                self.sent += 1
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待发送缓冲区清空，返回是否在超时前清空"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._outbox:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    def metrics(self) -> Dict:
+        """发送延迟、缓冲区和重连统计"""
+        latencies = sorted(self._send_latencies)
+        return {
+            "connected": self.is_connected,
+            "sent": self.sent,
+            "queued": len(self._outbox),
+            "max_queued": self.max_queued,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+            "reconnect_attempts": self.reconnect_attempts,
+            "send_latency_ms": {
+                "p50": round(_percentile(latencies, 50) * 1000, 3),
+                "p95": round(_percentile(latencies, 95) * 1000, 3),
+                "p99": round(_percentile(latencies, 99) * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+            "last_error": self.last_error,
+        }
+
+    def _join_command(self, room: str) -> str:
+        command = {"action": "join", "room": room}
+        if self.last_seq is not None:
+            command["last_seq"] = self.last_seq
+        return json.dumps(command, ensure_ascii=False)
+
+    async def join_room(self, room: str):
+        """
+        加入聊天室（之后的普通消息会发到这个聊天室）
+
+        Args:
+            room: 聊天室名称
+        """
+        self.joined_rooms.add(room)
+        await self.send_message(self._join_command(room))
+
+    async def leave_room(self, room: str):
+        """
+        离开聊天室
+
+        Args:
+            room: 聊天室名称
+        """
+        self.joined_rooms.discard(room)
+        await self.send_message(json.dumps({"action": "leave", "room": room}, ensure_ascii=False))
 
     async def listen_for_messages(self):
         """
@@ -94,6 +313,11 @@ class WebSocketClient:
                 # 等待接收消息
                 message = await self.websocket.recv()
 
+                # 二进制帧使用紧凑编码（可能是多条消息合并的批量帧）
+                if isinstance(message, bytes):
+                    self.handle_message(decode_binary_frames(message))
+                    continue
+
                 # 解析 JSON 消息
                 try:
                     data = json.loads(message)
@@ -102,32 +326,51 @@ class WebSocketClient:
                     # 如果不是 JSON 格式，直接打印
                     print(f"📥 收到: {message}")
 
-        except websockets.exceptions.ConnectionClosed:
-            print("🔌 连接被服务器关闭")
+        except websockets.exceptions.ConnectionClosed as e:
+            self.last_error = f"ConnectionClosed: {e}"
+            self.log("🔌 连接被服务器关闭")
             self.is_connected = False
         except Exception as e:
-            print(f"监听消息时出错: {e}")
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.log(f"监听消息时出错: {e}")
             self.is_connected = False
 
-    def handle_message(self, data: dict):
+        if self.auto_reconnect and not self._closing:
+            self._schedule_reconnect()
+
+    def handle_message(self, data):
         """
         处理接收到的消息
 
         Args:
-            data: 解析后的消息数据
+            data: 解析后的消息数据（服务器合并发送时是消息列表）
         """
+        if isinstance(data, list):
+            for item in data:
+                self.handle_message(item)
+            return
+
         message_type = data.get('type', 'unknown')
         username = data.get('username', '未知用户')
         message = data.get('message', '')
         timestamp = data.get('timestamp', '')
+        room = data.get('room')
+        prefix = f"#{room} " if room else ""
+
+        # 记录序号，断线重连时用来补收错过的消息
+        seq = data.get('seq')
+        if seq is not None and (self.last_seq is None or seq > self.last_seq):
+            self.last_seq = seq
 
         # 根据消息类型进行不同处理
         if message_type == 'chat':
-            print(f"💬 [{username}] {message}")
+            self.log(f"💬 {prefix}[{username}] {message}")
         elif message_type == 'system':
-            print(f"ℹ️  {message}")
+            self.log(f"ℹ️  {prefix}{message}")
+        elif message_type == 'error':
+            self.log(f"⚠️  {message}")
         else:
-            print(f"📥 收到未知类型消息: {data}")
+            self.log(f"📥 收到未知类型消息: {data}")
 
 async def interactive_chat():
     """
@@ -166,6 +409,12 @@ async def interactive_chat():
             elif user_input.lower() == 'status':
                 print(f"连接状态: {'已连接' if client.is_connected else '未连接'}")
                 continue
+            elif user_input.startswith('/join '):
+                await client.join_room(user_input[len('/join '):].strip())
+                continue
+            elif user_input.startswith('/leave '):
+                await client.leave_room(user_input[len('/leave '):].strip())
+                continue
             elif not user_input:
                 continue  # 跳过空消息
 
@@ -189,6 +438,8 @@ def print_help():
     print("quit/exit/q - 退出聊天")
     print("help - 显示此帮助信息")
     print("status - 查看连接状态")
+    print("/join 名称 - 加入聊天室（之后的消息发到该聊天室）")
+    print("/leave 名称 - 离开聊天室")
     print("其他输入 - 发送消息")
     print()
 
@@ -266,6 +517,28 @@ async def multiple_clients_example():
     await asyncio.gather(*tasks)
     print("所有客户端任务完成！")
 
+async def resilient_bot_example():
+    """
+    自动重连示例
+    机器人持续发送消息，期间可以重启服务器：断线期间的消息先缓冲，重连后按顺序发出
+    """
+    print("=== 自动重连示例（运行中可以重启服务器试试）===")
+
+    client = WebSocketClient(auto_reconnect=True, pipeline=True, max_buffer=500)
+    await client.connect()
+
+    try:
+        for i in range(1, 61):
+            await client.send_message(f"机器人消息 {i}")
+            await asyncio.sleep(0.5)
+            if i % 10 == 0:
+                print(f"📊 统计: {json.dumps(client.metrics(), ensure_ascii=False)}")
+
+        await client.flush(timeout=30)
+    finally:
+        print(f"📊 最终统计: {json.dumps(client.metrics(), ensure_ascii=False)}")
+        await client.disconnect()
+
 def main():
     """
     主函数
@@ -276,11 +549,12 @@ def main():
     print("1. 交互式聊天")
     print("2. 自动聊天示例")
     print("3. 多客户端示例")
-    print("4. 退出")
+    print("4. 自动重连示例")
+    print("5. 退出")
 
     while True:
         try:
-            choice = input("\n请选择 (1-4): ").strip()
+            choice = input("\n请选择 (1-5): ").strip()
 
             if choice == "1":
                 # 运行交互式聊天
@@ -295,6 +569,10 @@ def main():
                 asyncio.run(multiple_clients_example())
                 break
             elif choice == "4":
+                # 运行自动重连示例
+                asyncio.run(resilient_bot_example())
+                break
+            elif choice == "5":
                 print("再见！")
                 break
             else:
@@ -311,7 +589,12 @@ if __name__ == "__main__":
     # 检查是否安装了 websockets 库
     try:
         import websockets
-        main()
+        if len(sys.argv) > 1 and sys.argv[1] == "swarm":
+            # 压力测试模式：python websocket_client.py swarm --clients 2000 ...
+            from websocket_swarm import main as swarm_main
+            swarm_main(sys.argv[2:])
+        else:
+            main()
     except ImportError:
         print("❌ 未安装 websockets 库")
         print("请运行以下命令安装：")
@@ -0,0 +1,293 @@
+"""
+WebSocket 消息编码层
+==================
+
+- EncodedMessage：一条消息只编码一次，JSON 文本和二进制编码结果都缓存起来，
+  广播给所有客户端、以及新用户加入时回放历史记录都直接复用
+- 紧凑二进制协议：客户端在握手时通过子协议 "chat.bin.v1" 协商，
+  比 JSON 省去了字段名和引号；超过阈值的大消息再用 zlib 压缩
+- EncodedBatch：合并发送模式下，一个时间片内的多条消息合并成一帧
+  （JSON 为消息数组，二进制为批量帧），同样只编码一次
+
+二进制帧格式（大端序）：
+    1 字节  版本号（1）
+    1 字节  标志位（bit0 = 消息体已 zlib 压缩，bit1 = 带聊天室名，bit3 = 带序号）
+    消息体：
+        1 字节  消息类型编号（0 = 自定义类型，类型名放在 username 之前）
+        8 字节  时间戳（Unix 秒，double）
+        [2 字节长度 + UTF-8] 自定义类型名（仅类型编号为 0 时）
+        [2 字节长度 + UTF-8] 聊天室名（仅 bit1 置位时）
+        [8 字节] 消息序号（仅 bit3 置位时，见 websocket_log.py）
+        2 字节长度 + UTF-8 用户名
+        4 字节长度 + UTF-8 消息内容
+
+批量帧（标志位 bit2 置位）：
+    1 字节  版本号（1）
+    1 字节  标志位（0x04）
+    2 字节  消息条数
+    每条消息：4 字节长度 + 上面格式的单条消息帧
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import json
+import struct
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+# 子协议名称
+SUBPROTOCOL_JSON = "chat.json"
+SUBPROTOCOL_BINARY = "chat.bin.v1"
+SUPPORTED_SUBPROTOCOLS = (SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON)
+
+# 协议类型（连接上使用的编码方式）
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
+
+BINARY_VERSION = 1
+FLAG_COMPRESSED = 0x01
+FLAG_ROOM = 0x02
+FLAG_BATCH = 0x04
+FLAG_SEQ = 0x08
+
+# 超过该字节数的二进制消息体进行压缩；压缩级别 6 在速度和压缩率之间比较均衡
+COMPRESS_THRESHOLD = 512
+COMPRESS_LEVEL = 6
+
+# 常见消息类型用一个字节表示
+TYPE_CODES = {"chat": 1, "system": 2}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+_HEADER = struct.Struct(">BB")
+_BODY_HEAD = struct.Struct(">Bd")
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+_U64 = struct.Struct(">Q")
+
+
+def choose_protocol(requested: List[str]) -> Optional[str]:
+    """
+    从客户端请求的子协议中选择一个（优先二进制）
+
+    Returns:
+        Optional[str]: 选中的子协议名，客户端没有请求时返回 None（使用 JSON）
+    """
+    for name in SUPPORTED_SUBPROTOCOLS:
+        if name in requested:
+            return name
+    return None
+
+
+def protocol_of(subprotocol: Optional[str]) -> str:
+    """子协议名 -> 连接使用的编码方式"""
+    return PROTOCOL_BINARY if subprotocol == SUBPROTOCOL_BINARY else PROTOCOL_JSON
+
+
+def _timestamp_to_seconds(timestamp: str) -> float:
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def encode_binary(message: Dict, compress_threshold: int = COMPRESS_THRESHOLD) -> bytes:
+    """把消息字典编码为紧凑二进制帧"""
+    message_type = message.get("type", "")
+    type_code = TYPE_CODES.get(message_type, 0)
+
+    parts = [_BODY_HEAD.pack(type_code, _timestamp_to_seconds(message.get("timestamp", "")))]
+    if type_code == 0:
+        type_bytes = message_type.encode("utf-8")
+        parts += [_U16.pack(len(type_bytes)), type_bytes]
+
+    flags = 0
+    room = message.get("room")
+    if room is not None:
+        room_bytes = str(room).encode("utf-8")
+        parts += [_U16.pack(len(room_bytes)), room_bytes]
+        flags |= FLAG_ROOM
+
+    seq = message.get("seq")
+    if seq is not None:
+        parts.append(_U64.pack(int(seq)))
+        flags |= FLAG_SEQ
+
+    username = str(message.get("username", "")).encode("utf-8")
+    text = str(message.get("message", "")).encode("utf-8")
+    parts += [_U16.pack(len(username)), username, _U32.pack(len(text)), text]
+    body = b"".join(parts)
+
+    if len(body) > compress_threshold:
+        compressed = zlib.compress(body, COMPRESS_LEVEL)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= FLAG_COMPRESSED
+
+    return _HEADER.pack(BINARY_VERSION, flags) + body
+
+
+def encode_binary_batch(frames: List[bytes]) -> bytes:
+    """把多条已编码的二进制消息合并为一个批量帧"""
+    parts = [_HEADER.pack(BINARY_VERSION, FLAG_BATCH), _U16.pack(len(frames))]
+    for frame in frames:
+        parts += [_U32.pack(len(frame)), frame]
+    return b"".join(parts)
+
+
+def decode_binary_frames(frame: bytes) -> List[Dict]:
+    """解码二进制帧，单条消息和批量帧都返回消息列表"""
+    version, flags = _HEADER.unpack_from(frame, 0)
+    if not flags & FLAG_BATCH:
+        return [decode_binary(frame)]
+
+    (count,) = _U16.unpack_from(frame, _HEADER.size)
+    offset = _HEADER.size + _U16.size
+    messages = []
+    for _ in range(count):
+        (length,) = _U32.unpack_from(frame, offset)
+        offset += _U32.size
+        messages.append(decode_binary(frame[offset:offset + length]))
+        offset += length
+    return messages
+
+
+def decode_binary(frame: bytes) -> Dict:
+    """把二进制帧解码为消息字典（与 JSON 格式的字段一致）"""
+    version, flags = _HEADER.unpack_from(frame, 0)
+    if version != BINARY_VERSION:
+        raise ValueError(f"不支持的二进制协议版本: {version}")
+    if flags & FLAG_BATCH:
+        raise ValueError("批量帧请使用 decode_binary_frames 解码")
+
+    body = frame[_HEADER.size:]
+    if flags & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+
+    type_code, seconds = _BODY_HEAD.unpack_from(body, 0)
+    offset = _BODY_HEAD.size
+
+    if type_code == 0:
+        (length,) = _U16.unpack_from(body, offset)
+        offset += _U16.size
+        message_type = body[offset:offset + length].decode("utf-8")
+        offset += length
+    else:
+        message_type = TYPE_NAMES.get(type_code, "unknown")
+
+    room = None
+    if flags & FLAG_ROOM:
+        (length,) = _U16.unpack_from(body, offset)
+        offset += _U16.size
+        room = body[offset:offset + length].decode("utf-8")
+        offset += length
+
+    seq = None
+    if flags & FLAG_SEQ:
+        (seq,) = _U64.unpack_from(body, offset)
+        offset += _U64.size
+
+    (length,) = _U16.unpack_from(body, offset)
+    offset += _U16.size
+    username = body[offset:offset + length].decode("utf-8")
+    offset += length
+
+    (length,) = _U32.unpack_from(body, offset)
+    offset += _U32.size
+    text = body[offset:offset + length].decode("utf-8")
+
+    message = {
+        "type": message_type,
+        "username": username,
+        "message": text,
+        "timestamp": datetime.fromtimestamp(seconds).isoformat() if seconds else "",
+    }
+    if room is not None:
+        message["room"] = room
+    if seq is not None:
+        message["seq"] = seq
+    return message
+
+
+class EncodedMessage:
+    """
+    只编码一次的消息
+    第一次需要某种编码时才编码，之后直接返回缓存的结果
+    """
+
+    __slots__ = ("_data", "_text", "_binary")
+
+    def __init__(self, data: Dict):
+        self._data: Optional[Dict] = data
+        self._text: Optional[str] = None
+        self._binary: Optional[bytes] = None
+
+    @classmethod
+    def from_text(cls, text: str) -> "EncodedMessage":
+        """
+        用已有的 JSON 文本创建（例如从消息日志读出的记录）
+        JSON 客户端直接发送原文，只有二进制客户端需要时才解析
+        """
+        message = cls(None)
+        message._text = text
+        return message
+
+    @property
+    def data(self) -> Dict:
+        """消息字典"""
+        if self._data is None:
+            self._data = json.loads(self._text)
+        return self._data
+
+    @property
+    def text(self) -> str:
+        """JSON 文本编码"""
+        if self._text is None:
+            # 不转义中文、去掉多余空格，中文消息的体积明显更小
+            self._text = json.dumps(self.data, ensure_ascii=False, separators=(",", ":"))
+        return self._text
+
+    @property
+    def binary(self) -> bytes:
+        """紧凑二进制编码"""
+        if self._binary is None:
+            self._binary = encode_binary(self.data)
+        return self._binary
+
+    def encoded(self, protocol: str) -> Union[str, bytes]:
+        """按连接使用的编码方式返回已编码的消息"""
+        return self.binary if protocol == PROTOCOL_BINARY else self.text
+
+
+class EncodedBatch:
+    """
+    合并成一帧发送的多条消息
+    JSON 编码为消息数组，直接拼接每条消息已缓存的 JSON 文本，不重新序列化
+    """
+
+    __slots__ = ("messages", "_text", "_binary")
+
+    def __init__(self, messages: List[EncodedMessage]):
+        self.messages = messages
+        self._text: Optional[str] = None
+        self._binary: Optional[bytes] = None
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "[" + ",".join(m.text for m in self.messages) + "]"
+        return self._text
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = encode_binary_batch([m.binary for m in self.messages])
+        return self._binary
+
+    def encoded(self, protocol: str) -> Union[str, bytes]:
+        """按连接使用的编码方式返回已编码的批量消息"""
+        return self.binary if protocol == PROTOCOL_BINARY else self.text
@@ -0,0 +1,81 @@
+"""
+按消息大小启用的 permessage-deflate 压缩
+=====================================
+
+uvicorn 默认对每一条 WebSocket 消息都做 permessage-deflate 压缩。
+聊天消息大多只有几十个字节，压缩几乎省不了流量，反而每条消息都要花 CPU；
+而历史记录、长文本等大消息压缩后能省下大部分流量。
+
+这里的协议类只压缩超过 min_size 字节的消息，小消息直接原样发送
+（RFC 7692 允许同一连接上混合压缩和未压缩的消息，浏览器都能正确处理）。
+
+使用方法（websocket_server.py 已经这样配置）：
+    uvicorn.run("websocket_server:app", ws="websocket_deflate:DeflateWebSocketProtocol")
+
+可通过环境变量调整：
+    WS_DEFLATE_MIN_SIZE   小于该字节数的消息不压缩（默认 512）
+    WS_DEFLATE_LEVEL      zlib 压缩级别 1-9（默认 6）
+    WS_DEFLATE_WINDOW_BITS 压缩窗口大小 9-15（默认 12，每个连接约占 8KB 内存）
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import os
+
+from uvicorn.protocols.websockets.websockets_sansio_impl import WebSocketsSansIOProtocol
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import Opcode
+
+DEFLATE_MIN_SIZE = int(os.environ.get("WS_DEFLATE_MIN_SIZE", 512))
+DEFLATE_LEVEL = int(os.environ.get("WS_DEFLATE_LEVEL", 6))
+DEFLATE_WINDOW_BITS = int(os.environ.get("WS_DEFLATE_WINDOW_BITS", 12))
+
+
+class SelectivePerMessageDeflate(PerMessageDeflate):
+    """只压缩大消息的 permessage-deflate 扩展"""
+
+    def __init__(self, *args, min_size: int = DEFLATE_MIN_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def encode(self, frame):
+        # 只处理完整的单帧消息；分片消息和控制帧交给父类
+        if frame.opcode in (Opcode.TEXT, Opcode.BINARY) and frame.fin and len(frame.data) < self.min_size:
+            return frame
+        return super().encode(frame)
+
+
+class SelectiveDeflateFactory(ServerPerMessageDeflateFactory):
+    """握手时创建 SelectivePerMessageDeflate 的扩展工厂"""
+
+    def __init__(self, min_size: int = DEFLATE_MIN_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, SelectivePerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            self.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+class DeflateWebSocketProtocol(WebSocketsSansIOProtocol):
+    """使用按大小压缩的 uvicorn WebSocket 协议类"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.config.ws_per_message_deflate:
+            self.conn.available_extensions = [
+                SelectiveDeflateFactory(
+                    min_size=DEFLATE_MIN_SIZE,
+                    server_max_window_bits=DEFLATE_WINDOW_BITS,
+                    client_max_window_bits=DEFLATE_WINDOW_BITS,
+                    compress_settings={"level": DEFLATE_LEVEL, "memLevel": 5},
+                )
+            ]
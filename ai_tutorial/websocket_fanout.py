@@ -0,0 +1,303 @@
+"""
+WebSocket 广播扇出引擎
+====================
+
+websocket_server.py 最初的广播方式是依次 await 每个客户端的 send_text，
+只要有一个客户端很慢（网络差、没有读数据），排在它后面的所有客户端都要等待。
+
+这里的做法是：
+- 每个连接有一个有界的发送队列，由该连接自己的写任务（writer task）负责发送
+- 广播时只需要把消息放进每个连接的队列（O(1)，不等待网络）
+- 队列满了说明客户端跟不上，按配置的策略处理：
+    drop_oldest  丢弃队列中最旧的消息（默认，适合聊天这类"最新消息更重要"的场景）
+    drop_newest  丢弃新消息
+    disconnect   直接断开这个慢客户端
+- 单次发送超过 send_timeout 秒的客户端也会被断开（防止连接卡死）
+- 广播的消息可以是 EncodedMessage（websocket_codec.py），写任务按连接协商的
+  编码方式（JSON 文本 / 二进制）取出缓存好的编码结果，所有连接共享同一份编码
+- Coalescer：可选的合并发送，一个时间片（例如 20ms）内发往同一聊天室的消息
+  合并成一帧，每个客户端每个时间片最多收到一帧
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+from websocket_codec import PROTOCOL_JSON, EncodedBatch, EncodedMessage
+
+# 慢客户端处理策略
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_NEWEST = "drop_newest"
+POLICY_DISCONNECT = "disconnect"
+SLOW_CLIENT_POLICIES = (POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_DISCONNECT)
+
+
+class ClientConnection:
+    """
+    一个 WebSocket 客户端连接
+    封装了发送队列和负责发送的写任务
+    """
+
+    def __init__(
+        self,
+        websocket: Any,
+        client_id: str,
+        max_queue: int = 256,
+        policy: str = POLICY_DROP_OLDEST,
+        send_timeout: float = 10.0,
+        on_close: Optional[Callable[["ClientConnection"], None]] = None,
+        protocol: str = PROTOCOL_JSON
+    ):
+        """
+        初始化客户端连接
+
+        Args:
+            websocket: WebSocket 对象（需要有 send_text / close 方法）
+            client_id: 客户端标识
+            max_queue: 发送队列最大长度
+            policy: 队列满时的处理策略
+            send_timeout: 单次发送的超时时间（秒）
+            on_close: 连接被关闭时的回调（例如从连接列表中移除）
+            protocol: 连接使用的编码方式（json / binary）
+        """
+        if policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"未知的慢客户端策略: {policy}")
+
+        self.websocket = websocket
+        self.client_id = client_id
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_close = on_close
+        self.protocol = protocol
+
+        self._queue: Deque[Any] = deque()
+        self._wakeup = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+        self._timed_out = False
+        self.is_closed = False
+        self.close_reason = ""
+
+        # 最后一次收到客户端数据的时间（由服务器更新，用于清理空闲连接）
+        self.last_activity = time.monotonic()
+
+        # 统计计数
+        self.sent = 0
+        self.dropped = 0
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        """启动写任务"""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer())
+
+    def enqueue(self, payload: Any) -> bool:
+        """
+        把消息放入发送队列（不等待网络，O(1)）
+
+        Args:
+            payload: 要发送的内容
+
+        Returns:
+            bool: 消息是否进入了队列
+        """
+        if self.is_closed:
+            return False
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy == POLICY_DROP_NEWEST:
+                self.dropped += 1
+                return False
+            if self.policy == POLICY_DISCONNECT:
+                self.close("发送队列已满")
+                return False
+            # drop_oldest：丢掉最旧的一条，给新消息腾位置
+            self._queue.popleft()
+            self.dropped += 1
+
+        self._queue.append(payload)
+        self._wakeup.set()
+        return True
+
+    async def _send(self, payload: Any):
+        """发送一条消息：EncodedMessage/EncodedBatch 按连接的编码方式取缓存结果，bytes 用二进制帧发送"""
+        if isinstance(payload, (EncodedMessage, EncodedBatch)):
+            payload = payload.encoded(self.protocol)
+        if isinstance(payload, bytes):
+            await self.websocket.send_bytes(payload)
+        else:
+            await self.websocket.send_text(payload)
+
+    async def _writer(self):
+        """写任务：不断从队列取出消息并发送"""
+        loop = asyncio.get_running_loop()
+        try:
+            while not self.is_closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                payload = self._queue.popleft()
+
+                # 用 call_later 实现发送超时，比每次 wait_for 创建新任务开销小得多
+                timer = loop.call_later(self.send_timeout, self._on_send_timeout)
+                try:
+                    await self._send(payload)
+                finally:
+                    timer.cancel()
+                self.sent += 1
+
+        except asyncio.CancelledError:
+            if self._timed_out:
+                self.close("发送超时")
+        except Exception as e:
+            self.close(f"发送失败: {e}")
+
+    def _on_send_timeout(self):
+        """发送超时：取消写任务（由 _writer 捕获后关闭连接）"""
+        self._timed_out = True
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+
+    def close(self, reason: str = ""):
+        """关闭连接：停止写任务，丢弃未发送的消息，并在后台关闭 WebSocket"""
+        if self.is_closed:
+            return
+
+        self.is_closed = True
+        self.close_reason = reason
+        self._queue.clear()
+        self._wakeup.set()
+
+        current = asyncio.current_task()
+        if self._writer_task is not None and self._writer_task is not current:
+            self._writer_task.cancel()
+
+        if self.on_close is not None:
+            self.on_close(self)
+
+        # 慢客户端可能连 close 都发不出去，放到后台执行，不阻塞调用方
+        if reason:
+            asyncio.create_task(self._close_websocket())
+
+    async def _close_websocket(self):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=1008), self.send_timeout)
+        except Exception:
+            pass
+
+
+class FanoutEngine:
+    """
+    广播扇出引擎
+    管理所有客户端连接，广播时把消息放入每个连接的发送队列
+    """
+
+    def __init__(self, max_queue: int = 256, policy: str = POLICY_DROP_OLDEST, send_timeout: float = 10.0):
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+
+        self.broadcasts = 0
+        self.disconnected_slow = 0
+
+    def create_connection(
+        self,
+        websocket: Any,
+        client_id: str,
+        on_close: Optional[Callable[[ClientConnection], None]] = None,
+        protocol: str = PROTOCOL_JSON
+    ) -> ClientConnection:
+        """按引擎配置创建客户端连接并启动写任务"""
+        def handle_close(connection: ClientConnection):
+            # 有关闭原因说明是服务器主动断开的慢客户端
+            if connection.close_reason:
+                self.disconnected_slow += 1
+            if on_close is not None:
+                on_close(connection)
+
+        connection = ClientConnection(
+            websocket,
+            client_id,
+            max_queue=self.max_queue,
+            policy=self.policy,
+            send_timeout=self.send_timeout,
+            on_close=handle_close,
+            protocol=protocol
+        )
+        connection.start()
+        return connection
+
+    def broadcast(self, connections, payload: Any) -> int:
+        """
+        向一组连接广播消息
+
+        Args:
+            connections: 客户端连接的可迭代对象
+            payload: 已经编码好的消息，或 EncodedMessage（各连接共享同一份编码缓存）
+
+        Returns:
+            int: 成功进入队列的连接数
+        """
+        self.broadcasts += 1
+        delivered = 0
+        # 入队可能触发慢客户端断开（从集合中移除），所以先复制一份
+        for connection in list(connections):
+            if connection.enqueue(payload):
+                delivered += 1
+        return delivered
+
+
+class Coalescer:
+    """
+    按时间片合并广播
+    同一个 key（聊天室）在 tick 秒内的消息攒在一起，时间片结束时一次性交给 flush：
+    只有一条时原样交出，多条时合并为 EncodedBatch
+    """
+
+    def __init__(self, tick: float, flush: Callable[[Hashable, Any], None]):
+        self.tick = tick
+        self.flush = flush
+        self._pending: Dict[Hashable, List[EncodedMessage]] = {}
+
+        # 统计计数
+        self.messages = 0  # 进入合并的消息数
+        self.frames = 0  # 合并后交出的帧数
+
+    def add(self, key: Hashable, message: EncodedMessage):
+        """加入一条消息，时间片内的第一条消息负责安排 flush"""
+        self.messages += 1
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = [message]
+            asyncio.get_running_loop().call_later(self.tick, self._flush, key)
+        else:
+            pending.append(message)
+
+    def _flush(self, key: Hashable):
+        messages = self._pending.pop(key, None)
+        if not messages:
+            return
+        self.frames += 1
+        self.flush(key, messages[0] if len(messages) == 1 else EncodedBatch(messages))
+
+    @property
+    def pending(self) -> int:
+        return sum(len(messages) for messages in self._pending.values())
+
+    def stats(self) -> Dict:
+        return {
+            "tick_ms": round(self.tick * 1000, 3),
+            "messages": self.messages,
+            "frames": self.frames,
+            "pending_messages": self.pending,
+            "avg_batch_size": round(self.messages / self.frames, 2) if self.frames else 0.0,
+        }
@@ -0,0 +1,97 @@
+"""
+WebSocket 限流
+============
+
+防止一个失控的客户端（或脚本）刷屏，拖慢整个聊天室：
+- TokenBucket：令牌桶，每秒补充 rate 个令牌，最多攒 burst 个，
+  每条消息消耗一个令牌，没有令牌的消息被丢弃
+- KeyedRateLimiter：按来源 IP 等键各自一个令牌桶，桶的数量翻倍时顺便清理空闲的桶
+
+服务器只有一个事件循环线程，这里所有操作都是普通的计算和字典操作，不需要加锁。
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import time
+from typing import Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """令牌桶"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶的容量（允许的突发消息数）
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def consume(self, now: Optional[float] = None) -> bool:
+        """消耗一个令牌，没有令牌时返回 False"""
+        if now is None:
+            now = time.monotonic()
+        # 按经过的时间补充令牌（不需要后台定时任务）
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def is_full(self, now: float) -> bool:
+        """桶是否已经补满（补满的桶和新建的桶没有区别，可以删除）"""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class KeyedRateLimiter:
+    """按键（例如来源 IP）限流，每个键一个令牌桶"""
+
+    def __init__(self, rate: float, burst: float, prune_threshold: int = 1024):
+        """
+        Args:
+            rate: 每个键每秒补充的令牌数
+            burst: 每个键的桶容量
+            prune_threshold: 桶数达到该值时清理一次空闲的桶；之后阈值调整为清理后剩余数量的两倍，
+                保证清理的总开销和请求数成正比，不依赖后台任务也不会无限增长
+        """
+        self.rate = rate
+        self.burst = burst
+        self.prune_threshold = prune_threshold
+        self._next_prune = prune_threshold
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+        self.allowed = 0
+        self.rejected = 0
+
+    def consume(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """为 key 消耗一个令牌"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._next_prune:
+                self.prune(now)
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        if bucket.consume(now):
+            self.allowed += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """删除已经补满的桶，返回删除的数量"""
+        if now is None:
+            now = time.monotonic()
+        idle = [key for key, bucket in self._buckets.items() if bucket.is_full(now)]
+        for key in idle:
+            del self._buckets[key]
+        self._next_prune = max(self.prune_threshold, 2 * len(self._buckets))
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
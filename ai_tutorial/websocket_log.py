@@ -0,0 +1,268 @@
+"""
+聊天消息持久化日志
+================
+
+聊天消息按顺序追加到磁盘上的日志文件，每条消息有一个单调递增的序号（seq）。
+断线重连的客户端带上它最后收到的序号，服务器只把它错过的消息补发给它。
+
+文件布局（目录下两个文件）：
+    messages.log  数据文件，只追加，每条记录：
+                      4 字节  记录长度（不含这 4 个字节）
+                      8 字节  序号
+                      2 字节  聊天室名长度 + UTF-8 聊天室名
+                      其余    消息的 JSON 文本（UTF-8）
+    messages.idx  稀疏索引，每 INDEX_INTERVAL 条记录写一项：
+                      8 字节序号 + 8 字节该记录在数据文件中的偏移
+
+读取时用 mmap 映射数据文件和索引：先在索引里二分查找起点，再顺序扫描，
+按批返回，不需要把整个历史读进内存。服务器重启后从文件恢复最后的序号，
+并截掉崩溃时可能写了一半的记录。
+
+文件增长后重新映射时不关闭旧的映射：正在读取的生成器（补发时跨 await 持有）
+继续使用旧映射，最后一个引用释放时自动解除映射。
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import mmap
+import os
+import struct
+from typing import Iterator, List, Optional, Set, Tuple
+
+DATA_FILE = "messages.log"
+INDEX_FILE = "messages.idx"
+
+# 每隔多少条记录写一个索引项
+INDEX_INTERVAL = 64
+
+_LENGTH = struct.Struct(">I")
+_RECORD_HEAD = struct.Struct(">QH")  # 序号 + 聊天室名长度
+_INDEX_ENTRY = struct.Struct(">QQ")  # 序号 + 偏移
+
+
+class MessageLog:
+    """只追加的消息日志"""
+
+    def __init__(self, directory: str, fsync: bool = False):
+        """
+        打开（或创建）日志
+
+        Args:
+            directory: 日志目录
+            fsync: 每次追加后是否 fsync（更安全，但每条消息都要等磁盘）
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync = fsync
+        self.data_path = os.path.join(directory, DATA_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+
+        self._data_fd = os.open(self.data_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._index_fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._data_map: Optional[mmap.mmap] = None
+        self._index_map: Optional[mmap.mmap] = None
+
+        self.size = 0  # 数据文件中有效数据的长度
+        self.first_seq = 0  # 日志中最早的序号（空日志为 0）
+        self.last_seq = 0  # 日志中最新的序号（空日志为 0）
+        self._records_since_index = 0
+
+        self._recover()
+
+    # ---------- 打开时恢复 ----------
+
+    def _recover(self):
+        """从索引的最后一项开始扫描数据文件，恢复 last_seq 并截掉不完整的记录"""
+        data_size = os.fstat(self._data_fd).st_size
+        index_size = os.fstat(self._index_fd).st_size
+        entries = index_size // _INDEX_ENTRY.size
+
+        # 丢掉指向数据文件之外的索引项（崩溃时数据没写完）
+        index = self._map_index()
+        while entries and _INDEX_ENTRY.unpack_from(index, (entries - 1) * _INDEX_ENTRY.size)[1] >= data_size:
+            entries -= 1
+        if entries * _INDEX_ENTRY.size != index_size:
+            self._close_maps()
+            os.ftruncate(self._index_fd, entries * _INDEX_ENTRY.size)
+
+        offset = 0
+        if entries:
+            index = self._map_index()
+            self.first_seq = _INDEX_ENTRY.unpack_from(index, 0)[0]
+            offset = _INDEX_ENTRY.unpack_from(index, (entries - 1) * _INDEX_ENTRY.size)[1]
+            # 最后一个索引项指向的记录会在下面被再扫描一次，扫描到它时计数归零
+            self._records_since_index = -1
+        else:
+            # 没有索引（新日志，或者索引文件丢失）：扫描时从第一条记录开始重建
+            self._records_since_index = INDEX_INTERVAL - 1
+
+        data = self._map_data(data_size)
+        while offset + _LENGTH.size <= data_size:
+            (length,) = _LENGTH.unpack_from(data, offset)
+            end = offset + _LENGTH.size + length
+            if length < _RECORD_HEAD.size or end > data_size:
+                break
+            seq, _ = _RECORD_HEAD.unpack_from(data, offset + _LENGTH.size)
+            if not self.first_seq:
+                self.first_seq = seq
+            self.last_seq = seq
+            self._count_record(seq, offset)
+            offset = end
+
+        if offset != data_size:
+            # 最后一条记录不完整：截掉
+            self._close_maps()
+            os.ftruncate(self._data_fd, offset)
+        self.size = offset
+
+    def _count_record(self, seq: int, offset: int):
+        """每 INDEX_INTERVAL 条记录写一个索引项"""
+        self._records_since_index += 1
+        if self._records_since_index >= INDEX_INTERVAL:
+            os.write(self._index_fd, _INDEX_ENTRY.pack(seq, offset))
+            self._records_since_index = 0
+
+    # ---------- mmap ----------
+
+    def _map_data(self, size: int) -> Optional[mmap.mmap]:
+        """映射数据文件的前 size 字节（文件增长后重新映射，旧映射可能还有读取者在用，不在这里关闭）"""
+        if size == 0:
+            return None
+        if self._data_map is None or len(self._data_map) < size:
+            self._data_map = mmap.mmap(self._data_fd, 0, access=mmap.ACCESS_READ)
+        return self._data_map
+
+    def _map_index(self) -> Optional[mmap.mmap]:
+        size = os.fstat(self._index_fd).st_size
+        if size == 0:
+            return None
+        if self._index_map is None or len(self._index_map) < size:
+            self._index_map = mmap.mmap(self._index_fd, 0, access=mmap.ACCESS_READ)
+        return self._index_map
+
+    def _close_maps(self):
+        for mapped in (self._data_map, self._index_map):
+            if mapped is not None:
+                mapped.close()
+        self._data_map = None
+        self._index_map = None
+
+    # ---------- 写入 ----------
+
+    @property
+    def next_seq(self) -> int:
+        """下一条消息将使用的序号"""
+        return self.last_seq + 1
+
+    def append(self, room: str, text: str) -> int:
+        """
+        追加一条消息
+
+        Args:
+            room: 聊天室名
+            text: 消息的 JSON 文本（应已包含 seq 字段，值为 next_seq）
+
+        Returns:
+            int: 这条消息的序号
+        """
+        seq = self.next_seq
+        room_bytes = room.encode("utf-8")
+        body = _RECORD_HEAD.pack(seq, len(room_bytes)) + room_bytes + text.encode("utf-8")
+        offset = self.size
+        os.write(self._data_fd, _LENGTH.pack(len(body)) + body)
+
+        self._count_record(seq, offset)
+
+        if self.fsync:
+            os.fsync(self._data_fd)
+
+        self.size = offset + _LENGTH.size + len(body)
+        self.last_seq = seq
+        if not self.first_seq:
+            self.first_seq = seq
+        return seq
+
+    # ---------- 读取 ----------
+
+    def _find_offset(self, seq: int) -> int:
+        """在索引中二分查找：返回序号不大于 seq 的最后一个索引项的偏移"""
+        index = self._map_index()
+        if index is None:
+            return 0
+        low, high = 0, len(index) // _INDEX_ENTRY.size - 1
+        result = 0
+        while low <= high:
+            middle = (low + high) // 2
+            entry_seq, entry_offset = _INDEX_ENTRY.unpack_from(index, middle * _INDEX_ENTRY.size)
+            if entry_seq <= seq:
+                result = entry_offset
+                low = middle + 1
+            else:
+                high = middle - 1
+        return result
+
+    def read_after(
+        self,
+        after_seq: int,
+        rooms: Optional[Set[str]] = None,
+        batch_size: int = 100,
+        limit: Optional[int] = None
+    ) -> Iterator[List[Tuple[int, str, str]]]:
+        """
+        按批读取序号大于 after_seq 的消息
+
+        Args:
+            after_seq: 客户端最后收到的序号
+            rooms: 只返回这些聊天室的消息（None 表示全部）
+            batch_size: 每批的消息数
+            limit: 最多返回的消息数
+
+        Yields:
+            List[Tuple[int, str, str]]: 一批 (序号, 聊天室, JSON 文本)
+        """
+        end = self.size
+        data = self._map_data(end)
+        if data is None or after_seq >= self.last_seq:
+            return
+
+        offset = self._find_offset(after_seq + 1)
+        batch = []
+        returned = 0
+        while offset < end:
+            (length,) = _LENGTH.unpack_from(data, offset)
+            start = offset + _LENGTH.size
+            seq, room_length = _RECORD_HEAD.unpack_from(data, start)
+            offset = start + length
+
+            if seq <= after_seq:
+                continue
+            room_start = start + _RECORD_HEAD.size
+            room = data[room_start:room_start + room_length].decode("utf-8")
+            if rooms is not None and room not in rooms:
+                continue
+
+            batch.append((seq, room, data[room_start + room_length:offset].decode("utf-8")))
+            returned += 1
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+            if limit is not None and returned >= limit:
+                break
+
+        if batch:
+            yield batch
+
+    def stats(self) -> dict:
+        return {
+            "path": self.directory,
+            "first_seq": self.first_seq,
+            "last_seq": self.last_seq,
+            "data_bytes": self.size,
+            "index_entries": os.fstat(self._index_fd).st_size // _INDEX_ENTRY.size,
+        }
+
+    def close(self):
+        self._close_maps()
+        os.close(self._data_fd)
+        os.close(self._index_fd)
@@ -0,0 +1,143 @@
+"""
+WebSocket 连接注册表与历史记录环形缓冲区
+======================================
+
+- ConnectionRegistry：用字典按唯一 ID 保存连接，加入/离开都是 O(1)，
+  ID 由递增计数器生成，断开后也不会重复
+- HistoryRing：固定容量的环形缓冲区，追加新消息时覆盖最旧的一条，
+  不需要像 list.pop(0) 那样移动整个列表
+- RateCounter：最近 60 秒的滑动计数，用于统计加入/离开频率和广播吞吐量
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import itertools
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class RateCounter:
+    """
+    最近 window 秒内的事件计数
+    按秒分桶（环形数组），记录 O(1)、查询 O(window)，内存固定
+    """
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self._counts = [0] * window
+        self._seconds = [-window] * window
+        self.total = 0
+
+    def add(self, n: int = 1):
+        """记录 n 次事件"""
+        now = int(time.monotonic())
+        index = now % self.window
+        if self._seconds[index] != now:
+            # 这个桶属于更早的一轮，重新开始计数
+            self._seconds[index] = now
+            self._counts[index] = 0
+        self._counts[index] += n
+        self.total += n
+
+    def count(self) -> int:
+        """最近 window 秒内的事件数"""
+        now = int(time.monotonic())
+        return sum(
+            count for count, second in zip(self._counts, self._seconds)
+            if now - second < self.window
+        )
+
+    def per_second(self) -> float:
+        """最近 window 秒的平均每秒事件数"""
+        return round(self.count() / self.window, 3)
+
+
+class HistoryRing:
+    """固定容量的环形缓冲区（保存最近的聊天记录）"""
+
+    def __init__(self, capacity: int = 100):
+        """
+        Args:
+            capacity: 最多保存的条数，0 表示不保存历史记录
+        """
+        if capacity < 0:
+            raise ValueError(f"历史记录容量不能小于 0: {capacity}")
+        self.capacity = capacity
+        self._items: List[Any] = [None] * capacity
+        self._next = 0  # 下一条写入的位置
+        self._size = 0
+
+    def append(self, item: Any):
+        """追加一条记录，满了则覆盖最旧的一条（O(1)）"""
+        if not self.capacity:
+            return
+        self._items[self._next] = item
+        self._next = (self._next + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def latest(self, n: int) -> List[Any]:
+        """按时间顺序返回最近的 n 条记录"""
+        n = min(n, self._size)
+        start = self._next - n
+        return [self._items[(start + i) % self.capacity] for i in range(n)]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.latest(self._size))
+
+
+class ConnectionRegistry:
+    """按唯一 ID 管理所有连接"""
+
+    def __init__(self):
+        self._connections: Dict[str, Any] = {}
+        self._ids = itertools.count(1)
+
+        # 连接变化统计
+        self.joins = RateCounter()
+        self.leaves = RateCounter()
+        self.peak_connections = 0
+
+    def next_id(self, prefix: str = "用户_") -> str:
+        """生成一个不会重复的客户端 ID"""
+        return f"{prefix}{next(self._ids)}"
+
+    def add(self, client_id: str, connection: Any):
+        """登记一个连接（O(1)）"""
+        self._connections[client_id] = connection
+        self.joins.add()
+        self.peak_connections = max(self.peak_connections, len(self._connections))
+
+    def remove(self, client_id: str) -> Optional[Any]:
+        """移除一个连接（O(1)），不存在时返回 None"""
+        connection = self._connections.pop(client_id, None)
+        if connection is not None:
+            self.leaves.add()
+        return connection
+
+    def get(self, client_id: str) -> Optional[Any]:
+        return self._connections.get(client_id)
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self._connections
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._connections.values())
+
+    def stats(self) -> Dict:
+        """连接变化统计"""
+        return {
+            "connected": len(self._connections),
+            "peak_connections": self.peak_connections,
+            "total_joins": self.joins.total,
+            "total_leaves": self.leaves.total,
+            "joins_last_minute": self.joins.count(),
+            "leaves_last_minute": self.leaves.count(),
+        }
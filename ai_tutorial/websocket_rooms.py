@@ -0,0 +1,169 @@
+"""
+WebSocket 聊天室（频道）
+=====================
+
+一个进程里可以同时有很多互不相关的聊天室：
+- 每个聊天室有自己的成员表和历史记录环形缓冲区
+- 广播只发给目标聊天室的成员，其他连接完全不受影响
+- 一个连接可以同时加入多个聊天室
+- 最后一个成员离开后聊天室的成员表被删除，历史记录保留下来，之后有人再加入时继续回放：
+  默认聊天室的历史一直保留，其他空聊天室的历史按最近使用保留 max_idle_histories 个
+- 聊天室创建/删除时可以通知外部（多进程部署时用来订阅/取消订阅背板）
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from websocket_registry import HistoryRing, RateCounter
+
+DEFAULT_ROOM = "lobby"
+
+# 聊天室名：字母、数字、中文、下划线和连字符，最长 64 个字符
+ROOM_NAME_PATTERN = re.compile(r"^[\w\-]{1,64}$")
+
+
+def is_valid_room_name(name: str) -> bool:
+    """检查聊天室名是否合法"""
+    return bool(ROOM_NAME_PATTERN.match(name or ""))
+
+
+class Room:
+    """一个聊天室：成员表 + 历史记录"""
+
+    def __init__(self, name: str, history_size: int = 100, history: Optional[HistoryRing] = None):
+        self.name = name
+        self.members: Dict[str, Any] = {}  # client_id -> 连接
+        self.history = history if history is not None else HistoryRing(history_size)
+        self.messages = RateCounter()
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.members.values())
+
+    def stats(self) -> Dict:
+        return {
+            "members": len(self.members),
+            "history_size": len(self.history),
+            "total_messages": self.messages.total,
+            "messages_per_second": self.messages.per_second(),
+        }
+
+
+class RoomManager:
+    """管理所有聊天室以及每个连接加入了哪些聊天室"""
+
+    def __init__(
+        self,
+        history_size: int = 100,
+        max_rooms_per_client: int = 16,
+        on_room_created: Optional[Callable[[str], None]] = None,
+        on_room_removed: Optional[Callable[[str], None]] = None,
+        max_idle_histories: int = 1024
+    ):
+        """
+        Args:
+            history_size: 每个聊天室保存的历史消息条数（0 表示不保存）
+            max_rooms_per_client: 每个连接最多同时加入的聊天室数
+            on_room_created: 本进程第一个成员加入聊天室时的回调
+            on_room_removed: 本进程最后一个成员离开聊天室时的回调
+            max_idle_histories: 最多保留多少个空聊天室的历史记录（默认聊天室不计入，一直保留）
+        """
+        self.history_size = history_size
+        self.max_rooms_per_client = max_rooms_per_client
+        self.on_room_created = on_room_created
+        self.on_room_removed = on_room_removed
+        self.max_idle_histories = max_idle_histories
+        self._rooms: Dict[str, Room] = {}
+        # 空聊天室留下的历史记录（按最近离开的顺序），聊天室重新创建时接着用
+        self._idle_histories: "OrderedDict[str, HistoryRing]" = OrderedDict()
+        self._memberships: Dict[str, Set[str]] = {}  # client_id -> 聊天室名集合
+
+    def get(self, name: str) -> Optional[Room]:
+        """获取聊天室，不存在时返回 None"""
+        return self._rooms.get(name)
+
+    def join(self, name: str, client_id: str, connection: Any) -> Room:
+        """
+        让连接加入聊天室（聊天室不存在时自动创建）
+
+        Raises:
+            ValueError: 聊天室名不合法或加入的聊天室太多
+        """
+        if not is_valid_room_name(name):
+            raise ValueError(f"聊天室名不合法: {name}")
+
+        rooms = self._memberships.get(client_id, set())
+        if name not in rooms and len(rooms) >= self.max_rooms_per_client:
+            raise ValueError(f"最多只能同时加入 {self.max_rooms_per_client} 个聊天室")
+
+        room = self._rooms.get(name)
+        if room is None:
+            room = self._rooms[name] = Room(name, self.history_size, self._idle_histories.pop(name, None))
+            if self.on_room_created is not None:
+                self.on_room_created(name)
+        room.members[client_id] = connection
+        rooms.add(name)
+        self._memberships[client_id] = rooms
+        return room
+
+    def leave(self, name: str, client_id: str) -> bool:
+        """让连接离开聊天室，返回之前是否在该聊天室中"""
+        room = self._rooms.get(name)
+        if room is None or room.members.pop(client_id, None) is None:
+            return False
+
+        rooms = self._memberships.get(client_id)
+        if rooms is not None:
+            rooms.discard(name)
+            if not rooms:
+                del self._memberships[client_id]
+
+        if not room.members:
+            del self._rooms[name]
+            self._keep_history(name, room.history)
+            if self.on_room_removed is not None:
+                self.on_room_removed(name)
+        return True
+
+    def _keep_history(self, name: str, history: HistoryRing):
+        """保留空聊天室的历史记录，超出数量时丢弃最久没用过的（默认聊天室除外）"""
+        if not len(history):
+            return
+        self._idle_histories[name] = history
+        excess = len(self._idle_histories) - self.max_idle_histories - (DEFAULT_ROOM in self._idle_histories)
+        for old in list(self._idle_histories):
+            if excess <= 0:
+                break
+            if old != DEFAULT_ROOM:
+                del self._idle_histories[old]
+                excess -= 1
+
+    def leave_all(self, client_id: str) -> List[str]:
+        """连接断开时离开所有聊天室，返回离开的聊天室名"""
+        names = sorted(self._memberships.get(client_id, ()))
+        for name in names:
+            self.leave(name, client_id)
+        return names
+
+    def rooms_of(self, client_id: str) -> Set[str]:
+        """连接当前加入的聊天室"""
+        return set(self._memberships.get(client_id, ()))
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rooms
+
+    def __iter__(self) -> Iterator[Room]:
+        return iter(self._rooms.values())
+
+    def stats(self) -> Dict:
+        """每个聊天室的统计信息"""
+        return {name: room.stats() for name, room in self._rooms.items()}
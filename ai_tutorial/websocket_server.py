@@ -13,21 +13,146 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
 import uvicorn
 import asyncio
-from typing import List, Dict
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 import json
 from datetime import datetime
 
+from websocket_backplane import BackplaneBroker, LocalBackplane, create_backplane
+from websocket_codec import (
+    PROTOCOL_BINARY, EncodedBatch, EncodedMessage, choose_protocol, decode_binary_frames, protocol_of
+)
+from websocket_fanout import ClientConnection, Coalescer, FanoutEngine
+from websocket_limits import KeyedRateLimiter, TokenBucket
+from websocket_log import MessageLog
+from websocket_registry import ConnectionRegistry, RateCounter
+from websocket_rooms import DEFAULT_ROOM, RoomManager, is_valid_room_name
+
 # 创建 FastAPI 应用实例
 app = FastAPI(
     title="WebSocket 服务器教程",
     description="学习 WebSocket 服务器的基本用法"
 )
 
-# 存储所有连接的 WebSocket 客户端
-connected_clients: List[WebSocket] = []
+@dataclass
+class ServerConfig:
+    """服务器配置（可以通过环境变量修改）"""
+    send_queue_size: int = 256  # 每个客户端发送队列的最大长度
+    slow_client_policy: str = "drop_oldest"  # 队列满时的策略: drop_oldest / drop_newest / disconnect
+    send_timeout: float = 10.0  # 单次发送超时（秒），超时的客户端会被断开
+    history_size: int = 100  # 每个聊天室保存的聊天记录条数
+    history_replay: int = 10  # 新用户加入时发送的历史消息条数
+    binary_protocol: bool = True  # 是否允许客户端通过子协议 chat.bin.v1 使用二进制编码
+    max_rooms_per_client: int = 16  # 每个连接最多同时加入的聊天室数
+    backplane: str = ""  # 多进程背板地址（unix:/路径 或 tcp:主机:端口），空表示单进程
+    coalesce_ms: float = 0.0  # 合并发送的时间片（毫秒），0 表示每条消息单独发送
+    max_connections: int = 10000  # 最大连接数，超过时直接拒绝握手
+    message_rate: float = 10.0  # 每个连接每秒允许的消息数（令牌桶补充速率），0 表示不限制
+    message_burst: int = 20  # 每个连接允许的突发消息数（令牌桶容量）
+    ip_message_rate: float = 50.0  # 同一来源 IP 的所有连接每秒允许的消息数，0 表示不限制
+    ip_message_burst: int = 100  # 同一来源 IP 允许的突发消息数
+    rate_limit_disconnect_after: int = 100  # 连续被限流的消息数达到该值时断开连接，0 表示不断开
+    idle_timeout: float = 300.0  # 超过该秒数没有收到任何数据的连接会被断开，0 表示不检查
+    message_log: str = "chat_log"  # 聊天消息持久化日志的目录，空表示不持久化
+    message_log_fsync: bool = False  # 每条消息写入日志后是否 fsync
+    resume_batch_size: int = 100  # 断线重连补发消息时每帧的消息数
+
+    @classmethod
+    def from_env(cls) -> "ServerConfig":
+        """从环境变量读取配置，未设置的使用默认值"""
+        return cls(
+            send_queue_size=int(os.environ.get("WS_SEND_QUEUE_SIZE", cls.send_queue_size)),
+            slow_client_policy=os.environ.get("WS_SLOW_CLIENT_POLICY", cls.slow_client_policy),
+            send_timeout=float(os.environ.get("WS_SEND_TIMEOUT", cls.send_timeout)),
+            history_size=int(os.environ.get("WS_HISTORY_SIZE", cls.history_size)),
+            history_replay=int(os.environ.get("WS_HISTORY_REPLAY", cls.history_replay)),
+            binary_protocol=os.environ.get("WS_BINARY_PROTOCOL", "1") != "0",
+            max_rooms_per_client=int(os.environ.get("WS_MAX_ROOMS_PER_CLIENT", cls.max_rooms_per_client)),
+            backplane=os.environ.get("WS_BACKPLANE", cls.backplane),
+            coalesce_ms=float(os.environ.get("WS_COALESCE_MS", cls.coalesce_ms)),
+            max_connections=int(os.environ.get("WS_MAX_CONNECTIONS", cls.max_connections)),
+            message_rate=float(os.environ.get("WS_MESSAGE_RATE", cls.message_rate)),
+            message_burst=int(os.environ.get("WS_MESSAGE_BURST", cls.message_burst)),
+            ip_message_rate=float(os.environ.get("WS_IP_MESSAGE_RATE", cls.ip_message_rate)),
+            ip_message_burst=int(os.environ.get("WS_IP_MESSAGE_BURST", cls.ip_message_burst)),
+            rate_limit_disconnect_after=int(
+                os.environ.get("WS_RATE_LIMIT_DISCONNECT_AFTER", cls.rate_limit_disconnect_after)
+            ),
+            idle_timeout=float(os.environ.get("WS_IDLE_TIMEOUT", cls.idle_timeout)),
+            message_log=os.environ.get("WS_MESSAGE_LOG", cls.message_log),
+            message_log_fsync=os.environ.get("WS_MESSAGE_LOG_FSYNC", "0") == "1",
+            resume_batch_size=int(os.environ.get("WS_RESUME_BATCH_SIZE", cls.resume_batch_size)),
+        )
+
+config = ServerConfig.from_env()
+
+# 广播扇出引擎：每个客户端有自己的发送队列和写任务，广播只需入队
+fanout = FanoutEngine(
+    max_queue=config.send_queue_size,
+    policy=config.slow_client_policy,
+    send_timeout=config.send_timeout
+)
 
-# 存储聊天历史记录
-chat_history: List[Dict] = []
+# 存储所有连接的 WebSocket 客户端（按唯一 ID 索引，加入/离开都是 O(1)）
+connected_clients = ConnectionRegistry()
+
+# 多进程背板：把本进程产生的消息转发给其他工作进程（单进程时什么都不做）
+backplane = create_backplane(config.backplane)
+
+# 聊天室：每个聊天室有自己的成员表和历史记录（固定容量的环形缓冲区）
+# 历史记录保存的是 EncodedMessage，回放历史时直接复用已经编码好的内容
+# 本进程有成员的聊天室才订阅背板
+rooms = RoomManager(
+    history_size=config.history_size,
+    max_rooms_per_client=config.max_rooms_per_client,
+    on_room_created=backplane.subscribe,
+    on_room_removed=backplane.unsubscribe
+)
+
+# 聊天消息持久化日志：每条聊天消息带一个递增的序号，断线重连的客户端凭序号补齐错过的消息
+# 序号由本进程分配，多进程部署时各进程的序号会冲突，所以只在单进程时启用
+message_log = (
+    MessageLog(config.message_log, fsync=config.message_log_fsync)
+    if config.message_log and isinstance(backplane, LocalBackplane) else None
+)
+
+# 多进程时客户端 ID 带上进程号，避免不同工作进程生成相同的 ID
+CLIENT_ID_PREFIX = "用户_" if isinstance(backplane, LocalBackplane) else f"用户_{os.getpid()}_"
+
+# 广播吞吐量统计
+broadcast_counter = RateCounter()  # 广播的消息数
+delivery_counter = RateCounter()  # 放入客户端发送队列的帧数（合并发送时一帧可能包含多条消息）
+
+# 限流：每个来源 IP 一个令牌桶（每个连接自己的令牌桶在 websocket_chat 中创建）
+ip_limiter = KeyedRateLimiter(config.ip_message_rate, config.ip_message_burst)
+
+# 限流和连接保护的计数
+limit_counters = {
+    "rejected_connections": 0,  # 超过最大连接数被拒绝的握手
+    "rate_limited_messages": 0,  # 被限流丢弃的消息
+    "rate_limit_disconnects": 0,  # 持续超速被断开的连接
+    "idle_disconnects": 0,  # 空闲超时被断开的连接
+}
+
+# 断线重连补发的计数
+resume_counters = {
+    "resumes": 0,  # 带 last_seq 加入聊天室的次数
+    "replayed_messages": 0,  # 从日志补发的消息数
+}
+
+# 后台清理空闲连接的任务
+reaper_task: Optional[asyncio.Task] = None
+
+# 合并发送：同一聊天室在一个时间片内的消息合并成一帧（数组），减少帧数和系统调用
+coalescer = (
+    Coalescer(config.coalesce_ms / 1000, lambda room_name, payload: _send_to_room(room_name, payload))
+    if config.coalesce_ms > 0 else None
+)
 
 @app.get("/")
 async def root():
@@ -52,14 +177,27 @@ async def root():
     </head>
     <body>
         <h1>WebSocket 聊天室教程</h1>
+        <p>当前聊天室: <strong id="roomName"></strong>（在地址后加 ?room=名称 进入其他聊天室）</p>
         <div id="messages"></div>
         <input type="text" id="messageInput" placeholder="输入消息..." onkeypress="handleKeyPress(event)">
         <button onclick="sendMessage()">发送</button>
         <button onclick="clearMessages()">清空消息</button>
 
         <script>
+            // 从地址栏读取聊天室名，默认进入 lobby
+            const room = new URLSearchParams(window.location.search).get('room') || 'lobby';
+            document.getElementById('roomName').textContent = room;
+
+            // 记住收到的最后一条消息的序号，刷新页面后只补收错过的消息
+            const seqKey = 'lastSeq:' + room;
+            let lastSeq = localStorage.getItem(seqKey);
+
             // 创建 WebSocket 连接
-            const ws = new WebSocket('ws://localhost:8000/ws/chat');
+            let url = 'ws://localhost:8000/ws/chat/' + encodeURIComponent(room);
+            if (lastSeq) {
+                url += '?last_seq=' + lastSeq;
+            }
+            const ws = new WebSocket(url);
 
             // 连接成功时的处理
             ws.onopen = function(event) {
@@ -68,9 +206,16 @@ async def root():
             };
 
             // 接收消息时的处理
+            // 服务器开启合并发送时，一帧是消息数组
             ws.onmessage = function(event) {
                 const data = JSON.parse(event.data);
-                addMessage(data.username, data.message, data.timestamp);
+                const messages = Array.isArray(data) ? data : [data];
+                messages.forEach(function(item) {
+                    addMessage(item.username, item.message, item.timestamp);
+                    if (item.seq) {
+                        localStorage.setItem(seqKey, item.seq);
+                    }
+                });
             };
 
             // 连接关闭时的处理
@@ -127,111 +272,367 @@ async def root():
     return HTMLResponse(content=html_content)
 
 @app.websocket("/ws/chat")
-async def websocket_chat(websocket: WebSocket):
+@app.websocket("/ws/chat/{room}")
+async def websocket_chat(websocket: WebSocket, room: str = DEFAULT_ROOM):
     """
     WebSocket 聊天端点
     处理客户端的 WebSocket 连接和消息
+
+    连接时加入路径中的聊天室（/ws/chat 加入默认聊天室 lobby）。
+    之后可以发送控制消息加入/离开其他聊天室或向指定聊天室发言：
+        {"action": "join", "room": "python"}
+        {"action": "leave", "room": "python"}
+        {"action": "send", "room": "python", "message": "大家好"}
+    普通文本消息发到最近加入的聊天室。
+
+    断线重连时在地址后加上最后收到的序号（/ws/chat/python?last_seq=123），
+    或者在 join 消息中带上 "last_seq"，服务器会先补发错过的聊天消息。
     """
-    await websocket.accept()  # 接受 WebSocket 连接
+    if not is_valid_room_name(room):
+        # 聊天室名不合法，直接拒绝握手
+        await websocket.close(code=1008)
+        return
+
+    if len(connected_clients) >= config.max_connections:
+        # 连接数已满：在握手阶段直接拒绝，不分配任何资源
+        limit_counters["rejected_connections"] += 1
+        await websocket.close(code=1013)
+        return
+
+    # 协商编码方式：客户端请求了子协议 chat.bin.v1 就使用二进制编码，否则使用 JSON
+    subprotocol = choose_protocol(websocket.scope.get("subprotocols", [])) if config.binary_protocol else None
+    await websocket.accept(subprotocol=subprotocol)  # 接受 WebSocket 连接
 
     # 生成一个简单的用户名（在实际应用中应该使用用户认证）
-    client_id = f"用户_{len(connected_clients) + 1}"
+    # ID 由递增计数器生成，客户端断开后也不会出现重复
+    client_id = connected_clients.next_id(CLIENT_ID_PREFIX)
 
-    # 将新客户端添加到连接列表
-    connected_clients.append(websocket)
+    # 将新客户端添加到连接列表（连接关闭时自动移除）
+    connection = fanout.create_connection(
+        websocket, client_id, on_close=_remove_client, protocol=protocol_of(subprotocol)
+    )
+    connected_clients.add(client_id, connection)
 
-    try:
-        # 发送欢迎消息
-        welcome_message = {
-            "type": "system",
-            "username": "系统",
-            "message": f"{client_id} 加入了聊天室",
-            "timestamp": datetime.now().isoformat()
-        }
+    # 普通文本消息发往的聊天室
+    current_room = room
 
-        # 向所有客户端广播欢迎消息
-        await broadcast_message(welcome_message)
+    # 限流：本连接的令牌桶，以及来源 IP（同一 IP 的所有连接共享一个令牌桶）
+    bucket = TokenBucket(config.message_rate, config.message_burst) if config.message_rate > 0 else None
+    client_ip = websocket.client.host if websocket.client else "unknown"
+    limited_in_a_row = 0
 
-        # 发送聊天历史记录给新用户
-        for history_msg in chat_history[-10:]:  # 只发送最近10条消息
-            await websocket.send_text(json.dumps(history_msg))
+    try:
+        await join_room(room, connection, _parse_seq(websocket.query_params.get("last_seq")))
 
-        # 循环监听客户端发送的消息
+        # 循环监听客户端发送的消息（二进制客户端的一个批量帧可能包含多条消息）
+        pending = deque()
         while True:
             # 等待接收客户端发送的数据
-            data = await websocket.receive_text()
-
-            # 创建消息对象
-            message_data = {
-                "type": "chat",
-                "username": client_id,
-                "message": data,
-                "timestamp": datetime.now().isoformat()
-            }
-
-            # 将消息添加到历史记录
-            chat_history.append(message_data)
-
-            # 限制历史记录长度（避免内存占用过大）
-            if len(chat_history) > 100:
-                chat_history.pop(0)
-
-            # 向所有客户端广播消息
-            await broadcast_message(message_data)
+            if not pending:
+                pending.extend(await _receive_texts(websocket, connection))
+                if not pending:
+                    continue
+            data = pending.popleft()
+            now = time.monotonic()
+            connection.last_activity = now
+
+            if not _allow_message(bucket, client_ip, now):
+                # 超速的消息直接丢弃，只在开始超速时提示一次
+                limit_counters["rate_limited_messages"] += 1
+                limited_in_a_row += 1
+                if limited_in_a_row == 1:
+                    _send_error(connection, "发送太快，消息已被丢弃")
+                if config.rate_limit_disconnect_after and limited_in_a_row >= config.rate_limit_disconnect_after:
+                    limit_counters["rate_limit_disconnects"] += 1
+                    print(f"客户端 {client_id} 被断开: 发送太快")
+                    connection.close()
+                    await websocket.close(code=1008)
+                    break
+                continue
+            limited_in_a_row = 0
+
+            command = _parse_command(data)
+
+            if command is None:
+                # 普通聊天消息
+                await send_chat(current_room, client_id, data)
+                continue
+
+            action = command.get("action")
+            target = str(command.get("room", current_room))
+            try:
+                if action == "join":
+                    await join_room(target, connection, _parse_seq(command.get("last_seq")))
+                    current_room = target
+                elif action == "leave":
+                    await leave_room(target, client_id)
+                    if target == current_room:
+                        # 退回到还在的任意一个聊天室
+                        current_room = next(iter(sorted(rooms.rooms_of(client_id))), DEFAULT_ROOM)
+                elif action == "send":
+                    await send_chat(target, client_id, str(command.get("message", "")))
+                else:
+                    raise ValueError(f"未知的操作: {action}")
+            except ValueError as e:
+                _send_error(connection, str(e))
 
     except WebSocketDisconnect:
         # 处理客户端断开连接的情况
         print(f"客户端 {client_id} 断开连接")
 
-        # 从连接列表中移除客户端
-        if websocket in connected_clients:
-            connected_clients.remove(websocket)
-
-        # 发送离开消息
-        leave_message = {
-            "type": "system",
-            "username": "系统",
-            "message": f"{client_id} 离开了聊天室",
-            "timestamp": datetime.now().isoformat()
-        }
-
-        await broadcast_message(leave_message)
+        # 从连接列表和所有聊天室中移除客户端（_remove_client 会通知聊天室的其他成员）
+        connection.close()
 
     except Exception as e:
         # 处理其他异常
         print(f"WebSocket 错误: {e}")
 
         # 从连接列表中移除客户端
-        if websocket in connected_clients:
-            connected_clients.remove(websocket)
+        connection.close()
+
+async def _receive_texts(websocket: WebSocket, connection: ClientConnection) -> List[str]:
+    """
+    接收一帧客户端数据，返回其中的消息文本
+
+    JSON 协议只接收文本帧；二进制协议（chat.bin.v1）的客户端可以发文本帧，
+    也可以发二进制帧（单条或批量），二进制帧解码后取每条消息的 message 字段，按文本消息处理
+    """
+    if connection.protocol != PROTOCOL_BINARY:
+        return [await websocket.receive_text()]
+
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    if message.get("text") is not None:
+        return [message["text"]]
+    try:
+        return [str(item.get("message", "")) for item in decode_binary_frames(message.get("bytes") or b"")]
+    except (ValueError, struct.error, zlib.error) as e:
+        _send_error(connection, f"无法解码的二进制消息: {e}")
+        return []
+
+def _allow_message(bucket: Optional[TokenBucket], client_ip: str, now: float) -> bool:
+    """连接和来源 IP 的令牌桶都有令牌时才允许（事件循环单线程，不需要加锁）"""
+    if bucket is not None and not bucket.consume(now):
+        return False
+    if config.ip_message_rate > 0 and not ip_limiter.consume(client_ip, now):
+        return False
+    return True
+
+async def _reap_idle_connections():
+    """后台任务：定期断开长时间没有任何数据的连接，顺便清理空闲的 IP 令牌桶（ip_limiter 自己也会按数量清理）"""
+    interval = max(1.0, min(config.idle_timeout / 2, 30.0))
+    while True:
+        await asyncio.sleep(interval)
+        deadline = time.monotonic() - config.idle_timeout
+        for connection in list(connected_clients):
+            if connection.last_activity < deadline:
+                limit_counters["idle_disconnects"] += 1
+                connection.close("空闲超时")
+        ip_limiter.prune()
+
+def _parse_command(data: str) -> Optional[Dict]:
+    """解析控制消息，普通聊天文本返回 None"""
+    if not data.startswith("{"):
+        return None
+    try:
+        command = json.loads(data)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(command, dict) or "action" not in command:
+        return None
+    return command
+
+def _parse_seq(value) -> Optional[int]:
+    """解析客户端发来的序号，没有或不合法时返回 None"""
+    try:
+        seq = int(value)
+    except (TypeError, ValueError):
+        return None
+    return seq if seq >= 0 else None
+
+def _system_message(text: str) -> Dict:
+    return {
+        "type": "system",
+        "username": "系统",
+        "message": text,
+        "timestamp": datetime.now().isoformat()
+    }
+
+def _send_error(connection: ClientConnection, text: str):
+    """只发给当前连接的错误提示"""
+    error = _system_message(text)
+    error["type"] = "error"
+    connection.enqueue(EncodedMessage(error))
+
+async def join_room(name: str, connection: ClientConnection, last_seq: Optional[int] = None):
+    """
+    加入聊天室：通知聊天室成员，并把该聊天室的最近历史发给新成员
+
+    带了 last_seq（断线重连）并且开启了消息日志时，不回放最近几条历史，
+    而是从日志补发序号大于 last_seq 的全部聊天消息。
 
-async def broadcast_message(message: Dict):
+    Raises:
+        ValueError: 聊天室名不合法或加入的聊天室太多
     """
-    向所有连接的客户端广播消息
+    if name in rooms.rooms_of(connection.client_id):
+        return
+    if not is_valid_room_name(name):
+        raise ValueError(f"聊天室名不合法: {name}")
+
+    resume = last_seq is not None and message_log is not None
+    if resume:
+        # 补发完成后才真正加入聊天室（中间没有 await），实时消息不会和补发的消息交错或重复
+        # 补发期间客户端断开时 _remove_client 已经清理过，不能再加入聊天室
+        if not await _replay_log(name, connection, last_seq):
+            return
+
+    room = rooms.join(name, connection.client_id, connection)
+
+    # 向聊天室成员广播欢迎消息
+    await broadcast_message(_system_message(f"{connection.client_id} 加入了聊天室 {name}"), name)
+
+    if resume:
+        return
+
+    # 发送聊天历史记录给新用户（放入它的发送队列，排在欢迎消息之后）
+    # 历史消息已经编码过，不需要为每个新用户重新序列化
+    for history_msg in room.history.latest(config.history_replay):  # 只发送最近几条消息
+        connection.enqueue(history_msg)
+
+async def _replay_log(name: str, connection: ClientConnection, last_seq: int) -> bool:
+    """
+    从消息日志按批补发聊天室中序号大于 last_seq 的消息
+
+    日志通过 mmap 按批读取，每批合并成一帧放入发送队列；队列里积压的帧发出去之后
+    才读下一批，离线很久的客户端也不会把整段历史读进内存或撑满发送队列。
+
+    Returns:
+        bool: 补发完成时连接是否仍然打开
+    """
+    cursor = last_seq
+    replayed = 0
+    while cursor < message_log.last_seq:
+        upper = message_log.last_seq
+        for batch in message_log.read_after(cursor, {name}, config.resume_batch_size):
+            # 日志中保存的就是 JSON 文本，JSON 客户端直接发送原文
+            connection.enqueue(EncodedBatch([EncodedMessage.from_text(text) for _, _, text in batch]))
+            replayed += len(batch)
+            while connection.queue_size > 1 and not connection.is_closed:
+                await asyncio.sleep(0.005)
+            if connection.is_closed:
+                return False
+        # 补发期间可能有新消息写入日志，继续补到最新
+        cursor = upper
+
+    resume_counters["resumes"] += 1
+    resume_counters["replayed_messages"] += replayed
+    return not connection.is_closed
+
+async def leave_room(name: str, client_id: str):
+    """离开聊天室并通知剩下的成员"""
+    if not rooms.leave(name, client_id):
+        raise ValueError(f"不在聊天室 {name} 中")
+    await broadcast_message(_system_message(f"{client_id} 离开了聊天室 {name}"), name)
+
+async def send_chat(name: str, client_id: str, text: str):
+    """向聊天室发送一条聊天消息，并记录到该聊天室的历史"""
+    room = rooms.get(name)
+    if room is None or client_id not in room.members:
+        connection = connected_clients.get(client_id)
+        if connection is not None:
+            _send_error(connection, f"不在聊天室 {name} 中，请先加入")
+        return
+
+    # 创建消息对象
+    message_data = {
+        "type": "chat",
+        "username": client_id,
+        "message": text,
+        "timestamp": datetime.now().isoformat()
+    }
+
+    # 向聊天室成员广播消息
+    encoded = await broadcast_message(message_data, name, persist=True)
+
+    # 将消息添加到聊天室的历史记录（环形缓冲区满了会自动覆盖最旧的消息）
+    room.history.append(encoded)
+
+def _remove_client(connection: ClientConnection):
+    """
+    连接关闭时的回调：从连接列表和所有聊天室中移除，并通知这些聊天室的其他成员
+    客户端主动断开、慢客户端、超速和空闲超时被服务器断开都会走到这里
+    """
+    connected_clients.remove(connection.client_id)
+    for name in rooms.leave_all(connection.client_id):
+        leave_message = _system_message(f"{connection.client_id} 离开了聊天室 {name}")
+        asyncio.create_task(broadcast_message(leave_message, name))
+    if connection.close_reason:
+        print(f"客户端 {connection.client_id} 被断开: {connection.close_reason}")
+
+async def broadcast_message(message: Dict, room_name: str = DEFAULT_ROOM, persist: bool = False) -> EncodedMessage:
+    """
+    向聊天室的所有成员广播消息
+
+    每种编码（JSON / 二进制）只编码一次，然后放入每个成员的发送队列，
+    由各自的写任务发送。慢客户端不会拖慢其他客户端，其他聊天室的连接也不会被遍历。
+    多进程部署时同时发布到背板，由其他工作进程投递给它们的成员。
 
     Args:
         message: 要广播的消息字典
+        room_name: 目标聊天室
+        persist: 是否写入消息日志（写入时消息会带上序号 seq）
+
+    Returns:
+        EncodedMessage: 带编码缓存的消息（可以直接保存到历史记录）
     """
-    # 将消息转换为 JSON 字符串
-    message_json = json.dumps(message)
-
-    # 创建要移除的客户端列表（避免在遍历时修改列表）
-    clients_to_remove = []
-
-    # 遍历所有连接的客户端
-    for client in connected_clients:
-        try:
-            # 向客户端发送消息
-            await client.send_text(message_json)
-        except Exception as e:
-            # 如果发送失败，标记为要移除的客户端
-            print(f"发送消息失败: {e}")
-            clients_to_remove.append(client)
-
-    # 移除发送失败的客户端
-    for client in clients_to_remove:
-        if client in connected_clients:
-            connected_clients.remove(client)
+    message["room"] = room_name
+    persist = persist and message_log is not None
+    if persist:
+        message["seq"] = message_log.next_seq
+    encoded = EncodedMessage(message)
+
+    if persist:
+        # 先写日志再投递：客户端收到的每个序号都能在日志里找到
+        message_log.append(room_name, encoded.text)
+
+    # 本进程可能已经没有成员了（例如最后一个成员刚离开），其他进程仍然需要收到
+    backplane.publish(room_name, message)
+    _deliver_local(room_name, encoded)
+    return encoded
+
+def _deliver_local(room_name: str, encoded: EncodedMessage):
+    """投递给本进程的聊天室成员（开启合并发送时先攒到时间片结束）"""
+    room = rooms.get(room_name)
+    if room is None:
+        return
+
+    room.messages.add()
+    broadcast_counter.add()
+
+    if coalescer is not None:
+        coalescer.add(room_name, encoded)
+    else:
+        _send_to_room(room_name, encoded)
+
+def _send_to_room(room_name: str, payload):
+    """把一帧（单条消息或合并后的批量消息）放入聊天室成员的发送队列（不等待网络）"""
+    room = rooms.get(room_name)
+    if room is None:
+        return
+
+    delivered = fanout.broadcast(room, payload)
+    delivery_counter.add(delivered)
+
+async def _deliver_remote(room_name: str, message: Dict):
+    """背板回调：其他工作进程发布的消息，投递给本进程的成员"""
+    encoded = EncodedMessage(message)
+    _deliver_local(room_name, encoded)
+
+    # 聊天消息同样记入本进程的聊天室历史，保证各进程回放的历史一致
+    room = rooms.get(room_name)
+    if room is not None and message.get("type") == "chat":
+        room.history.append(encoded)
 
 @app.get("/stats")
 async def get_stats():
@@ -239,10 +640,54 @@ async def get_stats():
     获取服务器统计信息
     返回当前连接的客户端数量和消息历史长度
     """
+    history_size = sum(len(room.history) for room in rooms)
     return {
         "connected_clients": len(connected_clients),
-        "total_messages": len(chat_history),
-        "server_status": "running"
+        "total_messages": history_size,
+        "server_status": "running",
+        "connections": connected_clients.stats(),
+        "history": {
+            "size": history_size,
+            "capacity_per_room": config.history_size
+        },
+        "rooms": {
+            "count": len(rooms),
+            "by_room": rooms.stats()
+        },
+        "broadcast": {
+            "total_messages": broadcast_counter.total,
+            "total_deliveries": delivery_counter.total,
+            "messages_per_second": broadcast_counter.per_second(),
+            "deliveries_per_second": delivery_counter.per_second()
+        },
+        "coalescing": coalescer.stats() if coalescer is not None else {"enabled": False},
+        "fanout": {
+            "policy": fanout.policy,
+            "max_queue": fanout.max_queue,
+            "broadcasts": fanout.broadcasts,
+            "disconnected_slow_clients": fanout.disconnected_slow,
+            "queued_messages": sum(c.queue_size for c in connected_clients),
+            "dropped_messages": sum(c.dropped for c in connected_clients)
+        },
+        "encoding": {
+            "binary_protocol_enabled": config.binary_protocol,
+            "binary_clients": sum(1 for c in connected_clients if c.protocol == PROTOCOL_BINARY),
+            "json_clients": sum(1 for c in connected_clients if c.protocol != PROTOCOL_BINARY)
+        },
+        "backplane": backplane.stats(),
+        "message_log": (
+            {**message_log.stats(), **resume_counters} if message_log is not None else {"enabled": False}
+        ),
+        "limits": {
+            "max_connections": config.max_connections,
+            "message_rate": config.message_rate,
+            "message_burst": config.message_burst,
+            "ip_message_rate": config.ip_message_rate,
+            "ip_message_burst": config.ip_message_burst,
+            "idle_timeout": config.idle_timeout,
+            "tracked_ips": len(ip_limiter),
+            **limit_counters
+        }
     }
 
 @app.on_event("startup")
@@ -250,25 +695,57 @@ async def startup_event():
     """服务器启动时执行的函数"""
     print("WebSocket 服务器正在启动...")
     print("访问 http://localhost:8000 查看聊天室")
+    await backplane.start(_deliver_remote)
+
+    global reaper_task
+    if config.idle_timeout > 0:
+        reaper_task = asyncio.create_task(_reap_idle_connections())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """服务器关闭时执行的函数"""
     print("WebSocket 服务器正在关闭...")
     print(f"共有 {len(connected_clients)} 个客户端连接")
+    await backplane.stop()
+    if reaper_task is not None:
+        reaper_task.cancel()
+    if message_log is not None:
+        message_log.close()
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="WebSocket 聊天服务器")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口 (默认: 8000)")
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数，大于 1 时自动启动本地背板 (默认: 1)")
+    args = parser.parse_args()
+
     # 启动服务器
     print("启动 WebSocket 服务器...")
     print("访问地址：")
-    print("- 聊天室: http://localhost:8000")
-    print("- 统计信息: http://localhost:8000/stats")
+    print(f"- 聊天室: http://localhost:{args.port}")
+    print(f"- 统计信息: http://localhost:{args.port}/stats")
     print("\n按 Ctrl+C 停止服务器")
 
+    options = {}
+    if args.workers > 1:
+        # 多进程：在父进程的后台线程中运行背板服务，工作进程通过环境变量连接
+        if not config.backplane:
+            broker = BackplaneBroker()
+            broker.run_in_thread()
+            os.environ["WS_BACKPLANE"] = broker.address
+            print(f"背板服务: {broker.address}")
+        options["workers"] = args.workers
+    else:
+        # 单进程开发模式：代码修改后自动重启
+        options["reload"] = True
+
     uvicorn.run(
         "websocket_server:app",
         host="127.0.0.1",
-        port=8000,
-        reload=True,
-        log_level="info"
+        port=args.port,
+        log_level="info",
+        # 只压缩大消息的 permessage-deflate（见 websocket_deflate.py）
+        ws="websocket_deflate:DeflateWebSocketProtocol",
+        **options
     )
@@ -0,0 +1,362 @@
+"""
+WebSocket 压力测试（swarm 模式）
+==============================
+
+用成千上万个 WebSocketClient 同时连接 websocket_server.py，观察服务器在大量连接下的表现：
+- 按设定的时间逐步建立连接（ramp-up），避免一瞬间的握手风暴
+- 连接可以分布在多个进程里（单个进程的事件循环很难撑住上万个连接）
+- 全部连上之后，每个客户端按设定的速率发送带发送时间戳的消息
+- 统计扇出延迟百分位（发送 -> 同聊天室每个成员收到）、消息丢失率、连接失败数
+- 结果写成 JSON 报告
+
+运行示例（先用不限流的配置启动服务器，或者加 --spawn-server 自动启动一个）：
+    WS_IP_MESSAGE_RATE=0 python websocket_server.py
+    python websocket_client.py swarm --clients 2000 --processes 4 --rooms 20 --rate 0.2
+
+注意：所有客户端都来自 127.0.0.1，服务器默认的按 IP 限流（WS_IP_MESSAGE_RATE）
+会把压测消息当成刷屏丢弃，报告里的 server.limits 会显示被限流的消息数。
+
+作者：AI助手
+适合人群：Python初学者
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import time
+import urllib.request
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from websocket_benchmark import latency_summary, start_backplane_server, stop_processes
+from websocket_client import WebSocketClient
+
+# 压测消息的前缀，后面是运行 ID 和发送时间戳
+MESSAGE_PREFIX = "swarm"
+
+# 每个进程最多保留的延迟样本数（蓄水池抽样，内存占用固定）
+MAX_LATENCY_SAMPLES = 200000
+
+
+@dataclass
+class SwarmConfig:
+    """压力测试配置"""
+    url: str = "ws://127.0.0.1:8000/ws/chat"  # 聊天端点，客户端连接 url/聊天室名
+    clients: int = 1000  # 客户端总数
+    processes: int = 1  # 运行客户端的进程数
+    rooms: int = 10  # 客户端平均分到这么多个聊天室
+    ramp_up: float = 10.0  # 在多少秒内建立全部连接
+    rate: float = 0.1  # 每个客户端每秒发送的消息数
+    duration: float = 30.0  # 全部连上之后持续发送的秒数
+    drain: float = 5.0  # 停止发送后继续接收的秒数
+    connect_timeout: float = 10.0  # 单个连接的握手超时
+    binary: bool = False  # 是否使用二进制子协议
+    run_id: str = ""  # 运行 ID，用来区分其他客户端或上一次运行的消息
+
+
+class LatencySample:
+    """蓄水池抽样：样本数超过上限后等概率替换，延迟分布保持无偏"""
+
+    def __init__(self, max_samples: int = MAX_LATENCY_SAMPLES):
+        self.max_samples = max_samples
+        self.values: List[float] = []
+        self.seen = 0
+        self._random = random.Random()
+
+    def add(self, value: float):
+        self.seen += 1
+        if len(self.values) < self.max_samples:
+            self.values.append(value)
+        else:
+            index = self._random.randrange(self.seen)
+            if index < self.max_samples:
+                self.values[index] = value
+
+
+class SwarmClient(WebSocketClient):
+    """压测客户端：不打印消息，只统计收到的压测消息和延迟"""
+
+    def __init__(self, url: str, room: str, config: SwarmConfig, latencies: LatencySample):
+        super().__init__(f"{url}/{room}", binary=config.binary, verbose=False)
+        self.room = room
+        self.marker = f"{MESSAGE_PREFIX}:{config.run_id}:"
+        self.latencies = latencies
+        self.received = 0
+        self.errors = 0
+
+    def handle_message(self, data):
+        if isinstance(data, list):
+            for item in data:
+                self.handle_message(item)
+            return
+
+        message_type = data.get("type")
+        if message_type == "error":
+            # 服务器的错误提示，例如被限流
+            self.errors += 1
+            return
+
+        text = data.get("message", "")
+        if message_type == "chat" and text.startswith(self.marker):
+            self.received += 1
+            self.latencies.add(time.time() - float(text[len(self.marker):]))
+
+    async def send_probe(self) -> bool:
+        """发送一条带时间戳的压测消息（发送成功时 send_message 会计入 self.sent）"""
+        return await self.send_message(f"{self.marker}{time.time()}")
+
+
+async def _connect(client: SwarmClient, delay: float, timeout: float) -> Optional[float]:
+    """在 delay 秒后连接，返回握手耗时（失败返回 None）"""
+    await asyncio.sleep(delay)
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(client.connect(), timeout)
+    except asyncio.TimeoutError:
+        client.last_error = "TimeoutError: 握手超时"
+        client.is_connected = False
+    if not client.is_connected:
+        return None
+    return time.perf_counter() - start
+
+
+async def _send_loop(client: SwarmClient, rate: float, deadline: float):
+    """按固定速率发送，第一条的时间随机错开，避免所有客户端同时发送"""
+    interval = 1.0 / rate
+    await asyncio.sleep(random.uniform(0, interval))
+    next_send = time.monotonic()
+    while client.is_connected and next_send < deadline:
+        await client.send_probe()
+        next_send += interval
+        await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+
+
+async def run_swarm_process(config: SwarmConfig, process_index: int, barrier=None) -> Dict:
+    """
+    一个进程中的客户端：全局编号为 process_index, process_index + processes, ... 的客户端
+
+    Args:
+        config: 压测配置
+        process_index: 进程编号
+        barrier: 多进程时所有进程连接完成后一起开始发送
+    """
+    _raise_file_limit()
+    latencies = LatencySample()
+    indices = range(process_index, config.clients, config.processes)
+    clients = [SwarmClient(config.url, f"swarm_{i % config.rooms}", config, latencies) for i in indices]
+
+    # 连接阶段：第 i 个客户端在 i * ramp_up / clients 秒时连接
+    step = config.ramp_up / config.clients if config.clients else 0.0
+    ramp_start = time.time()
+    connect_times = await asyncio.gather(*(
+        _connect(client, i * step, config.connect_timeout) for i, client in zip(indices, clients)
+    ))
+    ramp_seconds = time.time() - ramp_start
+
+    if barrier is not None:
+        await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+
+    # 发送阶段
+    connected = [client for client in clients if client.is_connected]
+    send_start = time.time()
+    if config.rate > 0:
+        deadline = time.monotonic() + config.duration
+        await asyncio.gather(*(_send_loop(client, config.rate, deadline) for client in connected))
+    send_seconds = time.time() - send_start
+
+    # 等待还在路上的消息
+    await asyncio.sleep(config.drain)
+    dropped_connections = [client for client in connected if not client.is_connected]
+
+    await asyncio.gather(*(client.disconnect() for client in connected), return_exceptions=True)
+
+    rooms: Dict[str, Dict[str, int]] = {}
+    for client in connected:
+        room = rooms.setdefault(client.room, {"members": 0, "sent": 0, "received": 0})
+        room["members"] += 1
+        room["sent"] += client.sent
+        room["received"] += client.received
+
+    return {
+        "attempted": len(clients),
+        "connected": len(connected),
+        "failures": Counter(client.last_error for client, t in zip(clients, connect_times) if t is None),
+        "dropped_connections": len(dropped_connections),
+        "drop_reasons": Counter(client.last_error for client in dropped_connections),
+        "connect_times": [t for t in connect_times if t is not None],
+        "ramp_seconds": ramp_seconds,
+        "send_seconds": send_seconds,
+        "rooms": rooms,
+        "errors": sum(client.errors for client in connected),
+        "latencies": latencies.values,
+        "latency_samples_seen": latencies.seen,
+    }
+
+
+def _raise_file_limit():
+    """每个连接占一个文件描述符，把软限制提高到硬限制（仅 Unix）"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _swarm_process(config: SwarmConfig, process_index: int, barrier, results):
+    results.put(asyncio.run(run_swarm_process(config, process_index, barrier)))
+
+
+def fetch_server_stats(url: str) -> Optional[Dict]:
+    """从聊天端点地址推出 /stats 地址并读取服务器统计"""
+    parts = urlsplit(url)
+    http_scheme = "https" if parts.scheme == "wss" else "http"
+    try:
+        with urllib.request.urlopen(f"{http_scheme}://{parts.netloc}/stats", timeout=5) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError):
+        return None
+
+
+def build_report(config: SwarmConfig, reports: List[Dict], server: Optional[Dict]) -> Dict:
+    """汇总各进程的结果"""
+    rooms: Dict[str, Dict[str, int]] = {}
+    for report in reports:
+        for name, room in report["rooms"].items():
+            total = rooms.setdefault(name, {"members": 0, "sent": 0, "received": 0})
+            for key in total:
+                total[key] += room[key]
+
+    # 聊天室的每条消息都会发给该聊天室的全部成员（包括发送者自己）
+    sent = sum(room["sent"] for room in rooms.values())
+    expected = sum(room["sent"] * room["members"] for room in rooms.values())
+    received = sum(room["received"] for room in rooms.values())
+    send_seconds = max((r["send_seconds"] for r in reports), default=0.0)
+
+    failures = sum((Counter(r["failures"]) for r in reports), Counter())
+    drop_reasons = sum((Counter(r["drop_reasons"]) for r in reports), Counter())
+
+    report = {
+        "config": asdict(config),
+        "connections": {
+            "attempted": sum(r["attempted"] for r in reports),
+            "established": sum(r["connected"] for r in reports),
+            "failed": sum(failures.values()),
+            "failure_reasons": dict(failures.most_common(10)),
+            "dropped_during_run": sum(r["dropped_connections"] for r in reports),
+            "drop_reasons": dict(drop_reasons.most_common(10)),
+            "ramp_up_seconds": round(max((r["ramp_seconds"] for r in reports), default=0.0), 3),
+            "connect_latency": latency_summary([t for r in reports for t in r["connect_times"]]),
+        },
+        "messages": {
+            "sent": sent,
+            "sent_per_second": round(sent / send_seconds, 1) if send_seconds else 0.0,
+            "expected_deliveries": expected,
+            "received": received,
+            "lost": max(0, expected - received),
+            "loss_ratio": round(1 - received / expected, 6) if expected else 0.0,
+            "deliveries_per_second": round(received / send_seconds, 1) if send_seconds else 0.0,
+            "error_notices": sum(r["errors"] for r in reports),
+        },
+        "fanout_latency": latency_summary([lat for r in reports for lat in r["latencies"]]),
+        "latency_samples_seen": sum(r["latency_samples_seen"] for r in reports),
+    }
+    if server is not None:
+        report["server"] = {key: server.get(key) for key in ("connected_clients", "fanout", "limits", "broadcast")}
+    return report
+
+
+def run_swarm(config: SwarmConfig) -> Dict:
+    """运行压力测试并返回报告"""
+    if not config.run_id:
+        config.run_id = uuid.uuid4().hex[:8]
+
+    if config.processes <= 1:
+        reports = [asyncio.run(run_swarm_process(config, 0))]
+    else:
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(config.processes)
+        results = context.Queue()
+        processes = [
+            context.Process(target=_swarm_process, args=(config, index, barrier, results))
+            for index in range(config.processes)
+        ]
+        for process in processes:
+            process.start()
+        timeout = config.ramp_up + config.connect_timeout + config.duration + config.drain + 120
+        reports = [results.get(timeout=timeout) for _ in processes]
+        for process in processes:
+            process.join()
+
+    return build_report(config, reports, fetch_server_stats(config.url))
+
+
+def main(argv: Optional[List[str]] = None):
+    """命令行入口"""
+    defaults = SwarmConfig()
+    parser = argparse.ArgumentParser(description="WebSocket 压力测试（swarm 模式）")
+    parser.add_argument("--url", default=defaults.url, help=f"聊天端点 (默认: {defaults.url})")
+    parser.add_argument("--clients", type=int, default=defaults.clients, help=f"客户端总数 (默认: {defaults.clients})")
+    parser.add_argument("--processes", type=int, default=defaults.processes, help=f"客户端进程数 (默认: {defaults.processes})")
+    parser.add_argument("--rooms", type=int, default=defaults.rooms, help=f"聊天室数 (默认: {defaults.rooms})")
+    parser.add_argument("--ramp-up", type=float, default=defaults.ramp_up, help=f"建立全部连接的秒数 (默认: {defaults.ramp_up})")
+    parser.add_argument("--rate", type=float, default=defaults.rate, help=f"每个客户端每秒发送的消息数 (默认: {defaults.rate})")
+    parser.add_argument("--duration", type=float, default=defaults.duration, help=f"发送持续秒数 (默认: {defaults.duration})")
+    parser.add_argument("--drain", type=float, default=defaults.drain, help=f"停止发送后继续接收的秒数 (默认: {defaults.drain})")
+    parser.add_argument("--connect-timeout", type=float, default=defaults.connect_timeout, help="握手超时秒数")
+    parser.add_argument("--binary", action="store_true", help="使用二进制子协议")
+    parser.add_argument("--output", default="swarm_report.json", help="报告文件 (默认: swarm_report.json)")
+    parser.add_argument("--spawn-server", action="store_true",
+                        help="在本机启动一个不限流的 websocket_server.py 进行测试，测试结束后关闭")
+    parser.add_argument("--server-workers", type=int, default=1, help="--spawn-server 时的工作进程数 (默认: 1)")
+    args = parser.parse_args(argv)
+
+    config = SwarmConfig(
+        url=args.url,
+        clients=args.clients,
+        processes=max(1, args.processes),
+        rooms=max(1, args.rooms),
+        ramp_up=args.ramp_up,
+        rate=args.rate,
+        duration=args.duration,
+        drain=args.drain,
+        connect_timeout=args.connect_timeout,
+        binary=args.binary,
+    )
+
+    server = []
+    if args.spawn_server:
+        server = start_backplane_server(args.server_workers, urlsplit(config.url).port or 80, {
+            "WS_MAX_CONNECTIONS": str(config.clients * 2),
+            "WS_IP_MESSAGE_RATE": "0",
+            "WS_IDLE_TIMEOUT": "0",
+            "WS_HISTORY_REPLAY": "0",
+        })
+
+    try:
+        print(f"压力测试: {config.clients} 个客户端, {config.processes} 个进程, {config.rooms} 个聊天室")
+        report = run_swarm(config)
+    finally:
+        stop_processes(server)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    summary = {
+        "connections": {k: report["connections"][k] for k in ("attempted", "established", "failed", "dropped_during_run")},
+        "messages": report["messages"],
+        "fanout_latency": report["fanout_latency"],
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    print(f"完整报告已写入: {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
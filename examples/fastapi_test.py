@@ -1,8 +1,20 @@
+import os
+import sys
 from typing import Optional, List
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
+# 物品仓库和 ai_tutorial/fastapi_tutorial.py 共用
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ai_tutorial"))
+
+from item_backend import RecordFormatError, create_backend
+from item_bulk import BULK_CHUNK_SIZE, BulkImport, export_items
+from request_metrics import CONTENT_TYPE, RequestMetrics, RequestMetricsMiddleware
+from response_cache import ResponseCache, ResponseCacheMiddleware
+from item_store import SEARCH_PAGE_SIZE, ItemExistsError, decode_cursor, encode_cursor
+
 
 app = FastAPI(
     title="FastAPI 测试(标题修改)",
@@ -23,12 +35,22 @@ class User(BaseModel):
     username: str
     email: str
 
-fake_items_db = [
+# 设置环境变量 ITEM_STORE=sqlite:items.db 后物品保存到 SQLite（见 ai_tutorial/item_backend.py）
+db = create_backend(os.environ.get("ITEM_STORE", "memory"), items=[
     {"id": 1, "name": "物品1", "description": "str类型的商品描述", "price": 10.99, "is_available": True},
     {"id": 2, "name": "物品2", "description": "str类型的商品描述", "price": 20.99, "is_available": False},
     {"id": 3, "name": "物品3", "description": "str类型的商品描述", "price": 30.99, "is_available": True},
     {"id": 4, "name": "物品4", "description": "str类型的商品描述", "price": 40.99, "is_available": False},
-]
+])
+
+# 读接口的响应缓存（见 ai_tutorial/response_cache.py）：数据被修改后自动失效
+response_cache = ResponseCache()
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache, version=db.data_version,
+                   paths=["/items", "/search/items"])
+
+# 接口耗时统计（见 ai_tutorial/request_metrics.py），放在最外层；多个工作进程时设置 METRICS_DIR
+request_metrics = RequestMetrics(directory=os.environ.get("METRICS_DIR"))
+app.add_middleware(RequestMetricsMiddleware, metrics=request_metrics)
 
 @app.get("/")
 async def root():
@@ -44,77 +66,131 @@ async def root():
     }
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """响应缓存的命中率和内存占用"""
+    return response_cache.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """接口耗时直方图（Prometheus 文本格式）"""
+    return PlainTextResponse(await request_metrics.render_all(), media_type=CONTENT_TYPE)
+
+
 @app.get("/items", response_model=List[Item])
 async def get_items():
     """获取物品列表(这里虽然是注释，但是可以修改，且会显示到web端)"""
-    return fake_items_db
+    return await db.list_items()
+
+@app.get("/items/export")
+async def export_items_ndjson():
+    """导出所有物品（NDJSON，每行一个物品，按价格排序，边读边发送）"""
+    return StreamingResponse(export_items(db), media_type="application/x-ndjson")
 
-@app.get("/items/{items_id}", response_model=Item)
+@app.get("/items/{item_id}", response_model=Item)
 async def get_item(item_id: int):
-    """获取指"""
-    for item in fake_items_db:
-        if item["id"] == item_id:
-            return item
-    raise HTTPException(status_code=404, detail="物品未找到")
+    """获取指定物品"""
+    item = await db.get_item(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="物品未找到")
+    return item
 
 
 @app.post("/items", response_model=Item)
 async def create_item(item:Item):
     """创建新物品"""
-    # 检查ID是否已存在
-    for existing_item in fake_items_db:
-        if existing_item["id"] == item.id:
-            raise HTTPException(status_code=400, detail="物品ID已存在")
-    
-    # 添加到"数据库"
-    item_dict = item.model_dump()
-    fake_items_db.append(item_dict)
-    return item_dict
+    # 添加到"数据库"（ID 已存在时仓库会报错）
+    try:
+        return await db.create_item(item.model_dump())
+    except ItemExistsError:
+        raise HTTPException(status_code=400, detail="物品ID已存在")
+    except RecordFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/items/bulk")
+async def create_items_bulk(request: Request, chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=100000)):
+    """
+    批量导入物品
+
+    请求体是 NDJSON（每行一个物品），按块校验并写入；返回 NDJSON，每行对应请求的一行的结果，最后一行是汇总
+    """
+    result = await BulkImport(db, Item, chunk_size).feed(request.stream())
+    return StreamingResponse(result.render(), media_type="application/x-ndjson")
 
 @app.put("/items/{item_id}", response_model=Item)
 async def update_item(item_id: int, item: Item):
     """更新物品信息"""
-    for i, existing_item in enumerate(fake_items_db):
-        if existing_item["id"] == item_id:
-            item_dict = item.model_dump()
-            item_dict["id"] = item_id  # 确保ID一致
-            fake_items_db[i] = item_dict
-            return item_dict
-    raise HTTPException(status_code=404, detail="物品未找到")
+    try:
+        item_dict = await db.update_item(item_id, item.model_dump())  # 仓库会确保ID一致
+    except RecordFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if item_dict is None:
+        raise HTTPException(status_code=404, detail="物品未找到")
+    return item_dict
 
 @app.delete("/items/{item_id}")
 async def delete_item(item_id: int):
     """删除物品"""
-    for i, item in enumerate(fake_items_db):
-        if item["id"] == item_id:
-            deleted_item = fake_items_db.pop(i)
-            return {"message": f"物品 '{deleted_item['name']}' 已删除"}
-    raise HTTPException(status_code=404, detail="物品未找到")
+    deleted_item = await db.delete_item(item_id)
+    if deleted_item is None:
+        raise HTTPException(status_code=404, detail="物品未找到")
+    return {"message": f"物品 '{deleted_item['name']}' 已删除"}
 
 
 @app.get("/search/items")
 async def search_items(
         q: Optional[str] = None,
         min_price: Optional[float] = None,
-        max_price: Optional[float] = None
+        max_price: Optional[float] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        offset: int = Query(0, ge=0),
+        cursor: Optional[str] = None
 ):
-    """搜索物品（演示查询参数）"""
-    results = fake_items_db.copy()
-
-    # 按名称搜索
-    if q:
-        results = [item for item in results if q.lower() in item["name"].lower()]
+    """
+    搜索物品（演示查询参数）
+
+    没有 limit、cursor 且 offset 为 0 时和原来一样：按插入顺序返回所有匹配的物品。
+    否则分页：名称用 n-gram 倒排索引、价格用排序索引查找，结果按价格从低到高排列；
+    翻页可以用 offset，也可以把上一页返回的 next_cursor 作为 cursor 传回来。
+    """
+    if limit is None and offset == 0 and cursor is None:
+        results = await db.filter_items(q, min_price, max_price)
+        return {
+            "query": q,
+            "price_range": {"min": min_price, "max": max_price},
+            "results": results,
+            "count": len(results)
+        }
 
-    # 按价格范围过滤
-    if min_price is not None:
-        results = [item for item in results if item["price"] >= min_price]
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if max_price is not None:
-        results = [item for item in results if item["price"] <= max_price]
+    if limit is None:
+        limit = SEARCH_PAGE_SIZE
+    results, last_key = await db.search_items(q, min_price, max_price, offset=offset, limit=limit, after=after)
 
     return {
         "query": q,
         "price_range": {"min": min_price, "max": max_price},
         "results": results,
-        "count": len(results)
-    }
\ No newline at end of file
+        "count": len(results),
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": encode_cursor(last_key) if last_key is not None else None
+    }
+
+
+@app.on_event("startup")
+async def startup_event():
+    """服务器启动时开始定期写入统计文件（设置了 METRICS_DIR 时）"""
+    await request_metrics.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """服务器关闭时写入最后一次统计、关闭数据库连接"""
+    await request_metrics.stop()
+    await db.close()